@@ -1,43 +1,253 @@
 import json
+import math
 import os
+import threading
+import time
+import uuid
 from datetime import datetime, timezone
+from decimal import Decimal
+from functools import lru_cache
 
 import boto3
+from botocore.exceptions import ClientError
 from aws_durable_execution_sdk_python import (
+    BatchItemStatus,
     DurableContext,
     durable_execution,
     durable_step,
 )
+from aws_durable_execution_sdk_python.config import CompletionConfig, Duration, MapConfig
 
 # Support both package layouts:
 # - CodeUri: src/cv_generator (imports like 'cv_tools.*', 'gen_ai.*')
 # - CodeUri: src (imports like 'cv_generator.cv_tools.*', 'cv_generator.gen_ai.*')
 try:
-    from cv_tools.create_cv import create_cv
+    from cv_tools.create_cv import (
+        TAILORED_SECTIONS,
+        assemble_cv,
+        batch_requests,
+        dump_job_summary,
+        experience_cache_fingerprint,
+        extract_job_summary,
+        load_stored_job_summary,
+        prompts_from_batch,
+        reuse_prompts,
+        run_prompts,
+        tailored_sections_fingerprint,
+    )
+    from cv_tools.cv_batches import CVBatchStore
+    from cv_tools.cv_index import SimilarCVIndex
+    from cv_tools.experience_cache import ExperienceCache
     from cv_tools.yaml_parser import Loader
     from gen_ai.gemini import AskGemini
-    from gen_ai.model_names import Flash
+    from gen_ai.model_names import Flash, Pro
+    from gen_ai.rate_limiter import RateLimiter, summarize_usage
+    from gen_ai.resilience import CircuitBreaker, LatencyTracker, ResilientLLM
 except ModuleNotFoundError:
-    from cv_generator.cv_tools.create_cv import create_cv
+    from cv_generator.cv_tools.create_cv import (
+        TAILORED_SECTIONS,
+        assemble_cv,
+        batch_requests,
+        dump_job_summary,
+        experience_cache_fingerprint,
+        extract_job_summary,
+        load_stored_job_summary,
+        prompts_from_batch,
+        reuse_prompts,
+        run_prompts,
+        tailored_sections_fingerprint,
+    )
+    from cv_generator.cv_tools.cv_batches import CVBatchStore
+    from cv_generator.cv_tools.cv_index import SimilarCVIndex
+    from cv_generator.cv_tools.experience_cache import ExperienceCache
     from cv_generator.cv_tools.yaml_parser import Loader
     from cv_generator.gen_ai.gemini import AskGemini
-    from cv_generator.gen_ai.model_names import Flash
+    from cv_generator.gen_ai.model_names import Flash, Pro
+    from cv_generator.gen_ai.rate_limiter import RateLimiter, summarize_usage
+    from cv_generator.gen_ai.resilience import CircuitBreaker, LatencyTracker, ResilientLLM
 
 # --- Configuration & Client Initialization ---
 
-dynamodb = boto3.resource('dynamodb')
+
+class ThreadLocalResource:
+    """Proxy to a boto3 service resource of the calling thread, created on first use there.
+
+    boto3 resources, and the default session boto3.resource uses, are not thread-safe,
+    while context.map runs process_single_job on several threads at once. Clients are
+    thread-safe, so sqs is shared.
+    """
+
+    def __init__(self, service_name):
+        self._service_name = service_name
+        self._local = threading.local()
+
+    def __getattr__(self, name):
+        resource = getattr(self._local, 'resource', None)
+        if resource is None:
+            resource = self._local.resource = boto3.session.Session().resource(self._service_name)
+        return getattr(resource, name)
+
+
+dynamodb = ThreadLocalResource('dynamodb')
 sqs = boto3.client('sqs')
 DYNAMODB_TABLE_NAME = os.environ.get('DYNAMODB_TABLE_NAME')
 EMAIL_QUEUE_URL = os.environ.get('EMAIL_QUEUE_URL')
+JOB_QUEUE_URL = os.environ.get('JOB_QUEUE_URL')
 BASE_DIR = os.path.dirname(__file__)
 RESUME_PATH = os.path.join(BASE_DIR, 'config', 'resume.yaml')
+# Maximum number of Gemini calls in flight while generating one CV.
+CV_LLM_CONCURRENCY = int(os.environ.get('CV_LLM_CONCURRENCY', '3'))
+# Number of records processed concurrently as independent durable steps; 1 processes
+# them one after another with rate-aware waits in between.
+CV_PARALLEL_JOBS = max(1, int(os.environ.get('CV_PARALLEL_JOBS', '1')))
+# Seconds to wait for the streamed work-experience response before keeping the entries
+# that arrived and requesting the rest again; 0 disables streaming.
+CV_STREAM_TIMEOUT = float(os.environ.get('CV_STREAM_TIMEOUT', '300'))
+# Cache of tailored experience bullets per resume entry and job keyword signature.
+EXPERIENCE_CACHE_TABLE_NAME = os.environ.get('EXPERIENCE_CACHE_TABLE_NAME')
+EXPERIENCE_CACHE_TTL_DAYS = float(os.environ.get('EXPERIENCE_CACHE_TTL_DAYS', '14'))
+# Index of previously generated CVs; a job whose summary is at least CV_REUSE_THRESHOLD
+# (cosine) similar to an indexed one reuses its tailored sections. 0 disables reuse.
+CV_INDEX_TABLE_NAME = os.environ.get('CV_INDEX_TABLE_NAME')
+CV_REUSE_THRESHOLD = float(os.environ.get('CV_REUSE_THRESHOLD', '0.9'))
+CV_INDEX_TTL_DAYS = float(os.environ.get('CV_INDEX_TTL_DAYS', '30'))
+# Submit the tailoring calls of a whole JobsQueue batch to the Gemini Batch API and let
+# resume_batches_handler assemble the CVs when the results are ready, instead of calling
+# the model interactively. CVs only go out with the daily digest, so hours are fine.
+CV_BATCH_MODE = os.environ.get('CV_BATCH_MODE', 'false').lower() == 'true'
+CV_BATCH_TABLE_NAME = os.environ.get('CV_BATCH_TABLE_NAME')
+CV_BATCH_TTL_DAYS = float(os.environ.get('CV_BATCH_TTL_DAYS', '3'))
+# Retries of JobsQueue messages that send jobs of a collected batch back for interactive generation.
+REQUEUE_MAX_RETRIES = int(os.environ.get('REQUEUE_MAX_RETRIES', '3'))
+# Model calls still running past their model's p95 latency get one duplicate request;
+# GEMINI_CALL_TIMEOUT bounds the wait for a call including its hedge, not counting
+# rate-limit waits (the requests themselves end at GEMINI_TIMEOUT_SECONDS). Models whose
+# recent calls mostly fail are replaced by their fallback (Pro -> FlashNew) until they
+# recover; 429s do not count as failures.
+GEMINI_HEDGING = os.environ.get('GEMINI_HEDGING', 'true').lower() == 'true'
+GEMINI_CALL_TIMEOUT = float(os.environ.get('GEMINI_CALL_TIMEOUT', '300'))
+
+experience_cache = ExperienceCache(
+    dynamodb,
+    EXPERIENCE_CACHE_TABLE_NAME,
+    fingerprint=experience_cache_fingerprint(),
+    ttl_days=EXPERIENCE_CACHE_TTL_DAYS,
+)
+cv_batches = CVBatchStore(dynamodb, CV_BATCH_TABLE_NAME, ttl_days=CV_BATCH_TTL_DAYS)
 
-table = dynamodb.Table(DYNAMODB_TABLE_NAME)
+# Tracks Gemini usage against per-model RPM/TPM limits; survives warm invocations and is
+# rebuilt from checkpointed step results when the durable execution replays.
+rate_limiter = RateLimiter.from_env()
+# Per-model latency and error-rate history; kept across warm invocations.
+latency_tracker = LatencyTracker()
+circuit_breaker = CircuitBreaker()
+# Usage assumed for the next CV until one has been generated in this execution.
+DEFAULT_CV_USAGE = {
+    Flash: {'requests': 3, 'tokens': 12000},
+    Pro: {'requests': 1, 'tokens': 10000},
+}
 
 
-def generate_cv(cv_obj, job_description):
-    gemini = AskGemini(model_name=Flash)
-    return create_cv(cv_obj, job_description, include_certs=True, gemini=gemini)
+def jobs_table():
+    """The jobs table, through the calling thread's resource."""
+    return dynamodb.Table(DYNAMODB_TABLE_NAME)
+
+
+def make_gemini():
+    """Flash-by-default Gemini client behind the shared rate limiter, hedging and circuit breaker."""
+    return ResilientLLM(
+        AskGemini(model_name=Flash, rate_limiter=rate_limiter),
+        latency=latency_tracker,
+        breaker=circuit_breaker,
+        rate_limiter=rate_limiter,
+        call_timeout=GEMINI_CALL_TIMEOUT,
+        hedge=GEMINI_HEDGING,
+    )
+
+
+@lru_cache(maxsize=4)
+def get_cv_index(fingerprint):
+    """One index per resume/prompt fingerprint, kept across warm invocations."""
+    return SimilarCVIndex(
+        dynamodb,
+        CV_INDEX_TABLE_NAME,
+        fingerprint=fingerprint,
+        threshold=CV_REUSE_THRESHOLD,
+        ttl_days=CV_INDEX_TTL_DAYS,
+    )
+
+
+def resolve_job_summary(gemini, job_description, stored_job_summary=None):
+    """Return (job summary, summary JSON to store or None when the stored one was reused).
+
+    Reuses the job summary stored on the job item when its version matches, otherwise
+    extracts it here.
+    """
+    job_summary = load_stored_job_summary(stored_job_summary)
+    if job_summary is not None:
+        return job_summary, None
+    job_summary = extract_job_summary(gemini, job_description)
+    return job_summary, dump_job_summary(job_summary)
+
+
+def find_reusable_cv(cv_obj, job_summary):
+    """Return (prompts, source) reusing the tailored sections of a similar job, or None."""
+    if CV_REUSE_THRESHOLD <= 0:
+        return None
+    try:
+        match = get_cv_index(tailored_sections_fingerprint(cv_obj)).find(job_summary)
+    except Exception as e:
+        # The index only saves model calls; generate the CV instead of failing it.
+        print(f'Warning: CV index lookup failed; generating a new CV. Error: {e}')
+        return None
+    if not match:
+        return None
+    reused_from, similarity, sections = match
+    source = {'cv_source': 'reused', 'reused_from': reused_from, 'similarity': round(similarity, 4)}
+    return reuse_prompts(job_summary, sections), source
+
+
+def index_cv(cv_obj, jobId, prompts):
+    """Add a generated CV's tailored sections to the index so similar jobs can reuse them."""
+    if CV_REUSE_THRESHOLD > 0 and jobId:
+        try:
+            cv_index = get_cv_index(tailored_sections_fingerprint(cv_obj))
+            cv_index.add(jobId, prompts['job_summary'], {name: prompts[name] for name in TAILORED_SECTIONS})
+        except Exception as e:
+            print(f'Warning: Could not index the CV of job ID {jobId} for reuse. Error: {e}')
+
+
+def generate_cv(cv_obj, job_description, stored_job_summary=None, jobId=None):
+    """Generate the CV text.
+
+    Reuses the stored job summary when possible (see resolve_job_summary). If a
+    previously generated CV's job summary is similar enough, its tailored sections are
+    reused and only highlighting and the title are redone.
+
+    Returns (cv_text, Gemini usage events of the run, job summary JSON to store or None
+    when the stored one was reused, dict describing where the CV came from).
+    """
+    gemini = make_gemini()
+    job_summary, summary_to_store = resolve_job_summary(gemini, job_description, stored_job_summary)
+
+    reusable = find_reusable_cv(cv_obj, job_summary)
+    if reusable:
+        prompts, source = reusable
+    else:
+        prompts = run_prompts(
+            gemini,
+            cv_obj,
+            job_description,
+            CV_LLM_CONCURRENCY,
+            job_summary=job_summary,
+            experience_cache=experience_cache,
+            stream_timeout=CV_STREAM_TIMEOUT,
+        )
+        index_cv(cv_obj, jobId, prompts)
+        source = {'cv_source': 'generated'}
+
+    cv_text = assemble_cv(prompts, cv_obj, include_certs=True)
+    return cv_text, gemini.usage_events, summary_to_store, source
 
 
 @durable_step
@@ -48,7 +258,7 @@ def process_single_job(step_context, jobId):
     """
     step_context.logger.info(f'Processing job with ID: {jobId}')
 
-    response = table.get_item(Key={'jobId': jobId})
+    response = jobs_table().get_item(Key={'jobId': jobId})
     if 'Item' not in response:
         step_context.logger.info(f'Job ID {jobId} not found in DynamoDB. Skipping.')
         return {'status': 'skipped', 'jobId': jobId}
@@ -57,79 +267,447 @@ def process_single_job(step_context, jobId):
     job_description = job_item.get('description')
     cv_obj = Loader(RESUME_PATH)
 
-    generated_cv_text = generate_cv(cv_obj, job_description)
+    generated_cv_text, usage_events, job_summary, source = generate_cv(
+        cv_obj, job_description, job_item.get('job_summary'), jobId
+    )
+    if job_summary is None:
+        step_context.logger.info(f'Reused stored job summary for job ID: {jobId}')
+    if source['cv_source'] == 'reused':
+        step_context.logger.info(
+            f"Reused tailored sections of job {source['reused_from']} "
+            f"(similarity {source['similarity']:.2f}) for job ID: {jobId}"
+        )
 
     step_context.logger.info(f'Updating DynamoDB for job ID: {jobId}')
-    table.update_item(
-        Key={'jobId': jobId},
-        UpdateExpression='SET #status = :status, #cv = :cv, #date = :date',
-        ExpressionAttributeNames={
-            '#status': 'status',
-            '#cv': 'generated_cv',
-            '#date': 'generation_date',
-        },
-        ExpressionAttributeValues={
-            ':status': 'CV_GENERATED',
-            ':cv': generated_cv_text,
-            ':date': datetime.now(timezone.utc).strftime('%Y-%m-%d'),
-        },
+    save_cv(jobId, job_item, generated_cv_text, job_summary, source)
+    return {'status': 'completed', 'jobId': jobId, 'usage': usage_events, **source}
+
+
+def update_job(jobId, update_expression, attribute_names, attribute_values, **kwargs):
+    """Update the job item; returns False when a ConditionExpression in kwargs fails."""
+    try:
+        jobs_table().update_item(
+            Key={'jobId': jobId},
+            UpdateExpression=update_expression,
+            ExpressionAttributeNames=attribute_names,
+            ExpressionAttributeValues=attribute_values,
+            **kwargs,
+        )
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+            raise
+        return False
+    return True
+
+
+def save_cv(jobId, job_item, generated_cv_text, job_summary, source, batch_id=None):
+    """Store a generated CV (and a freshly extracted job summary) on the job item and send it to the EmailQueue.
+
+    With a batch_id the update only applies while the job is still pending in that
+    batch, so collecting a batch twice cannot send a CV twice. Returns False (and sends
+    nothing) when that condition fails.
+    """
+    update_expression = 'SET #status = :status, #cv = :cv, #date = :date, #source = :source'
+    attribute_names = {
+        '#status': 'status',
+        '#cv': 'generated_cv',
+        '#date': 'generation_date',
+        '#source': 'cv_source',
+    }
+    attribute_values = {
+        ':status': 'CV_GENERATED',
+        ':cv': generated_cv_text,
+        ':date': datetime.now(timezone.utc).strftime('%Y-%m-%d'),
+        ':source': source['cv_source'],
+    }
+    if source['cv_source'] == 'reused':
+        update_expression += ', #reusedFrom = :reusedFrom, #similarity = :similarity'
+        attribute_names.update({'#reusedFrom': 'cv_reused_from', '#similarity': 'cv_reuse_similarity'})
+        attribute_values.update({
+            ':reusedFrom': source['reused_from'],
+            ':similarity': Decimal(str(source['similarity'])),
+        })
+    if job_summary is not None:
+        # Store the freshly extracted summary so regenerating this CV can skip the call.
+        update_expression += ', #summary = :summary'
+        attribute_names['#summary'] = 'job_summary'
+        attribute_values[':summary'] = job_summary
+    condition = {}
+    if batch_id is not None:
+        condition['ConditionExpression'] = '#status = :pending AND #batch = :batch'
+        attribute_names['#batch'] = 'cv_batch_id'
+        attribute_values.update({':pending': 'CV_BATCH_PENDING', ':batch': batch_id})
+    if not update_job(jobId, update_expression, attribute_names, attribute_values, **condition):
+        return False
+
+    try:
+        sqs.send_message(
+            QueueUrl=EMAIL_QUEUE_URL,
+            MessageBody=json.dumps(
+                {
+                    'jobId': jobId,
+                    'title': job_item.get('title'),
+                    'company_name': job_item.get('company'),
+                    'joblink': job_item.get('joblink'),
+                    'generated_cv': generated_cv_text,
+                }
+            ),
+        )
+    except Exception:
+        # The CV was not sent: put a batch job back to pending, so the caller can still
+        # requeue it (release_batch_job) instead of it looking finished.
+        if batch_id is not None:
+            try:
+                restore_batch_job(jobId, batch_id, 'CV_GENERATED')
+            except Exception as e:
+                print(f'Could not put job ID {jobId} back to pending in batch {batch_id}: {e}')
+        raise
+    return True
+
+
+@durable_step
+def plan_cv_batch(step_context, job_ids):
+    """
+    Sort the jobs of a CV batch into those similar enough to an earlier CV to reuse its
+    sections (returned as 'reuse', to be completed by process_single_job in their own
+    steps) and those to submit ('batch'). Freshly extracted job summaries are stored on
+    the job items, so neither path extracts them again. The batch id is made here, so it
+    is checkpointed and a retried submission finds its earlier attempt.
+    """
+    gemini = make_gemini()
+    cv_obj = Loader(RESUME_PATH)
+    plan = {'batch_id': uuid.uuid4().hex, 'batch': [], 'reuse': [], 'results': []}
+
+    for jobId in job_ids:
+        try:
+            response = jobs_table().get_item(Key={'jobId': jobId})
+            if 'Item' not in response:
+                step_context.logger.info(f'Job ID {jobId} not found in DynamoDB. Skipping.')
+                plan['results'].append({'status': 'skipped', 'jobId': jobId})
+                continue
+            job_item = response['Item']
+            job_summary, summary_to_store = resolve_job_summary(
+                gemini, job_item.get('description'), job_item.get('job_summary')
+            )
+            if summary_to_store is not None:
+                update_job(
+                    jobId, 'SET #summary = :summary', {'#summary': 'job_summary'}, {':summary': summary_to_store}
+                )
+            plan['reuse' if find_reusable_cv(cv_obj, job_summary) else 'batch'].append(jobId)
+        except Exception as e:
+            step_context.logger.error(f'ERROR preparing job ID {jobId} for the batch: {e}')
+            plan['results'].append({'status': 'error', 'jobId': jobId, 'error': str(e)})
+
+    plan['usage'] = gemini.usage_events
+    return plan
+
+
+@durable_step
+def submit_cv_batch(step_context, batch_id, job_ids):
+    """
+    Submit the tailoring calls of the jobs to the Gemini Batch API as one batch and mark
+    the jobs CV_BATCH_PENDING; resume_batches_handler assembles the CVs once the results
+    are ready. The handle is stored right after the submission, and a retried step that
+    finds it stored does not submit again.
+    """
+    gemini = make_gemini()
+    cv_obj = Loader(RESUME_PATH)
+    results = []
+    stored = cv_batches.get(batch_id)
+    if stored is not None:
+        step_context.logger.info(f'Batch {batch_id} was already submitted; not submitting it again.')
+        jobs = stored['jobs']
+    else:
+        requests, jobs = {}, {}
+        for jobId in job_ids:
+            try:
+                job_item = jobs_table().get_item(Key={'jobId': jobId}).get('Item')
+                if job_item is None:
+                    results.append({'status': 'skipped', 'jobId': jobId})
+                    continue
+                job_description = job_item.get('description')
+                # Normally the summary stored by plan_cv_batch, so no model call.
+                job_summary, _ = resolve_job_summary(gemini, job_description, job_item.get('job_summary'))
+                job_requests, jobs[jobId] = batch_requests(cv_obj, job_description, job_summary, experience_cache)
+                requests.update({f'{jobId}/{section}': request for section, request in job_requests.items()})
+            except Exception as e:
+                step_context.logger.error(f'ERROR preparing job ID {jobId} for the batch: {e}')
+                results.append({'status': 'error', 'jobId': jobId, 'error': str(e)})
+        if not jobs:
+            return {'results': results, 'usage': gemini.usage_events}
+        handle = gemini.submit_batch(requests, display_name=f'cv-{batch_id}')
+        cv_batches.save(batch_id, handle, jobs)
+        step_context.logger.info(f'Submitted {len(requests)} requests for {len(jobs)} jobs as batch {batch_id}.')
+
+    for jobId in jobs:
+        update_job(
+            jobId,
+            'SET #status = :status, #batch = :batch',
+            {'#status': 'status', '#batch': 'cv_batch_id'},
+            {':status': 'CV_BATCH_PENDING', ':batch': batch_id},
+        )
+        results.append({'status': 'batch_submitted', 'jobId': jobId, 'batchId': batch_id})
+    return {'results': results, 'usage': gemini.usage_events}
+
+
+def finish_batch_job(jobId, batch_id, state, responses, cv_obj):
+    """Assemble and send the CV of one job from its batch responses (section name -> response).
+
+    Returns False when the job is no longer pending in this batch (already finished or
+    requeued by an earlier collection), in which case nothing is sent.
+    """
+    response = jobs_table().get_item(Key={'jobId': jobId})
+    if 'Item' not in response:
+        print(f'Job ID {jobId} not found in DynamoDB. Skipping.')
+        return False
+    prompts = prompts_from_batch(state, responses, experience_cache)
+    generated_cv_text = assemble_cv(prompts, cv_obj, include_certs=True)
+    if not save_cv(jobId, response['Item'], generated_cv_text, None, {'cv_source': 'batch'}, batch_id=batch_id):
+        print(f'Job ID {jobId} is no longer pending in batch {batch_id}; not sending its CV again.')
+        return False
+    index_cv(cv_obj, jobId, prompts)
+    return True
+
+
+def release_batch_job(jobId, batch_id):
+    """Mark a job pending in batch_id as requeued; False if it was no longer pending there."""
+    return update_job(
+        jobId,
+        'SET #status = :status',
+        {'#status': 'status', '#batch': 'cv_batch_id'},
+        {':status': 'CV_REQUEUED', ':pending': 'CV_BATCH_PENDING', ':batch': batch_id},
+        ConditionExpression='#status = :pending AND #batch = :batch',
+    )
+
+
+def restore_batch_job(jobId, batch_id, status):
+    """Put a job of batch_id back to CV_BATCH_PENDING from status; False if it was no longer in that status."""
+    return update_job(
+        jobId,
+        'SET #status = :pending',
+        {'#status': 'status', '#batch': 'cv_batch_id'},
+        {':status': status, ':pending': 'CV_BATCH_PENDING', ':batch': batch_id},
+        ConditionExpression='#status = :status AND #batch = :batch',
     )
 
-    step_context.logger.info(f'Sending final job details for {jobId} to EmailQueue...')
-    sqs.send_message(
-        QueueUrl=EMAIL_QUEUE_URL,
-        MessageBody=json.dumps(
-            {
-                'jobId': jobId,
-                'title': job_item.get('title'),
-                'company_name': job_item.get('company'),
-                'joblink': job_item.get('joblink'),
-                'generated_cv': generated_cv_text,
-            }
+
+def requeue_interactive(job_ids):
+    """Send jobs back to the JobsQueue flagged for interactive generation.
+
+    Failed entries and failed requests are retried with backoff, up to
+    REQUEUE_MAX_RETRIES times. Returns the job ids that could still not be sent.
+    """
+    job_ids = list(job_ids)
+    unsent = []
+    for start in range(0, len(job_ids), 10):
+        remaining = {str(index): jobId for index, jobId in enumerate(job_ids[start:start + 10])}
+        for attempt in range(REQUEUE_MAX_RETRIES + 1):
+            if attempt:
+                time.sleep(min(2 ** attempt * 0.1, 2.0))
+            try:
+                response = sqs.send_message_batch(
+                    QueueUrl=JOB_QUEUE_URL,
+                    Entries=[
+                        {'Id': index, 'MessageBody': json.dumps({'jobId': jobId, 'interactive': True})}
+                        for index, jobId in remaining.items()
+                    ],
+                )
+            except Exception as e:
+                print(f'Requeueing {len(remaining)} jobs failed: {e}')
+                continue
+            failed = response.get('Failed', [])
+            for failure in failed:
+                reason = failure.get('Message') or failure.get('Code')
+                print(f"Requeueing job ID {remaining[failure['Id']]} failed: {reason}")
+            remaining = {failure['Id']: remaining[failure['Id']] for failure in failed}
+            if not remaining:
+                break
+        unsent.extend(remaining.values())
+    return unsent
+
+
+def resume_batches_handler(event, context):
+    """
+    Scheduled handler: collects every submitted CV batch whose results are ready,
+    assembles and sends its CVs, and deletes the batch. Jobs whose requests failed, or
+    whose responses are unusable, are sent back to the JobsQueue for interactive
+    generation rather than dropped. Each job is only finished or requeued while it is
+    still CV_BATCH_PENDING in that batch (a conditional update), so collecting a batch
+    again after a partial run sends nothing twice. A batch is only deleted once all of
+    its jobs are sent or requeued; jobs that could not be either stay pending in it.
+    """
+    experience_cache.reset_counters()
+    gemini = AskGemini(model_name=Flash)
+    cv_obj = Loader(RESUME_PATH)
+    results = []
+    for batch in cv_batches.pending():
+        batch_id = batch['batchId']
+        outcome = gemini.batch_results(batch['handle'])
+        if outcome is None:
+            print(f"Batch {batch_id} is still running ({len(batch['jobs'])} jobs).")
+            continue
+
+        responses, errors = outcome
+        retry = []
+        batch_results = []
+        for jobId, state in batch['jobs'].items():
+            prefix = f'{jobId}/'
+            job_errors = [message for key, message in errors.items() if key.startswith(prefix)]
+            try:
+                if job_errors:
+                    raise ValueError('; '.join(job_errors))
+                sections = {key[len(prefix):]: value for key, value in responses.items() if key.startswith(prefix)}
+                status = 'completed' if finish_batch_job(jobId, batch_id, state, sections, cv_obj) else 'skipped'
+                batch_results.append({'status': status, 'jobId': jobId, 'batchId': batch_id})
+            except Exception as e:
+                print(f'ERROR assembling job ID {jobId} from batch {batch_id}: {e}')
+                status = 'skipped'
+                if release_batch_job(jobId, batch_id):
+                    retry.append(jobId)
+                    status = 'requeued'
+                batch_results.append({'status': status, 'jobId': jobId, 'batchId': batch_id, 'error': str(e)})
+
+        unsent = set(requeue_interactive(retry)) if retry else set()
+        for result in batch_results:
+            if result['jobId'] in unsent:
+                # Pending again, so the next collection of this batch requeues it.
+                restore_batch_job(result['jobId'], batch_id, 'CV_REQUEUED')
+                result['status'] = 'error'
+        results.extend(batch_results)
+        if unsent:
+            print(f'Could not requeue {len(unsent)} jobs of batch {batch_id}; keeping the batch for the next run.')
+            continue
+        cv_batches.delete(batch_id)
+
+    print(experience_cache.report())
+    return {
+        'statusCode': 200,
+        'body': json.dumps({'message': 'Batch collection complete.', 'results': results}),
+    }
+
+
+@durable_step
+def plan_next_wait(step_context, expected_usage):
+    """
+    Work out how long to wait before the next job so its expected Gemini usage fits the
+    rate limits. Running this as a step checkpoints the answer, so replays wait the same.
+    """
+    wait_seconds = math.ceil(rate_limiter.delay_for(expected_usage))
+    step_context.logger.info(f'Next job needs to wait {wait_seconds}s for rate-limit headroom.')
+    return wait_seconds
+
+
+def _process_job_in_child_context(child_context: DurableContext, jobId, index, job_ids):
+    return child_context.step(process_single_job(jobId))
+
+
+def process_jobs_in_parallel(context: DurableContext, job_ids):
+    """
+    Fan the jobs out with context.map, up to CV_PARALLEL_JOBS at a time. Every job is
+    its own durable step, so a failed or retried job does not hold up the others.
+    Gemini quota is shared through the in-process rate limiter instead of waits.
+    """
+    batch = context.map(
+        job_ids,
+        _process_job_in_child_context,
+        name='process_jobs',
+        config=MapConfig(
+            max_concurrency=CV_PARALLEL_JOBS,
+            completion_config=CompletionConfig.all_completed(),
         ),
     )
 
-    return {'status': 'completed', 'jobId': jobId}
+    results = []
+    for item in sorted(batch.all, key=lambda batch_item: batch_item.index):
+        jobId = job_ids[item.index]
+        if item.status is BatchItemStatus.SUCCEEDED and item.result is not None:
+            result = dict(item.result)
+            rate_limiter.load_events(result.pop('usage', None))
+            results.append(result)
+        else:
+            error = item.error.message if item.error else item.status.value
+            context.logger.error(f'ERROR processing job ID {jobId}: {error}')
+            results.append({'status': 'error', 'jobId': jobId, 'error': error})
+    return results
 
 
 @durable_execution
 def lambda_handler(event, context: DurableContext):
     """
     Durable function that processes job messages from SQS.
-    Uses context.wait() to pause for 2 minutes between jobs without compute charges.
+    Sequentially, it uses context.wait() between jobs only as long as the Gemini rate
+    limits require, without compute charges while waiting. With CV_PARALLEL_JOBS > 1
+    the jobs are fanned out concurrently instead. With CV_BATCH_MODE the jobs are
+    submitted as one Gemini batch (except those requeued as interactive, and those that
+    can reuse an earlier CV, which are processed as usual), and resume_batches_handler
+    finishes them.
     """
     results = []
     records = event.get('Records', [])
+    expected_usage = DEFAULT_CV_USAGE
+    experience_cache.reset_counters()
 
-    for i, record in enumerate(records):
+    job_ids = []
+    batch_job_ids = []
+    for record in records:
         try:
-            message_body = json.loads(record['body'])
-            jobId = message_body.get('jobId')
+            body = json.loads(record['body'])
+            jobId = body.get('jobId')
+        except Exception as e:
+            context.logger.error(f'ERROR reading record: {e}')
+            results.append({'status': 'error', 'jobId': 'Unknown', 'error': str(e)})
+            continue
+        if not jobId:
+            context.logger.info('Skipping record due to missing jobId.')
+            continue
+        if CV_BATCH_MODE and not body.get('interactive'):
+            batch_job_ids.append(jobId)
+        else:
+            job_ids.append(jobId)
 
-            if not jobId:
-                context.logger.info('Skipping record due to missing jobId.')
-                continue
+    if batch_job_ids:
+        try:
+            plan = context.step(plan_cv_batch(batch_job_ids))
+            rate_limiter.load_events(plan.get('usage'))
+            results.extend(plan['results'])
+            # Reusable jobs go through process_single_job, one checkpointed step each.
+            job_ids.extend(plan['reuse'])
+            batch_job_ids = plan['batch']
+            if batch_job_ids:
+                submitted = context.step(submit_cv_batch(plan['batch_id'], batch_job_ids))
+                rate_limiter.load_events(submitted.get('usage'))
+                results.extend(submitted['results'])
+        except Exception as e:
+            context.logger.error(f'ERROR submitting the CV batch: {e}')
+            results.extend({'status': 'error', 'jobId': jobId, 'error': str(e)} for jobId in batch_job_ids)
+
+    if CV_PARALLEL_JOBS > 1 and len(job_ids) > 1:
+        results.extend(process_jobs_in_parallel(context, job_ids))
+        job_ids = []
 
+    for i, jobId in enumerate(job_ids):
+        try:
             result = context.step(process_single_job(jobId))
+            usage_events = result.pop('usage', None)
             results.append(result)
+            if usage_events:
+                rate_limiter.load_events(usage_events)
+                expected_usage = summarize_usage(usage_events)
 
-            if i < len(records) - 1:
-                context.logger.info('Waiting 2 minutes before next job...')
-                context.wait(120)
+            if i < len(job_ids) - 1:
+                wait_seconds = context.step(plan_next_wait(expected_usage))
+                if wait_seconds > 0:
+                    context.logger.info(f'Waiting {wait_seconds}s before next job...')
+                    context.wait(Duration.from_seconds(wait_seconds))
 
         except Exception as e:
-            context.logger.error(
-                f"ERROR processing job ID {jobId if 'jobId' in locals() else 'Unknown'}: {e}"
-            )
-            results.append(
-                {
-                    'status': 'error',
-                    'jobId': jobId if 'jobId' in locals() else 'Unknown',
-                    'error': str(e),
-                }
-            )
+            context.logger.error(f'ERROR processing job ID {jobId}: {e}')
+            results.append({'status': 'error', 'jobId': jobId, 'error': str(e)})
             continue
 
+    context.logger.info(experience_cache.report())
+    context.logger.info(latency_tracker.report())
+    context.logger.info(circuit_breaker.report())
     return {
         'statusCode': 200,
         'body': json.dumps({'message': 'Processing complete.', 'results': results}),
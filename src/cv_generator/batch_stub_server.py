@@ -0,0 +1,258 @@
+"""Local stand-in for the Gemini API endpoints used by the CV generator.
+
+Serves generateContent and the Batch API (batchGenerateContent, batches.get) over HTTP
+on localhost, so AskGemini can be pointed at it with GEMINI_BASE_URL. Responses are
+synthetic: a request with a JSON response schema gets the smallest value matching the
+schema (honoring minItems/minProperties), any other request gets a short text. Batch
+jobs stay running for --delay seconds.
+
+Examples (run from src/cv_generator):
+
+    python batch_stub_server.py serve --port 8765 --delay 30
+    GEMINI_BASE_URL=http://127.0.0.1:8765 GEMINI_API_KEY=stub python ...
+
+    python batch_stub_server.py selftest    # a full batch CV round trip against the stub
+
+selftest uses config/resume.yaml and config/cv_summary.txt, falling back to
+config/cv_summary.sample.txt when the latter is missing.
+"""
+import argparse
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_GENERATE_RE = re.compile(r'^/v1beta/models/(?P<model>[^/:]+):(?P<method>generateContent|batchGenerateContent)$')
+_BATCH_RE = re.compile(r'^/v1beta/(?P<name>batches/[^/:]+)$')
+
+
+def example_for(schema):
+    """Smallest JSON value matching the subset of JSON Schema used by gen_ai.schemas."""
+    kind = schema.get('type')
+    if 'enum' in schema:
+        return schema['enum'][0]
+    if kind == 'object':
+        value = {key: example_for(schema['properties'][key]) for key in schema.get('required', [])}
+        extra = schema.get('additionalProperties')
+        for index in range(len(value), schema.get('minProperties', 0)):
+            value[f'Category {index + 1}'] = example_for(extra) if isinstance(extra, dict) else 'stub'
+        return value
+    if kind == 'array':
+        return [example_for(schema.get('items', {})) for _ in range(max(1, schema.get('minItems', 1)))]
+    if kind in ('integer', 'number'):
+        return schema.get('minimum', 1)
+    if kind == 'boolean':
+        return True
+    return 'stub'
+
+
+def _response_text(request):
+    config = request.get('generationConfig') or {}
+    schema = config.get('responseJsonSchema') or config.get('responseSchema')
+    if schema:
+        return json.dumps(example_for(schema))
+    prompt = ''.join(
+        part.get('text', '') for content in request.get('contents', []) for part in content.get('parts', [])
+    )
+    return f'Stub response to a {len(prompt)}-character prompt.'
+
+
+def _generate_content_response(request):
+    text = _response_text(request)
+    return {
+        'candidates': [{'content': {'role': 'model', 'parts': [{'text': text}]}, 'finishReason': 'STOP'}],
+        'usageMetadata': {'totalTokenCount': len(json.dumps(request)) // 4 + len(text) // 4},
+    }
+
+
+class StubState:
+    """Batch jobs submitted to the stub, by name."""
+
+    def __init__(self, delay=0.0, fail_keys=()):
+        self.delay = delay
+        self.fail_keys = set(fail_keys)
+        self.batches = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def create(self, model, body):
+        batch = body.get('batch', body)
+        requests = batch.get('inputConfig', {}).get('requests', {}).get('requests', [])
+        with self._lock:
+            name = f'batches/stub-{next(self._ids)}'
+            self.batches[name] = {
+                'model': f'models/{model}',
+                'displayName': batch.get('displayName', ''),
+                'requests': requests,
+                'created': time.monotonic(),
+            }
+        return self.get(name)
+
+    def get(self, name):
+        batch = self.batches.get(name)
+        if batch is None:
+            return None
+        metadata = {
+            '@type': 'type.googleapis.com/google.ai.generativelanguage.v1main.GenerateContentBatch',
+            'model': batch['model'],
+            'displayName': batch['displayName'],
+            'state': 'BATCH_STATE_RUNNING',
+        }
+        if time.monotonic() - batch['created'] >= self.delay:
+            metadata['state'] = 'BATCH_STATE_SUCCEEDED'
+            responses = []
+            for entry in batch['requests']:
+                key = (entry.get('metadata') or {}).get('key')
+                if key in self.fail_keys:
+                    responses.append({'error': {'code': 500, 'message': 'Stub failure.'}, 'metadata': entry.get('metadata')})
+                else:
+                    responses.append({
+                        'response': _generate_content_response(entry.get('request', {})),
+                        'metadata': entry.get('metadata'),
+                    })
+            metadata['output'] = {'inlinedResponses': {'inlinedResponses': responses}}
+        return {'name': name, 'metadata': metadata, 'done': metadata['state'] == 'BATCH_STATE_SUCCEEDED'}
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            match = _GENERATE_RE.match(self.path.split('?')[0])
+            if not match:
+                return self._send(404, {'error': {'code': 404, 'message': f'Unknown path {self.path}'}})
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length) or b'{}')
+            if match['method'] == 'generateContent':
+                return self._send(200, _generate_content_response(body))
+            return self._send(200, state.create(match['model'], body))
+
+        def do_GET(self):
+            match = _BATCH_RE.match(self.path.split('?')[0])
+            batch = state.get(match['name']) if match else None
+            if batch is None:
+                return self._send(404, {'error': {'code': 404, 'message': f'Unknown path {self.path}'}})
+            return self._send(200, batch)
+
+        def log_message(self, format, *args):
+            if os.environ.get('STUB_VERBOSE'):
+                super().log_message(format, *args)
+
+    return Handler
+
+
+def start_server(port=0, delay=0.0, fail_keys=()):
+    """Start the stub in a daemon thread; returns (server, base URL)."""
+    state = StubState(delay, fail_keys)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def serve(args):
+    server, url = start_server(args.port, args.delay, args.fail_key)
+    print(f'Gemini stub listening on {url} (batch delay {args.delay}s). Ctrl+C to stop.')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+def selftest(args):
+    """Run batch_requests -> submit_batch -> batch_results -> prompts_from_batch -> assemble_cv."""
+    server, url = start_server(delay=args.delay, fail_keys=args.fail_key)
+    os.environ['GEMINI_BASE_URL'] = url
+    os.environ.setdefault('GEMINI_API_KEY', 'stub')
+    try:
+        from cv_tools import create_cv
+        from cv_tools.create_cv import assemble_cv, batch_requests, prompts_from_batch
+        from cv_tools.yaml_parser import Loader
+        from gen_ai.gemini import AskGemini
+        from gen_ai.model_names import Flash
+    except ModuleNotFoundError:
+        from cv_generator.cv_tools import create_cv
+        from cv_generator.cv_tools.create_cv import assemble_cv, batch_requests, prompts_from_batch
+        from cv_generator.cv_tools.yaml_parser import Loader
+        from cv_generator.gen_ai.gemini import AskGemini
+        from cv_generator.gen_ai.model_names import Flash
+
+    config_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config')
+    # config/cv_summary.txt is personal and not committed; the sample is enough for the stub.
+    if not os.path.exists(os.path.join(config_dir, 'cv_summary.txt')):
+        print('config/cv_summary.txt not found; running with cv_summary.sample.txt.')
+        with open(os.path.join(config_dir, 'cv_summary.sample.txt'), 'r', encoding='utf-8') as f:
+            profile_summary = f.read()
+        create_cv._load_profile_summary = lambda: profile_summary
+
+    cv = Loader(os.path.join(config_dir, 'resume.yaml'))
+    job_summary = {
+        'technical_skills': ['Python', 'AWS'],
+        'core_responsibilities': ['Build services'],
+        'qualifications_and_preferences': [],
+        'keywords': [{'keyword': 'Python', 'importance': 5}, {'keyword': 'AWS', 'importance': 4}],
+    }
+    gemini = AskGemini(model_name=Flash)
+    requests, states = {}, {}
+    for job_id in ('job-1', 'job-2'):
+        job_requests, states[job_id] = batch_requests(cv, 'Python engineer on AWS.', job_summary)
+        requests.update({f'{job_id}/{section}': request for section, request in job_requests.items()})
+
+    handle = json.loads(json.dumps(gemini.submit_batch(requests, display_name='selftest')))
+    outcome = gemini.batch_results(handle)
+    while outcome is None:
+        time.sleep(0.2)
+        outcome = gemini.batch_results(handle)
+    responses, errors = outcome
+
+    failed = 0
+    for job_id, state in states.items():
+        prefix = f'{job_id}/'
+        job_errors = {key: message for key, message in errors.items() if key.startswith(prefix)}
+        if job_errors:
+            print(f'{job_id}: request errors {job_errors}')
+            failed += 1
+            continue
+        sections = {key[len(prefix):]: value for key, value in responses.items() if key.startswith(prefix)}
+        cv_text = assemble_cv(prompts_from_batch(state, sections), cv)
+        print(f'{job_id}: assembled a {len(cv_text)}-character CV from {len(sections)} batch responses.')
+    server.shutdown()
+    print(f"{len(handle['jobs'])} batch jobs, {len(responses)} responses, {len(errors)} errors.")
+    expected_failures = len({key.split('/')[0] for key in args.fail_key})
+    return 0 if failed == expected_failures else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--delay', type=float, default=0.5, help='Seconds a batch job stays running.')
+    parser.add_argument('--fail-key', action='append', default=[],
+                        help='Batch request key (jobId/section) to answer with an error; repeatable.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = commands.add_parser('serve', help='Run the stub until interrupted.')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    serve_parser.set_defaults(func=serve)
+
+    selftest_parser = commands.add_parser('selftest', help='Round-trip two batch CVs through the stub.')
+    selftest_parser.set_defaults(func=selftest)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
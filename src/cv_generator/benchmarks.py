@@ -0,0 +1,310 @@
+"""Micro-benchmarks for the CV generator's text-processing hot spots.
+
+Each benchmark times the current implementation against a reference copy of the
+implementation it replaced, on synthetic inputs, and checks that both produce the
+same output.
+
+Examples (run from src/cv_generator):
+
+    python benchmarks.py highlight --keywords 20 200 2000 --text-kb 4 32
+    python benchmarks.py escape --text-kb 1 8 64
+    python benchmarks.py hedge --pipelines 200 --straggler-rate 0.05
+
+hedge compares pipelines of four sequential model calls against a simulated model with
+and without ResilientLLM's p95 hedging; there is no reference implementation to match.
+"""
+import argparse
+import random
+import threading
+import re
+import string
+import sys
+import time
+
+# Support both package layouts:
+# - CodeUri: src/cv_generator (imports like 'cv_tools.*')
+# - CodeUri: src (imports like 'cv_generator.cv_tools.*')
+try:
+    from cv_tools.highlighter import LatexHighlighter
+    from gen_ai.llm_interface import LLM_interface
+    from gen_ai.resilience import LatencyTracker, ResilientLLM
+    from latex.escaping import escape_latex, escape_latex_in_json
+except ModuleNotFoundError:
+    from cv_generator.cv_tools.highlighter import LatexHighlighter
+    from cv_generator.gen_ai.llm_interface import LLM_interface
+    from cv_generator.gen_ai.resilience import LatencyTracker, ResilientLLM
+    from cv_generator.latex.escaping import escape_latex, escape_latex_in_json
+
+
+class ReferenceHighlighter(LatexHighlighter):
+    """The per-keyword regex highlighter that LatexHighlighter.highlight replaced."""
+
+    def _reindex(self):
+        super()._reindex()
+        self._patterns = {
+            k: re.compile(rf"(?<!\w)({re.escape(k)})(?!\w)", flags=re.IGNORECASE) for k in self._importance
+        }
+
+    def highlight(self, text):
+        if not isinstance(text, str) or not text:
+            return text
+
+        added = 0
+        spans = self._bold_spans(text)
+        for kw in self._order:
+            if added >= self._max_per_text:
+                break
+            if self._counts.get(kw, 0) >= self._max_per_keyword:
+                continue
+
+            pat = self._patterns[kw]
+            m = pat.search(text)
+            while m and any(s <= m.start() < e for s, e in spans):
+                m = pat.search(text, m.end())
+            if not m:
+                continue
+
+            start, end = m.start(), m.end()
+            replacement = "\\textbf{" + text[start:end] + "}"
+            text = text[:start] + replacement + text[end:]
+            delta = len(replacement) - (end - start)
+            spans = [(s if s < start else s + delta, e if e < start else e + delta) for (s, e) in spans]
+            spans.append((start, start + len(replacement)))
+            self._counts[kw] = self._counts.get(kw, 0) + 1
+            added += 1
+        return text
+
+
+def reference_escape_latex(text):
+    """gemini.escape_latex before the unified escaper (regex compiled per call)."""
+    if not isinstance(text, str):
+        return text
+    special_chars = {
+        '&': r'\&', '%': r'\%', '$': r'\$', '#': r'\#', '_': r'\_',
+        '{': r'\{', '}': r'\}', '~': r'\textasciitilde{}',
+        '^': r'\textasciicircum{}', '\\': r'\textbackslash{}',
+    }
+    pattern = re.compile('|'.join(re.escape(k) for k in special_chars.keys()))
+    return pattern.sub(lambda m: special_chars[m.group(0)], text)
+
+
+def reference_escape_latex_in_json(data):
+    if isinstance(data, dict):
+        return {key: reference_escape_latex_in_json(value) for key, value in data.items()}
+    elif isinstance(data, list):
+        return [reference_escape_latex_in_json(element) for element in data]
+    elif isinstance(data, str):
+        return reference_escape_latex(data)
+    return data
+
+
+def reference_fix_latex_special_chars(text):
+    """map_to_latex.fix_latex_special_chars before the unified escaper (list pop/insert)."""
+    special_chars = {
+        '#': r'\#', '$': r'\$', '%': r'\%', '&': r'\&', '_': r'\_',
+        '{': r'\{', '}': r'\}', '~': r'\~', '^': r'\^',
+    }
+    chars = list(text)
+    i = 0
+    while i < len(chars):
+        if chars[i] in special_chars and (i == 0 or chars[i - 1] != '\\'):
+            replacement = special_chars[chars[i]]
+            chars.pop(i)
+            for j, rep_char in enumerate(replacement):
+                chars.insert(i + j, rep_char)
+            i += len(replacement)
+        else:
+            i += 1
+    return ''.join(chars)
+
+
+def reference_sanitize_latex(text):
+    """map_to_latex.sanitize_latex before the unified escaper (chained str.replace)."""
+    replacements = {
+        '&': r'\\&', '%': r'\\%', '$': r'\\$', '#': r'\\#', '_': r'\\_',
+        '{': r'\\{', '}': r'\\}', '~': r'\\textasciitilde{}',
+        '^': r'\\textasciicircum{}', '\\': r'\\textbackslash{}',
+    }
+    for char, replacement in replacements.items():
+        text = text.replace(char, replacement)
+    return text
+
+
+def _timeit(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        length = rng.randint(2, 10)
+        words.add(''.join(rng.choice(string.ascii_lowercase) for _ in range(length)))
+    return sorted(words)
+
+
+def _highlight_case(n_keywords, text_kb, rng):
+    vocabulary = _vocabulary(max(200, n_keywords * 2), rng)
+    keywords = []
+    for _ in range(n_keywords):
+        term = ' '.join(rng.sample(vocabulary, rng.choice((1, 1, 1, 2))))
+        keywords.append({'keyword': term.title() if rng.random() < 0.3 else term, 'importance': rng.randint(1, 5)})
+
+    words = []
+    while sum(len(word) + 1 for word in words) < text_kb * 1024:
+        roll = rng.random()
+        if roll < 0.05:
+            words.append('\\textbf{' + rng.choice(vocabulary) + '}')
+        elif roll < 0.1:
+            words.append(rng.choice(vocabulary) + rng.choice(',.;') + '\n')
+        else:
+            words.append(rng.choice(vocabulary))
+    sections = [' '.join(words[i::4]) for i in range(4)]
+    return keywords, sections
+
+
+def bench_highlight(args):
+    rng = random.Random(args.seed)
+    print(f"{'keywords':>8} {'text KB':>8} {'reference ms':>13} {'current ms':>11} {'speedup':>8}")
+    for n_keywords in args.keywords:
+        for text_kb in args.text_kb:
+            keywords, sections = _highlight_case(n_keywords, text_kb, rng)
+
+            def run(cls):
+                highlighter = cls(keywords)
+                return [highlighter.highlight(section) for section in sections]
+
+            if run(ReferenceHighlighter) != run(LatexHighlighter):
+                print(f'Output mismatch for {n_keywords} keywords, {text_kb} KB.')
+                return 1
+            reference = _timeit(lambda: run(ReferenceHighlighter), args.repeat)
+            current = _timeit(lambda: run(LatexHighlighter), args.repeat)
+            print(
+                f'{n_keywords:>8} {text_kb:>8} {reference * 1000:>13.2f} {current * 1000:>11.2f} '
+                f'{reference / current:>7.1f}x'
+            )
+    return 0
+
+
+def _escape_text(text_kb, rng, special_rate=0.03):
+    specials = '&%$#_{}~^\\'
+    plain = string.ascii_letters + string.digits + ' ' * 12 + '.,;:()-'
+    size = text_kb * 1024
+    return ''.join(rng.choice(specials) if rng.random() < special_rate else rng.choice(plain) for _ in range(size))
+
+
+def bench_escape(args):
+    rng = random.Random(args.seed)
+    print(f"{'function':<34} {'text KB':>8} {'reference ms':>13} {'current ms':>11} {'speedup':>8}")
+    for text_kb in args.text_kb:
+        text = _escape_text(text_kb, rng)
+        plain_text = text.replace('\\', '/')
+        # Raw backslashes before a special character read as escape sequences now, so
+        # compare with the reference on text without backslashes only.
+        if escape_latex(plain_text) != reference_escape_latex(plain_text):
+            print(f'escape_latex differs from the reference at {text_kb} KB.')
+            return 1
+        escaped = escape_latex(text)
+        if escape_latex(escaped) != escaped:
+            print(f'escape_latex escaped already escaped text again at {text_kb} KB.')
+            return 1
+        # A parsed model response: a list of entries with a few strings each.
+        chunk = max(1, len(text) // 200)
+        response = [
+            {'bullet_points': [text[i:i + chunk] for i in range(start, start + 4 * chunk, chunk)], 'skills': 'Python'}
+            for start in range(0, len(text) - 4 * chunk, 4 * chunk)
+        ]
+        cases = [
+            ('escape_latex', reference_escape_latex, escape_latex, text),
+            ('escape_latex (no backslashes)', reference_escape_latex, escape_latex, plain_text),
+            ('escape_latex_in_json', reference_escape_latex_in_json, escape_latex_in_json, response),
+            ('fix_latex_special_chars', reference_fix_latex_special_chars, escape_latex, text),
+            ('sanitize_latex', reference_sanitize_latex, escape_latex, text),
+        ]
+        for name, reference_func, current_func, value in cases:
+            reference = _timeit(lambda: reference_func(value), args.repeat)
+            current = _timeit(lambda: current_func(value), args.repeat)
+            print(
+                f'{name:<34} {text_kb:>8} {reference * 1000:>13.3f} {current * 1000:>11.3f} '
+                f'{reference / current:>7.1f}x'
+            )
+    return 0
+
+
+class SimulatedModel(LLM_interface):
+    """Model whose calls take a lognormal time, with occasional stragglers 10x slower."""
+
+    def __init__(self, median_ms, straggler_rate, seed):
+        super().__init__()
+        self._model_name = 'simulated'
+        self._median = median_ms / 1000
+        self._straggler_rate = straggler_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def ask(self, prompt, be_json=False, model=None):
+        with self._lock:
+            delay = self._median * self._rng.lognormvariate(0, 0.3)
+            if self._rng.random() < self._straggler_rate:
+                delay *= 10
+        time.sleep(delay)
+        self._observe_latency(model or self._model_name, delay)
+        return prompt
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def bench_hedge(args):
+    print(f"{'mode':<10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'hedges':>7}")
+    for hedge in (False, True):
+        tracker = LatencyTracker()
+        llm = ResilientLLM(
+            SimulatedModel(args.median_ms, args.straggler_rate, args.seed), latency=tracker, hedge=hedge
+        )
+        timings = []
+        for _ in range(args.pipelines):
+            start = time.perf_counter()
+            for call in range(4):
+                llm.ask(f'call {call}')
+            timings.append((time.perf_counter() - start) * 1000)
+        print(
+            f"{'hedged' if hedge else 'plain':<10} {_percentile(timings, 0.5):>8.1f} {_percentile(timings, 0.95):>8.1f} "
+            f"{_percentile(timings, 0.99):>8.1f} {max(timings):>8.1f} {tracker.hedged:>7}"
+        )
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='Best-of-N timing repetitions.')
+    parser.add_argument('--seed', type=int, default=7)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    highlight = commands.add_parser('highlight', help='LatexHighlighter.highlight vs per-keyword regexes.')
+    highlight.add_argument('--keywords', type=int, nargs='+', default=[20, 200, 2000])
+    highlight.add_argument('--text-kb', type=int, nargs='+', default=[4, 32])
+    highlight.set_defaults(func=bench_highlight)
+
+    escape = commands.add_parser('escape', help='Unified LaTeX escaper vs the three escapers it replaced.')
+    escape.add_argument('--text-kb', type=int, nargs='+', default=[1, 8, 64])
+    escape.set_defaults(func=bench_escape)
+
+    hedge = commands.add_parser('hedge', help='Four-call pipeline latency with and without p95 hedging.')
+    hedge.add_argument('--pipelines', type=int, default=200)
+    hedge.add_argument('--median-ms', type=float, default=20.0)
+    hedge.add_argument('--straggler-rate', type=float, default=0.05)
+    hedge.set_defaults(func=bench_hedge)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,709 @@
+"""Assertion checks for the CV generator's pure-logic modules.
+
+Each check exercises one module on small fixed inputs and asserts its behaviour;
+nothing touches AWS, and the only network use is the local Batch API stub
+(batch_stub_server). The exit status is non-zero when a check fails.
+
+Examples (run from src/cv_generator):
+
+    python checks.py                       # every check
+    python checks.py run_prompts           # only the named checks
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from types import SimpleNamespace
+from unittest import mock
+
+from botocore.exceptions import ClientError
+
+# Support both package layouts:
+# - CodeUri: src/cv_generator (imports like 'gen_ai.*')
+# - CodeUri: src (imports like 'cv_generator.gen_ai.*')
+try:
+    import batch_stub_server
+    from cv_tools import create_cv
+    from cv_tools.cv_index import SimilarCVIndex, summary_vector
+    from cv_tools.experience_cache import ExperienceCache, entry_hash, keyword_signature
+    from cv_tools.yaml_parser import Loader
+    from gen_ai.json_stream import JSONStreamParser
+    from gen_ai.llm_interface import LLM_interface
+    from gen_ai.model_names import Pro
+    from gen_ai.rate_limiter import BASE_BACKOFF_SECONDS, RateLimiter
+    from gen_ai.resilience import CircuitBreaker, ResilientLLM
+    from gen_ai.schemas import EXPERIENCE_SCHEMA, SKILLS_SCHEMA, SUMMARY_SCHEMA, schema_version, summary_version, validate
+    from latex.escaping import escape_latex, escape_latex_in_json
+except ModuleNotFoundError:
+    from cv_generator import batch_stub_server
+    from cv_generator.cv_tools import create_cv
+    from cv_generator.cv_tools.cv_index import SimilarCVIndex, summary_vector
+    from cv_generator.cv_tools.experience_cache import ExperienceCache, entry_hash, keyword_signature
+    from cv_generator.cv_tools.yaml_parser import Loader
+    from cv_generator.gen_ai.json_stream import JSONStreamParser
+    from cv_generator.gen_ai.llm_interface import LLM_interface
+    from cv_generator.gen_ai.model_names import Pro
+    from cv_generator.gen_ai.rate_limiter import BASE_BACKOFF_SECONDS, RateLimiter
+    from cv_generator.gen_ai.resilience import CircuitBreaker, ResilientLLM
+    from cv_generator.gen_ai.schemas import (
+        EXPERIENCE_SCHEMA, SKILLS_SCHEMA, SUMMARY_SCHEMA, schema_version, summary_version, validate,
+    )
+    from cv_generator.latex.escaping import escape_latex, escape_latex_in_json
+
+SAMPLE_RESUME = 'config/resume.sample.yaml'
+
+
+@contextmanager
+def _patched(module, **values):
+    """Temporarily replace module or class attributes."""
+    saved = {name: getattr(module, name) for name in values}
+    for name, value in values.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
+
+
+class _FakeTable:
+    def __init__(self, key_name):
+        self.key_name = key_name
+        self.items = {}
+
+    def put_item(self, Item):
+        self.items[Item[self.key_name]] = dict(Item)
+
+    def get_item(self, Key):
+        item = self.items.get(Key[self.key_name])
+        return {'Item': dict(item)} if item is not None else {}
+
+    def delete_item(self, Key):
+        self.items.pop(Key[self.key_name], None)
+
+    def scan(self, **kwargs):
+        return {'Items': [dict(item) for item in self.items.values()]}
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return _FakeBatchWriter(self)
+
+
+class _FakeBatchWriter:
+    def __init__(self, table):
+        self._table = table
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def put_item(self, Item):
+        self._table.put_item(Item=Item)
+
+
+class _FakeDynamoDB:
+    """In-memory stand-in for the DynamoDB resource.
+
+    The first BatchGetItem leaves its first `unprocessed` keys unprocessed.
+    """
+
+    def __init__(self, key_names, unprocessed=0):
+        self.tables = {name: _FakeTable(key_name) for name, key_name in key_names.items()}
+        self.unprocessed = unprocessed
+        self.batch_gets = 0
+
+    def Table(self, name):
+        return self.tables[name]
+
+    def batch_get_item(self, RequestItems):
+        self.batch_gets += 1
+        (name, request), = RequestItems.items()
+        table = self.tables[name]
+        keys, skipped = request['Keys'][self.unprocessed:], request['Keys'][:self.unprocessed]
+        self.unprocessed = 0
+        response = {'Responses': {name: [dict(table.items[key[table.key_name]]) for key in keys
+                                         if key[table.key_name] in table.items]}}
+        if skipped:
+            response['UnprocessedKeys'] = {name: {'Keys': skipped}}
+        return response
+
+
+class _RecordingModel(LLM_interface):
+    """Answers each CV call after `latency` seconds and records when it ran, and with which model."""
+
+    def __init__(self, latency=0.05):
+        super().__init__()
+        self._latency = latency
+        self._lock = threading.Lock()
+        self.calls = {}
+
+    def _record(self, name, model, start):
+        with self._lock:
+            self.calls[name] = (start, time.monotonic(), model)
+
+    def ask(self, prompt, be_json=False, model=None):
+        start = time.monotonic()
+        time.sleep(self._latency)
+        self._record('profile', model, start)
+        return ['Built Android apps.']
+
+    def ask_json_text(self, prompt, schema, model=None):
+        start = time.monotonic()
+        time.sleep(self._latency)
+        if schema is SUMMARY_SCHEMA:
+            name, value = 'summary', {
+                'technical_skills': ['Kotlin'], 'core_responsibilities': [], 'qualifications_and_preferences': [],
+                'keywords': [{'keyword': 'Kotlin', 'importance': 5}],
+            }
+        elif schema is SKILLS_SCHEMA:
+            name, value = 'skills', {'Languages': ['Kotlin']}
+        else:
+            assert schema is EXPERIENCE_SCHEMA, schema
+            name, value = 'experience', [{'bullet_points': ['Shipped.']}] * prompt.count('Company:')
+        self._record(name, model, start)
+        return json.dumps(value)
+
+
+def check_run_prompts():
+    cv = Loader(SAMPLE_RESUME)
+    with _patched(create_cv, _load_profile_summary=lambda: 'Android developer.'):
+        model = _RecordingModel()
+        prompts = create_cv.run_prompts(model, cv, 'Kotlin developer wanted.', concurrency=3)
+        calls = model.calls
+        assert sorted(calls) == ['experience', 'profile', 'skills', 'summary'], calls
+        # Skills and experience need the summary; the profile bullets do not.
+        assert calls['skills'][0] >= calls['summary'][1] and calls['experience'][0] >= calls['summary'][1]
+        assert calls['profile'][0] < calls['summary'][1]
+        # Skills and experience overlap, and only experience uses Pro.
+        assert calls['skills'][0] < calls['experience'][1] and calls['experience'][0] < calls['skills'][1]
+        assert calls['experience'][2] == Pro and calls['skills'][2] is None and calls['profile'][2] is None
+        assert prompts['skills_response'] == {'Languages': ['Kotlin']}
+        assert len(prompts['experience_response']) == len(cv.get_value('experience_details')) > 0
+        assert prompts['job_summary']['keywords'][0]['keyword'] == 'Kotlin'
+
+        # A known job summary skips the summary call; one worker runs the calls in turn.
+        model = _RecordingModel(latency=0.01)
+        known = create_cv.run_prompts(model, cv, 'Kotlin developer wanted.', concurrency=1,
+                                      job_summary=prompts['job_summary'])
+        assert sorted(model.calls) == ['experience', 'profile', 'skills'], model.calls
+        assert known['job_summary'] is prompts['job_summary']
+        assert known['experience_response'] == prompts['experience_response']
+
+
+def check_rate_limiter():
+    limiter = RateLimiter({'m': {'rpm': 2, 'tpm': 100}})
+    now = time.time()
+    events = [
+        {'id': 'a', 'model': 'm', 'tokens': 60, 'at': now - 10},
+        {'id': 'b', 'model': 'm', 'tokens': 30, 'at': now - 5},
+    ]
+    limiter.load_events(events)
+    # Loading the same events again (a replayed checkpoint) changes nothing.
+    limiter.load_events(events)
+    # Both requests are used: wait until the oldest leaves the window.
+    assert abs(limiter.delay_for({'m': {'requests': 1, 'tokens': 1}}, now) - 50) < 1e-6
+    # Events older than the window no longer count.
+    assert limiter.delay_for({'m': {'requests': 1, 'tokens': 1}}, now + 56) == 0
+
+    tokens = RateLimiter({'m': {'rpm': 100, 'tpm': 100}})
+    tokens.load_events(events)
+    assert tokens.delay_for({'m': {'requests': 1, 'tokens': 10}}, now) == 0
+    # 90 used + 50 planned needs 40 tokens freed: only the 60-token event does that.
+    assert abs(tokens.delay_for({'m': {'requests': 1, 'tokens': 50}}, now) - 50) < 1e-6
+    # 90 + 80 needs both events gone.
+    assert abs(tokens.delay_for({'m': {'requests': 1, 'tokens': 80}}, now) - 55) < 1e-6
+    # Other models have their own windows.
+    assert tokens.delay_for({'other': {'requests': 1, 'tokens': 10}}, now) == 0
+
+    fresh = RateLimiter({'m': {'rpm': 2, 'tpm': 100}})
+    event = fresh.acquire('m', 40)
+    fresh.settle(event, 90)
+    assert fresh.delay_for({'m': {'requests': 1, 'tokens': 20}}) > 0
+
+    # 429s double the backoff; successes halve it until it drops below the base.
+    assert fresh.throttled('m') == BASE_BACKOFF_SECONDS
+    assert fresh.throttled('m') == 2 * BASE_BACKOFF_SECONDS
+    assert fresh.delay_for({'m': {'requests': 0, 'tokens': 0}}) > BASE_BACKOFF_SECONDS
+    fresh.succeeded('m')
+    fresh.succeeded('m')
+    assert fresh.throttled('m') == BASE_BACKOFF_SECONDS
+
+
+def check_job_summary():
+    summary = {'technical_skills': ['C#'], 'core_responsibilities': [], 'qualifications_and_preferences': [],
+               'keywords': [{'keyword': 'R&D', 'importance': 5}]}
+    escaped = dict(summary, technical_skills=[r'C\#'], keywords=[{'keyword': r'R\&D', 'importance': 5}])
+    assert create_cv.SUMMARY_VERSION == summary_version(SUMMARY_SCHEMA, create_cv.summary_prompt, create_cv.SUMMARY_MODEL)
+
+    # The generator's own summaries are reused while schema, prompt and model are unchanged.
+    stored = create_cv.dump_job_summary(escaped)
+    assert json.loads(stored)['source'] == 'cv_generator'
+    assert create_cv.load_stored_job_summary(stored) == escaped
+    outdated = dict(json.loads(stored), version=summary_version(SUMMARY_SCHEMA, 'old prompt', create_cv.SUMMARY_MODEL))
+    assert create_cv.load_stored_job_summary(outdated) is None
+    # Tags from before prompts were hashed in (schema only) are outdated too.
+    assert create_cv.load_stored_job_summary(dict(outdated, version=schema_version(SUMMARY_SCHEMA))) is None
+
+    # The job finder's summaries carry its own prompt's tag and only need a matching schema.
+    finder = {'version': summary_version(SUMMARY_SCHEMA, 'finder prompt', 'gemma'), 'source': 'job_finder',
+              'latex_escaped': False, 'summary': summary}
+    assert create_cv.load_stored_job_summary(json.dumps(finder)) == escaped
+    other_schema = summary_version(dict(SUMMARY_SCHEMA, required=[]), 'finder prompt', 'gemma')
+    assert create_cv.load_stored_job_summary(dict(finder, version=other_schema)) is None
+    assert create_cv.load_stored_job_summary(dict(finder, source='cv_generator')) is None
+    for unusable in (None, '', 'not json', '[]', dict(finder, summary={'keywords': 'x'})):
+        assert create_cv.load_stored_job_summary(unusable) is None, unusable
+
+
+def check_experience_cache():
+    keywords = [{'keyword': 'Kotlin', 'importance': 5}, {'keyword': ' Android  SDK', 'importance': 4}, 'Git']
+    signature = keyword_signature(keywords)
+    assert signature == 'android sdk|git|kotlin'
+    assert keyword_signature(list(reversed(keywords))) == signature
+    assert keyword_signature(keywords, top_n=2) == 'android sdk|kotlin'
+    assert keyword_signature([{'keyword': 'X', 'importance': 'high'}, {'keyword': ''}]) == 'x'
+
+    cv = Loader(SAMPLE_RESUME)
+    entries = cv.get_value('experience_details')
+    # The frozen resume data hashes like the plain JSON it came from.
+    unfreeze = lambda value: dict(value) if hasattr(value, 'items') else list(value)  # noqa: E731
+    plain = json.loads(json.dumps(entries[0], default=unfreeze))
+    assert entry_hash(entries[0]) == entry_hash(plain)
+    assert entry_hash(entries[0]) != entry_hash(entries[1])
+
+    dynamodb = _FakeDynamoDB({'Experience': 'cacheKey'}, unprocessed=1)
+    cache = ExperienceCache(dynamodb, 'Experience', fingerprint='prompt')
+    keys = [cache.key_for(entry, signature) for entry in entries]
+    assert keys[0] != ExperienceCache(dynamodb, 'Experience', fingerprint='other').key_for(entries[0], signature)
+    assert keys[0] != cache.key_for(entries[0], 'kotlin')
+    tailored = {key: {'bullet_points': [f'Entry {i}.']} for i, key in enumerate(keys)}
+    cache.put_many(tailored)
+
+    # A cold cache reads the table, retrying unprocessed keys; expired items are misses.
+    cold = ExperienceCache(dynamodb, 'Experience', fingerprint='prompt')
+    assert cold.get_many(keys) == tailored and dynamodb.batch_gets == 2
+    dynamodb.tables['Experience'].items[keys[0]]['expiresAt'] = int(time.time()) - 1
+    cold = ExperienceCache(dynamodb, 'Experience', fingerprint='prompt')
+    assert cold.get_many(keys) == {key: tailored[key] for key in keys[1:]}
+    assert (cold.hits, cold.misses) == (len(keys) - 1, 1)
+    cold.reset_counters()
+    assert cold.report() == 'Experience cache: 0 hits, 0 misses (0% hit rate).'
+
+    # tailor_experience only sends the entries the cache misses, in a prompt of their own.
+    model = _RecordingModel(latency=0)
+    summary = {'keywords': keywords}
+    prompt, result = create_cv.tailor_experience(model, entries, summary, cold)
+    assert prompt.count('Company:') == 1 and result == [{'bullet_points': ['Shipped.']}] + [
+        tailored[key] for key in keys[1:]
+    ]
+    prompt, result = create_cv.tailor_experience(model, entries, summary, cold)
+    assert prompt is None and result[0] == {'bullet_points': ['Shipped.']}
+
+
+class _IndexTable(_FakeTable):
+    """CV index table whose Scan applies the index's filter, returns one item per page and can fail."""
+
+    def __init__(self, failures=0):
+        super().__init__('entryId')
+        self.failures = failures
+        self.scans = 0
+
+    def scan(self, ExpressionAttributeValues, ExclusiveStartKey=None, **kwargs):
+        self.scans += 1
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('Scan throttled')
+        ids = sorted(self.items)
+        start = ids.index(ExclusiveStartKey['entryId']) + 1 if ExclusiveStartKey else 0
+        page = [self.items[entry_id] for entry_id in ids[start:start + 1]]
+        response = {'Items': [
+            dict(item) for item in page if item['fingerprint'] == ExpressionAttributeValues[':fingerprint']
+            and item['expiresAt'] > ExpressionAttributeValues[':now']
+        ]}
+        if start + 1 < len(ids):
+            response['LastEvaluatedKey'] = {'entryId': ids[start]}
+        return response
+
+
+def check_cv_index():
+    android = {'keywords': [{'keyword': 'Kotlin', 'importance': 5}, {'keyword': 'Android', 'importance': 4}],
+               'technical_skills': ['Gradle']}
+    reworded = {'keywords': [{'keyword': ' android', 'importance': 4}, {'keyword': 'KOTLIN', 'importance': 5}],
+                'technical_skills': ['gradle']}
+    nursing = {'keywords': [{'keyword': 'Patient care', 'importance': 5}], 'technical_skills': []}
+    assert abs(float(summary_vector(android) @ summary_vector(reworded)) - 1) < 1e-6
+    assert float(summary_vector(android) @ summary_vector(nursing)) < 0.5
+    assert not summary_vector({'keywords': []}).any()
+
+    table = _IndexTable()
+    dynamodb = _FakeDynamoDB({})
+    dynamodb.tables['Index'] = table
+    index = SimilarCVIndex(dynamodb, 'Index', fingerprint='resume-1', threshold=0.9)
+    assert index.find(android) is None
+    index.add('job-1', android, {'skills_response': {'Languages': ['Kotlin']}})
+    index.add('job-2', nursing, {'skills_response': {'Care': ['Triage']}})
+    index.add('empty', {'keywords': []}, {})
+    assert sorted(table.items) == ['job-1', 'job-2']
+    entry_id, similarity, sections = index.find(reworded)
+    assert entry_id == 'job-1' and similarity > 0.99 and sections == {'skills_response': {'Languages': ['Kotlin']}}
+
+    # A cold index loads every page of its own fingerprint's unexpired entries.
+    table.put_item({'entryId': 'job-3', 'fingerprint': 'resume-2', 'vector': summary_vector(android).tobytes(),
+                    'sections': '{}', 'expiresAt': int(time.time()) + 60})
+    table.items['job-2']['expiresAt'] = int(time.time()) - 1
+    cold = SimilarCVIndex(dynamodb, 'Index', fingerprint='resume-1', threshold=0.9)
+    assert cold.find(reworded)[0] == 'job-1' and cold._ids == ['job-1']
+    assert SimilarCVIndex(dynamodb, 'Index', fingerprint='resume-2').find(reworded)[0] == 'job-3'
+
+    # A failed load is retried on the next call rather than leaving the index empty.
+    table.failures, table.scans = 1, 0
+    retrying = SimilarCVIndex(dynamodb, 'Index', fingerprint='resume-1', threshold=0.9)
+    try:
+        retrying.find(reworded)
+    except ConnectionError:
+        pass
+    else:
+        raise AssertionError('the failed scan was not raised')
+    assert retrying.find(reworded)[0] == 'job-1' and table.scans == 4
+    assert retrying.find(nursing) is None and table.scans == 4
+
+
+def check_escape():
+    cases = {
+        'R&D at 100% for $5 #1 a_b {x} ~ ^': (
+            r'R\&D at 100\% for \$5 \#1 a\_b \{x\} \textasciitilde{} \textasciicircum{}'
+        ),
+        'C:\\path\\to': r'C:\textbackslash{}path\textbackslash{}to',
+        'already \\& escaped \\textasciitilde{}': 'already \\& escaped \\textasciitilde{}',
+        'a \\q b & c': r'a \textbackslash{}q b \& c',
+        'nul \x00 and \\ backslash': 'nul \x00 and \\textbackslash{} backslash',
+        '': '',
+        'plain text': 'plain text',
+    }
+    for text, expected in cases.items():
+        escaped = escape_latex(text)
+        assert escaped == expected, (text, escaped)
+        # Escaping is idempotent.
+        assert escape_latex(escaped) == escaped, (text, escape_latex(escaped))
+
+    assert escape_latex(5) == 5 and escape_latex(None) is None
+    data = {'a_key': ['50%', {'n': 3, 'b': True, 's': 'x_y'}], 'none': None}
+    assert escape_latex_in_json(data) == {'a_key': [r'50\%', {'n': 3, 'b': True, 's': r'x\_y'}], 'none': None}
+    assert escape_latex_in_json(escape_latex_in_json(data)) == escape_latex_in_json(data)
+
+
+def _stream(text, chunk_size):
+    """Feed text to a new parser in chunks; returns (items, parser)."""
+    parser = JSONStreamParser()
+    items = []
+    for start in range(0, len(text), chunk_size):
+        items.extend(parser.feed(text[start:start + chunk_size]))
+    return items, parser
+
+
+def check_json_stream():
+    array = ['a]b', 'quote \\" and {brace}', {'x': '[,]', 'n': [1, 2, {}]}, 3.5, None, True]
+    text = json.dumps(array)
+    # Every chunk size, down to one character, yields the same items.
+    for chunk_size in range(1, len(text) + 1):
+        items, parser = _stream(text, chunk_size)
+        assert items == array, (chunk_size, items)
+        assert parser.complete and parser.items_parsed == len(array)
+
+    obj = {'Languages': ['Python', 'SQL'], 'Cloud': ['AWS'], 'empty': {}}
+    for chunk_size in (1, 7, 1000):
+        items, _ = _stream(json.dumps(obj), chunk_size)
+        assert items == list(obj.items()), items
+
+    # Brackets in a preamble are skipped; the value starts at a bracket opening a line.
+    items, _ = _stream('Here [is] the {JSON} you asked for:\n  [1, 2]', 3)
+    assert items == [1, 2], items
+    # ... or at the first bracket after a fence, even on the same line.
+    items, _ = _stream('Sure [ok]: ```json [{"a": 1}]``` Done [x].', 2)
+    assert items == [{'a': 1}], items
+    items, _ = _stream('```json\n{"k": "v"}\n```', 1)
+    assert items == [('k', 'v')], items
+    # Two backticks are not a fence.
+    items, parser = _stream('Use ``code`` [not this]', 4)
+    assert items == [] and not parser.complete, items
+
+    items, parser = _stream('[]', 1)
+    assert items == [] and parser.complete
+    # Text after the closing bracket is ignored, as is anything fed afterwards.
+    items, parser = _stream('[1] trailing [2]', 5)
+    assert items == [1] and parser.feed('[3]') == []
+
+
+def check_validate():
+    summary = {
+        'technical_skills': ['Python'],
+        'core_responsibilities': [],
+        'qualifications_and_preferences': [],
+        'keywords': [{'keyword': 'Python', 'importance': 5}],
+    }
+    assert validate(summary, SUMMARY_SCHEMA) == []
+
+    broken = dict(summary, keywords=[{'keyword': 'Python', 'importance': 9}, {'importance': True}])
+    del broken['core_responsibilities']
+    assert validate(broken, SUMMARY_SCHEMA) == [
+        '$: missing required key "core_responsibilities"',
+        '$.keywords[0].importance: 9 is above the maximum 5',
+        '$.keywords[1]: missing required key "keyword"',
+        '$.keywords[1].importance: expected integer, got boolean',
+    ], validate(broken, SUMMARY_SCHEMA)
+    assert validate([], SUMMARY_SCHEMA) == ['$: expected object, got list']
+
+    assert validate({'Languages': ['Python']}, SKILLS_SCHEMA) == []
+    assert validate({}, SKILLS_SCHEMA) == ['$: expected at least 1 keys']
+    assert validate({'Languages': 'Python'}, SKILLS_SCHEMA) == ['$.Languages: expected array, got str']
+    assert validate(3, {'type': 'number', 'enum': [1, 2]}) == ['$: 3 is not one of [1, 2]']
+    assert validate([1, 2, 3], {'type': 'array', 'maxItems': 2}) == ['$: expected at most 2 items']
+
+
+def check_breaker():
+    breaker = CircuitBreaker(min_calls=4, error_rate=0.5, cooldown=0.05, window_calls=10)
+    for ok in (True, True, False):
+        breaker.record('m', ok)
+    assert breaker.allow('m') and not breaker.is_open('m')
+    # closed -> open once half of at least min_calls calls failed.
+    breaker.record('m', False)
+    assert breaker.is_open('m') and not breaker.allow('m')
+    assert breaker.allow('other')
+
+    # open -> half-open after the cooldown: exactly one trial call goes through.
+    time.sleep(0.06)
+    assert not breaker.is_open('m')
+    assert breaker.allow('m')
+    assert not breaker.allow('m') and breaker.is_open('m')
+    # A failed trial opens the circuit for another cooldown.
+    breaker.record('m', False)
+    assert not breaker.allow('m')
+
+    time.sleep(0.06)
+    assert breaker.allow('m')
+    # A successful trial closes it with a clean history.
+    breaker.record('m', True)
+    assert breaker.allow('m') and not breaker.is_open('m')
+    breaker.record('m', False)
+    assert not breaker.is_open('m')
+
+    # Old outcomes leave the time window and stop counting.
+    windowed = CircuitBreaker(window=0.05, min_calls=2, error_rate=0.5, cooldown=60)
+    windowed.record('m', False)
+    time.sleep(0.06)
+    windowed.record('m', True)
+    windowed.record('m', True)
+    assert not windowed.is_open('m')
+
+
+class _RateLimitError(Exception):
+    code = 429
+
+
+class _ThrottledModel(LLM_interface):
+    """Reports a rate-limit wait of `wait` seconds, then takes `request` seconds or raises `error`."""
+
+    def __init__(self, wait=0.0, request=0.0, error=None):
+        super().__init__()
+        self.wait, self.request, self.error = wait, request, error
+
+    def ask(self, prompt, be_json=False, model=None):
+        with self._waiting(model):
+            time.sleep(self.wait)
+        if self.error is not None:
+            raise self.error
+        time.sleep(self.request)
+        return model
+
+
+def check_resilient_llm():
+    def ask(llm, breaker):
+        resilient = ResilientLLM(llm, breaker=breaker, fallbacks={'m': 'fallback'}, call_timeout=0.1, hedge=False)
+        try:
+            return resilient.ask('prompt', model='m')
+        except Exception as e:
+            return type(e).__name__
+
+    breaker = CircuitBreaker(min_calls=2, error_rate=0.5, cooldown=60)
+    # Waiting for rate-limit room longer than call_timeout is neither a timeout nor a failure.
+    for _ in range(3):
+        assert ask(_ThrottledModel(wait=0.3), breaker) == 'm'
+    # Nor is a 429 that outlasted the provider's retries.
+    for _ in range(3):
+        assert ask(_ThrottledModel(error=_RateLimitError('429 RESOURCE_EXHAUSTED')), breaker) == '_RateLimitError'
+    assert not breaker.is_open('m') and breaker.failovers == 0
+
+    # A request that itself outlives call_timeout is, and opens the circuit.
+    breaker = CircuitBreaker(min_calls=2, error_rate=0.5, cooldown=60)
+    for _ in range(2):
+        assert ask(_ThrottledModel(wait=0.05, request=0.3), breaker) == 'TimeoutError'
+    assert breaker.is_open('m')
+    assert ask(_ThrottledModel(), breaker) == 'fallback'
+
+
+class _JobsTable(_FakeTable):
+    """_FakeTable with the conditional SET updates of app.update_job."""
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeNames, ExpressionAttributeValues,
+                    ConditionExpression=None):
+        item = self.items[Key[self.key_name]]
+        for clause in ConditionExpression.split(' AND ') if ConditionExpression else ():
+            name, placeholder = clause.split(' = ')
+            if item.get(ExpressionAttributeNames[name]) != ExpressionAttributeValues[placeholder]:
+                raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, 'UpdateItem')
+        for assignment in UpdateExpression[len('SET '):].split(', '):
+            name, placeholder = assignment.split(' = ')
+            item[ExpressionAttributeNames[name]] = ExpressionAttributeValues[placeholder]
+
+
+class _FakeSQS:
+    """Records the sent job ids; the next fail_sends sends raise and failed_entries batch entries fail."""
+
+    def __init__(self):
+        self.sent = []
+        self.fail_sends = 0
+        self.failed_entries = 0
+
+    def send_message(self, QueueUrl, MessageBody):
+        if self.fail_sends:
+            self.fail_sends -= 1
+            raise RuntimeError('SQS is unavailable.')
+        self.sent.append((QueueUrl, json.loads(MessageBody)['jobId']))
+
+    def send_message_batch(self, QueueUrl, Entries):
+        failed = Entries[:self.failed_entries]
+        self.failed_entries -= len(failed)
+        for entry in Entries[len(failed):]:
+            self.sent.append((QueueUrl, json.loads(entry['MessageBody'])['jobId']))
+        return {
+            'Successful': [{'Id': entry['Id']} for entry in Entries[len(failed):]],
+            'Failed': [{'Id': entry['Id'], 'SenderFault': False, 'Code': 'InternalError'} for entry in failed],
+        }
+
+
+def _import_app():
+    # app reads its configuration and creates its clients on import.
+    for name, value in {
+        'AWS_DEFAULT_REGION': 'us-east-1', 'DYNAMODB_TABLE_NAME': 'Jobs', 'CV_BATCH_TABLE_NAME': 'CVBatches',
+        'CV_BATCH_MODE': 'true', 'JOB_QUEUE_URL': 'jobs-queue', 'EMAIL_QUEUE_URL': 'email-queue',
+    }.items():
+        os.environ.setdefault(name, value)
+    try:
+        import app
+    except ModuleNotFoundError:
+        from cv_generator import app
+    return app
+
+
+def check_batch():
+    app = _import_app()
+    server, url = batch_stub_server.start_server(fail_keys=['b/experience_response'])
+    jobs = _JobsTable('jobId')
+    summary = create_cv.dump_job_summary({
+        'technical_skills': ['Python'], 'core_responsibilities': ['Build services'],
+        'qualifications_and_preferences': [], 'keywords': [{'keyword': 'Python', 'importance': 5}],
+    })
+    for jobId in 'abc':
+        jobs.put_item(Item={'jobId': jobId, 'description': 'Python engineer.', 'job_summary': summary})
+    sqs = _FakeSQS()
+    submissions = []
+    submit_batch = app.AskGemini.submit_batch
+
+    def counting_submit(self, *args, **kwargs):
+        submissions.append(args)
+        return submit_batch(self, *args, **kwargs)
+
+    def collect():
+        results = json.loads(app.resume_batches_handler({}, None)['body'])['results']
+        return {result['jobId']: result['status'] for result in results}
+
+    with open(os.path.join('config', 'cv_summary.sample.txt'), 'r', encoding='utf-8') as f:
+        profile_summary = f.read()
+    step_context = SimpleNamespace(logger=logging.getLogger('checks'))
+    batches = _FakeDynamoDB({app.cv_batches._table_name: 'batchId'})
+    try:
+        with mock.patch.dict(os.environ, {'GEMINI_API_KEY': 'stub', 'GEMINI_BASE_URL': url}), \
+                _patched(app, jobs_table=lambda: jobs, sqs=sqs, RESUME_PATH=SAMPLE_RESUME, CV_REUSE_THRESHOLD=0,
+                         REQUEUE_MAX_RETRIES=1), \
+                _patched(app.cv_batches, _dynamodb=batches), _patched(app.experience_cache, _table_name=None), \
+                _patched(create_cv, _load_profile_summary=lambda: profile_summary), \
+                _patched(app.AskGemini, submit_batch=counting_submit):
+            plan = app.plan_cv_batch(['a', 'b', 'c'])(step_context)
+            assert plan['batch'] == ['a', 'b', 'c'], plan
+            batch_id = plan['batch_id']
+            # A retried submission step finds the stored handle and does not submit again.
+            for _ in range(2):
+                submitted = app.submit_cv_batch(batch_id, plan['batch'])(step_context)
+                assert [result['status'] for result in submitted['results']] == ['batch_submitted'] * 3, submitted
+            assert len(submissions) == 1, submissions
+            stored = app.cv_batches.get(batch_id)
+            while app.AskGemini(model_name=Pro).batch_results(stored['handle']) is None:
+                time.sleep(0.05)
+
+            # The CV of a fails to send and the requeue of a and b fails: both stay pending
+            # in the batch, which is kept for the next collection.
+            sqs.fail_sends, sqs.failed_entries = 1, 100
+            assert collect() == {'a': 'error', 'b': 'error', 'c': 'completed'}
+            assert sqs.sent == [('email-queue', 'c')], sqs.sent
+            assert {jobId: jobs.items[jobId]['status'] for jobId in 'abc'} == {
+                'a': 'CV_BATCH_PENDING', 'b': 'CV_BATCH_PENDING', 'c': 'CV_GENERATED'}
+            assert app.cv_batches.get(batch_id) is not None
+
+            sqs.failed_entries = 0
+            assert collect() == {'a': 'completed', 'b': 'requeued', 'c': 'skipped'}
+            assert sorted(sqs.sent) == [('email-queue', 'a'), ('email-queue', 'c'), ('jobs-queue', 'b')], sqs.sent
+            assert app.cv_batches.get(batch_id) is None
+
+            # Collecting the same batch again (its record survived a timeout) sends nothing twice.
+            app.cv_batches.save(batch_id, stored['handle'], stored['jobs'])
+            assert collect() == {'a': 'skipped', 'b': 'skipped', 'c': 'skipped'}
+            assert len(sqs.sent) == 3, sqs.sent
+    finally:
+        server.shutdown()
+
+
+CHECKS = {
+    'run_prompts': check_run_prompts,
+    'rate_limiter': check_rate_limiter,
+    'job_summary': check_job_summary,
+    'experience_cache': check_experience_cache,
+    'cv_index': check_cv_index,
+    'escape': check_escape,
+    'json_stream': check_json_stream,
+    'validate': check_validate,
+    'batch': check_batch,
+    'breaker': check_breaker,
+    'resilient_llm': check_resilient_llm,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('names', nargs='*', metavar='name', help=f"Checks to run (default: all): {', '.join(CHECKS)}.")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.names if name not in CHECKS]
+    if unknown:
+        parser.error(f"unknown checks: {', '.join(unknown)}")
+
+    failed = 0
+    for name in args.names or CHECKS:
+        try:
+            CHECKS[name]()
+        except Exception:
+            failed += 1
+            print(f'FAIL {name}')
+            traceback.print_exc()
+        else:
+            print(f'ok   {name}')
+    print(f'{len(args.names or CHECKS) - failed} passed, {failed} failed.')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
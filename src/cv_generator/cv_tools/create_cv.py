@@ -1,21 +1,34 @@
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from jinja2 import Template
-
 # Support both package layouts:
 # - CodeUri: src/cv_generator (imports like 'gen_ai.*', 'latex.*')
 # - CodeUri: src (imports like 'cv_generator.gen_ai.*', 'cv_generator.latex.*')
 try:
-    from gen_ai.gemini import escape_latex_in_json
     from gen_ai.llm_interface import LLM_interface
-    from gen_ai.model_names import Pro
+    from gen_ai.model_names import Flash, Pro
+    from gen_ai.schemas import (
+        EXPERIENCE_ENTRY_SCHEMA, EXPERIENCE_SCHEMA, SKILLS_SCHEMA, SUMMARY_SCHEMA, schema_version, summary_version,
+        validate,
+    )
+    from latex.environment import compile_template
+    from latex.escaping import escape_latex_in_json
     from latex.latex_generator import MakeCV
 except ModuleNotFoundError:
-    from cv_generator.gen_ai.gemini import escape_latex_in_json
     from cv_generator.gen_ai.llm_interface import LLM_interface
-    from cv_generator.gen_ai.model_names import Pro
+    from cv_generator.gen_ai.model_names import Flash, Pro
+    from cv_generator.gen_ai.schemas import (
+        EXPERIENCE_ENTRY_SCHEMA, EXPERIENCE_SCHEMA, SKILLS_SCHEMA, SUMMARY_SCHEMA, schema_version, summary_version,
+        validate,
+    )
+    from cv_generator.latex.environment import compile_template
+    from cv_generator.latex.escaping import escape_latex_in_json
     from cv_generator.latex.latex_generator import MakeCV
 
+from .experience_cache import entry_hash, keyword_signature
+from .file_cache import load_cached, read_text
 from .highlighter import LatexHighlighter
 from .map_to_latex import (
     create_experience_prompt_text,
@@ -32,9 +45,18 @@ from .prompt_templates import (
 
 _CONFIG_DIR = Path(__file__).resolve().parents[1] / 'config'
 
+# Maximum number of model calls in flight for one CV.
+DEFAULT_LLM_CONCURRENCY = 3
+DEFAULT_JOB_TITLE = 'Software Engineer'
+# Model responses that make up the tailored part of a CV; everything else is rebuilt per job.
+TAILORED_SECTIONS = ('skills_response', 'profile_response', 'experience_response')
+# Model of the job summary call, and the version tag of the summaries it produces.
+SUMMARY_MODEL = Flash
+SUMMARY_VERSION = summary_version(SUMMARY_SCHEMA, summary_prompt, SUMMARY_MODEL)
+
 
 def _load_profile_summary() -> str:
-    return (_CONFIG_DIR / 'cv_summary.txt').read_text(encoding='utf-8')
+    return load_cached(str(_CONFIG_DIR / 'cv_summary.txt'), read_text)
 
 
 def _normalize_skills(skills_list):
@@ -61,53 +83,314 @@ def _normalize_skills(skills_list):
     return {}
 
 
-def prepare_prompts(gemini: LLM_interface, cv, job_description):
-    """Prepare all prompts based on the CV data and job description."""
-    job_summary = gemini.ask(summary_prompt.format(job_description=job_description), True)
-    profile_summary = _load_profile_summary()
-    job_title = 'Software Engineer'
-    skills_prompt = prompt_skills.format(
-        my_profile_summary=profile_summary,
-        summarized_job_description=job_summary,
-        skills=' '.join(cv.get_value('core_skills')),
+def extract_job_summary(gemini: LLM_interface, job_description):
+    """Extract the structured job summary (skills, responsibilities, keywords) with one model call."""
+    return gemini.ask_structured(
+        summary_prompt.format(job_description=job_description), SUMMARY_SCHEMA, model=SUMMARY_MODEL
+    )
+
+
+def load_stored_job_summary(stored):
+    """Return a LaTeX-escaped job summary from its stored JSON form, or None if unusable.
+
+    A summary this module extracted is reused while its version matches SUMMARY_VERSION
+    (same schema, prompt and model). One the job finder extracted while scoring carries
+    the finder's own version; it is reused while its schema part matches, since the
+    finder stores it with the job when the job is scored. Anything else (missing,
+    outdated, malformed) means extract it again.
+    """
+    if not stored:
+        return None
+    try:
+        record = json.loads(stored) if isinstance(stored, str) else stored
+    except ValueError:
+        return None
+    if not isinstance(record, dict) or not isinstance(record.get('version'), str):
+        return None
+    if record.get('source') == 'job_finder':
+        if record['version'].split('-')[0] != schema_version(SUMMARY_SCHEMA):
+            return None
+    elif record['version'] != SUMMARY_VERSION:
+        return None
+    summary = record.get('summary')
+    if not isinstance(summary, dict) or not isinstance(summary.get('keywords'), list):
+        return None
+    return summary if record.get('latex_escaped') else escape_latex_in_json(summary)
+
+
+def dump_job_summary(job_summary):
+    """Serialize an extracted (already LaTeX-escaped) job summary for storage on the job item."""
+    return json.dumps(
+        {'version': SUMMARY_VERSION, 'source': 'cv_generator', 'latex_escaped': True, 'summary': job_summary}
     )
 
-    profile_prompt = prompt_profile_summary.format(
+
+def build_profile_prompt(cv, job_description, profile_summary):
+    return prompt_profile_summary.format(
         job_description=job_description,
         personal=cv.get_value('personal')['description'],
         cv=profile_summary,
     )
 
-    work_text_for_prompt = create_experience_prompt_text(cv.get_value('experience_details'))
-    work_experience_prompt = Template(prompt_working_experience).render(
+
+def experience_cache_fingerprint():
+    """Hash of what besides the entry and keywords shapes tailored bullets: the prompt and model."""
+    return hashlib.sha256(f'{Pro}\0{prompt_working_experience}'.encode('utf-8')).hexdigest()
+
+
+def tailored_sections_fingerprint(cv):
+    """Hash of everything besides the job that shapes the tailored sections: resume, profile, prompts, model."""
+    digest = hashlib.sha256()
+    for part in (entry_hash(cv.data), _load_profile_summary(), prompt_profile_summary, prompt_skills,
+                 prompt_working_experience, SUMMARY_VERSION, Pro):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def build_skills_prompt(cv, job_summary, profile_summary):
+    return prompt_skills.format(
+        my_profile_summary=profile_summary,
+        summarized_job_description=job_summary,
+        skills=' '.join(cv.get_value('core_skills')),
+    )
+
+
+def build_experience_prompt(experience_details, job_summary):
+    work_text_for_prompt = create_experience_prompt_text(experience_details)
+    return compile_template(prompt_working_experience).render(
         {
             'experience_details': work_text_for_prompt,
             'job_description': job_summary,
         }
     )
 
-    return {
+
+def request_experience(gemini: LLM_interface, experience_details, job_summary, stream_timeout=None, model=None):
+    """Ask the model to tailor the given experience entries; returns (prompt, tailored entries).
+
+    model overrides the model of gemini for these calls only.
+
+    With a stream_timeout the response is streamed and entries are collected as they
+    arrive. If the stream times out, fails or yields an invalid entry, the valid entries
+    that arrived are kept and only the remaining ones (all of them, if none arrived) are
+    requested again, as a schema-constrained call.
+    """
+    prompt = build_experience_prompt(experience_details, job_summary)
+    if not stream_timeout:
+        return prompt, gemini.ask_structured(prompt, EXPERIENCE_SCHEMA, model=model)
+
+    tailored = []
+    try:
+        for entry in gemini.ask_stream(prompt, timeout=stream_timeout, model=model, schema=EXPERIENCE_SCHEMA):
+            if validate(entry, EXPERIENCE_ENTRY_SCHEMA):
+                print(f'Experience entry {len(tailored)} from the stream is invalid; requesting it again.')
+                break
+            tailored.append(entry)
+    except Exception as e:
+        print(f'Experience stream failed after {len(tailored)} entries: {e}')
+    if len(tailored) < len(experience_details):
+        print(f'Requesting the remaining {len(experience_details) - len(tailored)} experience entries.')
+        remaining_prompt = build_experience_prompt(experience_details[len(tailored):], job_summary)
+        tailored += gemini.ask_structured(remaining_prompt, EXPERIENCE_SCHEMA, model=model)
+    return prompt, tailored
+
+
+def _lookup_experience(experience_cache, experience_details, job_summary):
+    """Return (cache keys, cached entries by key, indexes of the entries not cached).
+
+    A failing cache lookup is logged and treated as all misses; the cache is an
+    optimization and must not fail the CV.
+    """
+    signature = keyword_signature(job_summary.get('keywords', []))
+    keys = [experience_cache.key_for(entry, signature) for entry in experience_details]
+    try:
+        cached = experience_cache.get_many(keys)
+    except Exception as e:
+        print(f'Warning: Experience cache lookup failed; tailoring every entry. Error: {e}')
+        cached = {}
+    return keys, cached, [index for index, key in enumerate(keys) if key not in cached]
+
+
+def _store_experience(experience_cache, entries):
+    """Store tailored entries in the cache; a failing write is logged and ignored."""
+    try:
+        experience_cache.put_many(entries)
+    except Exception as e:
+        print(f'Warning: Could not store tailored experience in the cache. Error: {e}')
+
+
+def tailor_experience(gemini: LLM_interface, experience_details, job_summary, experience_cache=None,
+                      stream_timeout=None, model=None):
+    """Tailor the experience entries to the job, reusing cached bullets where possible.
+
+    Entries are cached per (entry, top-keyword signature of the job); only the entries
+    that miss are sent to the model, in a prompt containing just those entries. Returns
+    (prompt sent or None when everything was cached, tailored entries in resume order).
+    """
+    experience_details = list(experience_details)
+    if experience_cache is None:
+        return request_experience(gemini, experience_details, job_summary, stream_timeout, model)
+
+    keys, cached, missing = _lookup_experience(experience_cache, experience_details, job_summary)
+    if not missing:
+        return None, [cached[key] for key in keys]
+
+    prompt, generated = request_experience(
+        gemini, [experience_details[index] for index in missing], job_summary, stream_timeout, model
+    )
+    matched = isinstance(generated, list) and len(generated) == len(missing)
+    fresh = {keys[index]: entry for index, entry in zip(missing, generated if isinstance(generated, list) else [])}
+    if matched:
+        _store_experience(experience_cache, fresh)
+    else:
+        # Entries cannot be matched to the response reliably, so do not cache any of them.
+        print('Warning: Mismatch between requested and tailored experience entries; not caching.')
+    cached.update(fresh)
+    return prompt, [cached.get(key, {}) for key in keys]
+
+
+def run_prompts(gemini: LLM_interface, cv, job_description, concurrency=DEFAULT_LLM_CONCURRENCY,
+                job_summary=None, experience_cache=None, stream_timeout=None):
+    """Run the CV's model calls as a dependency graph so independent calls overlap.
+
+    summary --+--> skills
+              +--> work experience (Pro model)
+    profile bullets (independent)
+
+    With enough workers the wall time is roughly summary + experience rather than the
+    sum of all four calls. Passing a previously extracted job_summary skips the summary
+    call entirely, and an experience_cache limits the experience call to the entries it
+    has not seen for this keyword signature. A stream_timeout streams the experience
+    response (see request_experience). Returns the prompts dict with the model responses
+    added.
+    """
+    profile_summary = _load_profile_summary()
+    profile_prompt = build_profile_prompt(cv, job_description, profile_summary)
+    with ThreadPoolExecutor(max_workers=max(1, int(concurrency))) as executor:
+        summary_future = None
+        if job_summary is None:
+            summary_future = executor.submit(extract_job_summary, gemini, job_description)
+        profile_future = executor.submit(gemini.ask, profile_prompt, False)
+
+        if summary_future is not None:
+            job_summary = summary_future.result()
+        skills_prompt = build_skills_prompt(cv, job_summary, profile_summary)
+        skills_future = executor.submit(gemini.ask_structured, skills_prompt, SKILLS_SCHEMA)
+        experience_future = executor.submit(
+            tailor_experience,
+            gemini,
+            cv.get_value('experience_details'),
+            job_summary,
+            experience_cache,
+            stream_timeout,
+            Pro,
+        )
+        work_experience_prompt, experience_response = experience_future.result()
+
+        return {
+            'job_summary': job_summary,
+            'profile_summary': profile_summary,
+            'work_experience': work_experience_prompt,
+            'job_title': DEFAULT_JOB_TITLE,
+            'skills_prompt': skills_prompt,
+            'profile_prompt': profile_prompt,
+            'skills_response': skills_future.result(),
+            'profile_response': profile_future.result(),
+            'experience_response': experience_response,
+        }
+
+
+def batch_requests(cv, job_description, job_summary, experience_cache=None):
+    """The model calls of run_prompts for a job whose summary is known, as batch requests.
+
+    Returns (requests, state). requests maps a section name to (model or None for the
+    default model, prompt, schema or None for text), as AskGemini.submit_batch takes
+    them. state is the JSON-serializable context prompts_from_batch needs once the
+    responses are back; experience entries found in experience_cache are kept there and
+    left out of the experience request.
+    """
+    profile_summary = _load_profile_summary()
+    requests = {
+        'profile_response': (None, build_profile_prompt(cv, job_description, profile_summary), None),
+        'skills_response': (None, build_skills_prompt(cv, job_summary, profile_summary), SKILLS_SCHEMA),
+    }
+
+    experience_details = list(cv.get_value('experience_details'))
+    keys, cached = [], {}
+    missing = list(range(len(experience_details)))
+    if experience_cache is not None:
+        keys, cached, missing = _lookup_experience(experience_cache, experience_details, job_summary)
+    if missing:
+        # Without a chance to re-request part of the answer, pin the entry count in the schema.
+        schema = dict(EXPERIENCE_SCHEMA, minItems=len(missing), maxItems=len(missing))
+        prompt = build_experience_prompt([experience_details[index] for index in missing], job_summary)
+        requests['experience_response'] = (Pro, prompt, schema)
+
+    state = {
         'job_summary': job_summary,
-        'profile_summary': profile_summary,
-        'work_experience': work_experience_prompt,
-        'job_title': job_title,
-        'skills_prompt': skills_prompt,
-        'profile_prompt': profile_prompt,
+        'experience_keys': keys,
+        'missing_experience': missing,
+        'cached_experience': [cached.get(key) for key in keys],
     }
+    return requests, state
+
+
+def prompts_from_batch(state, responses, experience_cache=None):
+    """Build the prompts dict run_prompts would return from a batch's responses.
 
+    responses maps the section names of batch_requests to the (parsed, LaTeX-escaped)
+    responses. Raises ValueError when a response does not match its schema, so the
+    caller can generate that CV interactively instead.
+    """
+    missing = state['missing_experience']
+    skills = responses.get('skills_response')
+    generated = responses.get('experience_response', []) if missing else []
+    errors = validate(skills, SKILLS_SCHEMA, '$.skills')
+    errors += validate(generated, dict(EXPERIENCE_SCHEMA, minItems=len(missing), maxItems=len(missing)),
+                       '$.experience')
+    if not isinstance(responses.get('profile_response'), str):
+        errors.append('$.profile: missing response')
+    if errors:
+        raise ValueError('; '.join(errors))
 
-def generate_latex_content(gemini: LLM_interface, prompts, cv, include_certs=True):
-    """Generate the LaTeX content based on prompts and CV data."""
+    keys = state['experience_keys']
+    if experience_cache is not None and keys:
+        _store_experience(experience_cache, {keys[index]: entry for index, entry in zip(missing, generated)})
+    experience = list(state['cached_experience']) or [None] * len(missing)
+    for index, entry in zip(missing, generated):
+        experience[index] = entry
+
+    return {
+        'job_summary': state['job_summary'],
+        'job_title': DEFAULT_JOB_TITLE,
+        'skills_response': skills,
+        'profile_response': responses['profile_response'],
+        'experience_response': experience,
+    }
+
+
+def reuse_prompts(job_summary, sections):
+    """Build the prompts dict for a CV that reuses the tailored sections of a similar job.
+
+    Highlighting and the title are still derived from this job's summary.
+    """
+    prompts = {'job_summary': job_summary, 'job_title': DEFAULT_JOB_TITLE}
+    prompts.update({name: sections[name] for name in TAILORED_SECTIONS})
+    return prompts
+
+
+def generate_latex_content(prompts, cv, include_certs=True):
+    """Generate the LaTeX content from the model responses and CV data."""
     cert_text = make_certifications(cv.get_value('certifications')) if include_certs else ''
 
-    skills_list = _normalize_skills(gemini.ask(prompts['skills_prompt'], True))
+    skills_list = _normalize_skills(prompts['skills_response'])
 
-    profile_bullet_list = gemini.ask(prompts['profile_prompt'], False)
+    profile_bullet_list = prompts['profile_response']
     print('Generated profile bullets', profile_bullet_list)
     profile_text = make_profile_bullet(profile_bullet_list)
 
-    gemini.swap_model(Pro)
-    experience_bullet_list = gemini.ask(prompts['work_experience'], True)
+    experience_bullet_list = prompts['experience_response']
     if isinstance(experience_bullet_list, list) and experience_bullet_list:
         print('Generated experience bullets', experience_bullet_list[0])
     experience_text = make_experience_items(cv.get_value('experience_details'), experience_bullet_list)
@@ -118,15 +401,9 @@ def generate_latex_content(gemini: LLM_interface, prompts, cv, include_certs=Tru
     return cert_text, profile_text, experience_text, skills_list
 
 
-def create_cv(cv, job_description, include_certs=True, gemini: LLM_interface = None,
-              company_name=None, coverletter=False):
-    """Main function to generate the CV LaTeX."""
-    if gemini is None:
-        raise ValueError('A language model provider must be passed (LLM_interface implementation)')
-
-    prompts = prepare_prompts(gemini, cv, job_description)
+def assemble_cv(prompts, cv, include_certs=True):
+    """Render the CV LaTeX from the prompts dict (model responses) and the resume data."""
     cert_text, profile_text, experience_text, skills_list = generate_latex_content(
-        gemini,
         prompts,
         cv,
         include_certs,
@@ -150,3 +427,20 @@ def create_cv(cv, job_description, include_certs=True, gemini: LLM_interface = N
         experience_text=experience_text,
         categorized_skills=skills_list,
     )
+
+
+def create_cv(cv, job_description, include_certs=True, gemini: LLM_interface = None,
+              company_name=None, coverletter=False, concurrency=DEFAULT_LLM_CONCURRENCY,
+              job_summary=None, experience_cache=None):
+    """Main function to generate the CV LaTeX.
+
+    job_summary is an already extracted, LaTeX-escaped job summary; when given, the
+    summary extraction call is skipped. experience_cache (an ExperienceCache) reuses
+    tailored experience bullets from earlier jobs with the same top keywords.
+    """
+    if gemini is None:
+        raise ValueError('A language model provider must be passed (LLM_interface implementation)')
+
+    prompts = run_prompts(gemini, cv, job_description, concurrency, job_summary=job_summary,
+                          experience_cache=experience_cache)
+    return assemble_cv(prompts, cv, include_certs)
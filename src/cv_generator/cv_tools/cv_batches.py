@@ -0,0 +1,63 @@
+import json
+import time
+
+
+def _from_item(item):
+    return {
+        'batchId': item['batchId'],
+        'handle': json.loads(item['handle']),
+        'jobs': json.loads(item['jobs']),
+        'createdAt': int(item.get('createdAt', 0)),
+    }
+
+
+class CVBatchStore:
+    """Batch-API jobs of CV generation that have been submitted but not collected yet.
+
+    One item per JobsQueue batch holds the Gemini batch handle and, per job, the state
+    needed to assemble its CV once the responses are in. Items expire through the
+    DynamoDB TTL in case a batch is never collected.
+    """
+
+    def __init__(self, dynamodb, table_name, ttl_days=3):
+        self._dynamodb = dynamodb
+        self._table_name = table_name
+        self._ttl_seconds = int(ttl_days * 24 * 3600)
+
+    def save(self, batch_id, handle, jobs):
+        """Persist a submitted batch; jobs maps jobId -> JSON-serializable assembly state."""
+        now = int(time.time())
+        self._dynamodb.Table(self._table_name).put_item(
+            Item={
+                'batchId': batch_id,
+                'handle': json.dumps(handle),
+                'jobs': json.dumps(jobs),
+                'createdAt': now,
+                'expiresAt': now + self._ttl_seconds,
+            }
+        )
+
+    def get(self, batch_id):
+        """Return the stored batch (as pending() does) or None."""
+        item = self._dynamodb.Table(self._table_name).get_item(Key={'batchId': batch_id}).get('Item')
+        return _from_item(item) if item is not None else None
+
+    def pending(self):
+        """Return the stored batches as dicts with batchId, handle, jobs and createdAt."""
+        table = self._dynamodb.Table(self._table_name)
+        now = int(time.time())
+        batches = []
+        kwargs = {}
+        while True:
+            response = table.scan(**kwargs)
+            for item in response.get('Items', []):
+                # TTL deletion is lazy, so expired items can still be returned for a while.
+                if int(item.get('expiresAt', 0)) <= now:
+                    continue
+                batches.append(_from_item(item))
+            if 'LastEvaluatedKey' not in response:
+                return batches
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def delete(self, batch_id):
+        self._dynamodb.Table(self._table_name).delete_item(Key={'batchId': batch_id})
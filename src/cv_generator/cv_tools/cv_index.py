@@ -0,0 +1,159 @@
+import hashlib
+import json
+import threading
+import time
+from collections.abc import Mapping
+
+import numpy as np
+
+# Dimension of the hashed keyword vectors.
+VECTOR_DIM = 1024
+# Weight of a technical skill listed in the job summary but not among its keywords.
+SKILL_WEIGHT = 2.0
+
+
+def _term_index(term, dim):
+    digest = hashlib.blake2b(term.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % dim
+
+
+def _normalize_term(term):
+    return ' '.join(str(term or '').lower().split())
+
+
+def summary_vector(job_summary, dim=VECTOR_DIM):
+    """Unit-length hashed bag-of-keywords vector for a job summary.
+
+    Keywords are weighted by their importance (1-5) and technical skills not already
+    listed as keywords get SKILL_WEIGHT, so two postings asking for the same things in
+    the same proportions point the same way regardless of wording elsewhere.
+    """
+    weights = {}
+    for item in job_summary.get('keywords', []) or []:
+        if isinstance(item, Mapping):
+            term, importance = item.get('keyword'), item.get('importance', 3)
+        else:
+            term, importance = item, 3
+        term = _normalize_term(term)
+        if not term:
+            continue
+        try:
+            importance = float(importance)
+        except (TypeError, ValueError):
+            importance = 3.0
+        weights[term] = max(weights.get(term, 0.0), importance)
+    for skill in job_summary.get('technical_skills', []) or []:
+        term = _normalize_term(skill)
+        if term:
+            weights.setdefault(term, SKILL_WEIGHT)
+
+    vector = np.zeros(dim, dtype=np.float32)
+    for term, weight in weights.items():
+        vector[_term_index(term, dim)] += weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SimilarCVIndex:
+    """Nearest-neighbour index over the job summaries of previously generated CVs.
+
+    Each entry holds the unit vector of a job summary and the tailored CV sections
+    generated for it. The vectors live in one NumPy matrix, so a lookup is a single
+    matrix-vector product. Entries are persisted in a DynamoDB table (loaded once per
+    process, then kept across warm invocations) and tagged with a fingerprint of the
+    resume and prompts, so a changed resume never reuses stale sections.
+
+    Loading is a full-table Scan on each cold start: it reads (and is billed for) every
+    item, including those of other fingerprints and expired ones not yet deleted, since
+    filters only apply after the read. The table holds one item per generated CV (a few
+    KB each) and entries expire after ttl_days, which bounds it to roughly the CVs of
+    that period; the projection keeps the transferred data to what the index needs.
+    """
+
+    def __init__(self, dynamodb, table_name, fingerprint='', threshold=0.9, ttl_days=30):
+        self._dynamodb = dynamodb
+        self._table_name = table_name
+        self._fingerprint = fingerprint
+        self._threshold = threshold
+        self._ttl_seconds = int(ttl_days * 24 * 3600)
+        self._ids = []
+        self._sections = []
+        self._matrix = np.zeros((0, VECTOR_DIM), dtype=np.float32)
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._loaded:
+            return
+        if not self._table_name:
+            self._loaded = True
+            return
+
+        table = self._dynamodb.Table(self._table_name)
+        scan_kwargs = {
+            # TTL deletion is lazy, so expired items can still be returned for a while.
+            'FilterExpression': '#fingerprint = :fingerprint AND #expires > :now',
+            'ProjectionExpression': '#id, #vector, #sections',
+            'ExpressionAttributeNames': {
+                '#fingerprint': 'fingerprint',
+                '#expires': 'expiresAt',
+                '#id': 'entryId',
+                '#vector': 'vector',
+                '#sections': 'sections',
+            },
+            'ExpressionAttributeValues': {':fingerprint': self._fingerprint, ':now': int(time.time())},
+        }
+        ids, sections, vectors = [], [], []
+        while True:
+            response = table.scan(**scan_kwargs)
+            for item in response.get('Items', []):
+                raw = item['vector']
+                vectors.append(np.frombuffer(bytes(getattr(raw, 'value', raw)), dtype=np.float32))
+                ids.append(item['entryId'])
+                sections.append(json.loads(item['sections']))
+            if 'LastEvaluatedKey' not in response:
+                break
+            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+        # Only a complete load counts; after a failed scan the next call tries again.
+        self._ids, self._sections = ids, sections
+        if vectors:
+            self._matrix = np.vstack(vectors)
+        self._loaded = True
+
+    def find(self, job_summary):
+        """Return (entry_id, similarity, sections) of the closest CV above the threshold, or None."""
+        vector = summary_vector(job_summary)
+        with self._lock:
+            self._load()
+            if not self._matrix.shape[0] or not vector.any():
+                return None
+            similarities = self._matrix @ vector
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self._threshold:
+                return None
+            return self._ids[best], similarity, self._sections[best]
+
+    def add(self, entry_id, job_summary, sections):
+        """Index the tailored sections generated for a job, in memory and in the table."""
+        vector = summary_vector(job_summary)
+        if not vector.any():
+            return
+        with self._lock:
+            self._load()
+            self._ids.append(entry_id)
+            self._sections.append(sections)
+            self._matrix = np.vstack([self._matrix, vector])
+
+        if not self._table_name:
+            return
+        self._dynamodb.Table(self._table_name).put_item(
+            Item={
+                'entryId': entry_id,
+                'fingerprint': self._fingerprint,
+                'vector': vector.astype(np.float32).tobytes(),
+                'sections': json.dumps(sections),
+                'expiresAt': int(time.time()) + self._ttl_seconds,
+            }
+        )
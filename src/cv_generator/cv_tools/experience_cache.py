@@ -0,0 +1,149 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections.abc import Mapping
+
+# Keys per BatchGetItem request (DynamoDB limit).
+_BATCH_GET_SIZE = 100
+_BATCH_GET_MAX_RETRIES = 5
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _plain(value):
+    """Turn frozen resume data (MappingProxyType / tuples) back into JSON-serializable values."""
+    if isinstance(value, Mapping):
+        return {str(key): _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    return value
+
+
+def entry_hash(entry):
+    """Stable hash of one experience entry from the resume; changes whenever the entry does."""
+    payload = json.dumps(_plain(entry), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def keyword_signature(keywords, top_n=8):
+    """Order-insensitive signature of a job's most important keywords.
+
+    keywords is the job summary's list of {'keyword', 'importance'} objects (plain
+    strings count as importance 3). The top_n terms by importance are lowercased,
+    whitespace-normalized and sorted, so jobs asking for the same things share a signature.
+    """
+    weighted = []
+    for item in keywords or []:
+        if isinstance(item, Mapping):
+            term, importance = item.get('keyword'), item.get('importance', 3)
+        else:
+            term, importance = item, 3
+        term = _WHITESPACE_RE.sub(' ', str(term or '')).strip().lower()
+        if not term:
+            continue
+        try:
+            importance = int(importance)
+        except (TypeError, ValueError):
+            importance = 3
+        weighted.append((importance, term))
+
+    top = sorted(weighted, key=lambda pair: (-pair[0], pair[1]))[:top_n]
+    return '|'.join(sorted({term for _, term in top}))
+
+
+class ExperienceCache:
+    """Cache of tailored experience bullets per (experience entry, keyword signature).
+
+    Keys hash the entry, the job's keyword signature and a fingerprint of the prompt and
+    model, so editing the resume or the prompt yields new keys and old entries expire
+    through the DynamoDB TTL. An in-memory layer survives warm invocations.
+    """
+
+    def __init__(self, dynamodb, table_name, fingerprint='', ttl_days=14):
+        self._dynamodb = dynamodb
+        self._table_name = table_name
+        self._fingerprint = fingerprint
+        self._ttl_seconds = int(ttl_days * 24 * 3600)
+        self._memory = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key_for(self, entry, signature):
+        payload = f"{self._fingerprint}\0{entry_hash(entry)}\0{signature}"
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _batch_get(self, keys):
+        """Chunked BatchGetItem; UnprocessedKeys are retried with bounded backoff, then count as misses."""
+        items = {}
+        for start in range(0, len(keys), _BATCH_GET_SIZE):
+            request = {self._table_name: {'Keys': [{'cacheKey': key} for key in keys[start:start + _BATCH_GET_SIZE]]}}
+            attempt = 0
+            while request:
+                response = self._dynamodb.batch_get_item(RequestItems=request)
+                for item in response.get('Responses', {}).get(self._table_name, []):
+                    items[item['cacheKey']] = item
+                request = response.get('UnprocessedKeys') or None
+                if not request:
+                    break
+                attempt += 1
+                if attempt > _BATCH_GET_MAX_RETRIES:
+                    unprocessed = request.get(self._table_name, {}).get('Keys', [])
+                    print(f'Experience cache: {len(unprocessed)} keys unprocessed after retries; counting them as misses.')
+                    break
+                time.sleep(min(2 ** attempt * 0.05, 1.0))
+        return items
+
+    def get_many(self, keys):
+        """Return a dict of key -> cached tailored entry for the keys that are cached."""
+        with self._lock:
+            found = {key: self._memory[key] for key in keys if key in self._memory}
+        remote_keys = [key for key in dict.fromkeys(keys) if key not in found]
+
+        if remote_keys and self._table_name:
+            now = int(time.time())
+            for key, item in self._batch_get(remote_keys).items():
+                # TTL deletion is lazy, so expired items can still be returned for a while.
+                if int(item.get('expiresAt', 0)) <= now:
+                    continue
+                found[key] = json.loads(item['tailored'])
+            with self._lock:
+                self._memory.update(found)
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(set(keys) - set(found))
+        return found
+
+    def put_many(self, entries):
+        """Store a dict of key -> tailored entry in memory and in the cache table."""
+        if not entries:
+            return
+        with self._lock:
+            self._memory.update(entries)
+        if not self._table_name:
+            return
+
+        expires_at = int(time.time()) + self._ttl_seconds
+        table = self._dynamodb.Table(self._table_name)
+        with table.batch_writer(overwrite_by_pkeys=['cacheKey']) as batch:
+            for key, tailored in entries.items():
+                batch.put_item(
+                    Item={
+                        'cacheKey': key,
+                        'tailored': json.dumps(tailored),
+                        'expiresAt': expires_at,
+                    }
+                )
+
+    def reset_counters(self):
+        """Start counting hits and misses afresh, e.g. per invocation of a warm container."""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def report(self):
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total else 0.0
+        return f"Experience cache: {self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate)."
@@ -0,0 +1,69 @@
+import os
+import threading
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Tuple
+
+_lock = threading.Lock()
+_cache: Dict[Tuple[str, str], Tuple[Tuple[int, int], Any]] = {}
+
+
+def freeze(value: Any) -> Any:
+    """
+    Return a read-only view of parsed data: dicts become MappingProxyType and lists
+    become tuples, recursively, so cached data cannot be mutated by one job and seen
+    by the next.
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """
+    Return a mutable deep copy of frozen data: mappings become dicts and tuples become
+    lists, recursively.
+    """
+    if isinstance(value, Mapping):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+
+def load_cached(path: str, parse: Callable[[str], Any], force: bool = False) -> Any:
+    """
+    Parse a file once per process and reuse the result until it changes.
+
+    The cache is keyed on the path and the parser, and an entry is only reused while
+    the file's mtime and size are unchanged, so edits are picked up without a cold
+    start. The parser receives the path and its result is frozen before caching.
+
+    Args:
+        path: Path of the file to load
+        parse: Callable turning the path into parsed data
+        force: Re-read the file even if it looks unchanged
+
+    Returns:
+        The frozen parsed data
+    """
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    key = (os.path.abspath(path), getattr(parse, '__qualname__', repr(parse)))
+
+    with _lock:
+        entry = _cache.get(key)
+    if entry is not None and entry[0] == signature and not force:
+        return entry[1]
+
+    data = freeze(parse(path))
+    with _lock:
+        _cache[key] = (signature, data)
+    return data
+
+
+def read_text(path: str) -> str:
+    with open(path, 'r', encoding='utf-8') as file:
+        return file.read()
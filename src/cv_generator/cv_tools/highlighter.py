@@ -1,6 +1,123 @@
 import re
+from bisect import bisect_left
 from typing import Dict, Iterable, List, Optional, Tuple, Union
 
+_BOLD_RE = re.compile(r"\\textbf\{[^{}]*\}")
+
+
+def _is_word_char(ch: str) -> bool:
+    # Same characters as the regex class \w for str patterns.
+    return ch.isalnum() or ch == "_"
+
+
+class _KeywordMatcher:
+    """Aho-Corasick automaton over lowercased keywords.
+
+    find_all scans a text once and returns every whole-word, case-insensitive
+    occurrence of every keyword, overlapping ones included, as
+    {keyword: [(start, end), ...]} in text order.
+    """
+
+    def __init__(self, keywords: Iterable[str]) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+        self._lengths: Dict[str, int] = {}
+        self._patterns: Dict[str, re.Pattern] = {}
+        for kw in keywords:
+            if kw:
+                self._insert(kw)
+        self._link()
+
+    def _insert(self, kw: str) -> None:
+        folded = kw.lower()
+        self._lengths[kw] = len(folded)
+        node = 0
+        for ch in folded:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(kw)
+
+    def _link(self) -> None:
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_all(self, text: str) -> Dict[str, List[Tuple[int, int]]]:
+        folded = text.lower()
+        if len(folded) != len(text):
+            # Lowercasing changed the length (e.g. "\u0130"), so offsets would not line up.
+            return self._find_all_regex(text)
+
+        found: Dict[str, List[Tuple[int, int]]] = {}
+        goto, fail, out, lengths = self._goto, self._fail, self._out, self._lengths
+        root = goto[0]
+        node = 0
+        for index, ch in enumerate(folded):
+            if not node:
+                # Fast path: most characters leave the automaton at the root.
+                node = root.get(ch, 0)
+            else:
+                while node and ch not in goto[node]:
+                    node = fail[node]
+                node = goto[node].get(ch, 0)
+            if not out[node]:
+                continue
+            end = index + 1
+            for kw in out[node]:
+                start = end - lengths[kw]
+                if start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if end < len(text) and _is_word_char(text[end]):
+                    continue
+                found.setdefault(kw, []).append((start, end))
+        return found
+
+    def _find_all_regex(self, text: str) -> Dict[str, List[Tuple[int, int]]]:
+        found: Dict[str, List[Tuple[int, int]]] = {}
+        for kw in self._lengths:
+            pattern = self._patterns.get(kw)
+            if pattern is None:
+                pattern = self._patterns[kw] = re.compile(rf"(?=(?<!\w)({re.escape(kw)})(?!\w))", re.IGNORECASE)
+            spans = [m.span(1) for m in pattern.finditer(text)]
+            if spans:
+                found[kw] = spans
+        return found
+
+
+class _Intervals:
+    """Sorted, non-overlapping half-open intervals with overlap-checked insertion."""
+
+    def __init__(self, spans: Iterable[Tuple[int, int]]) -> None:
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+        for start, end in sorted(spans):
+            self._starts.append(start)
+            self._ends.append(end)
+
+    def add(self, start: int, end: int) -> bool:
+        """Insert [start, end) unless it overlaps an interval already present."""
+        index = bisect_left(self._starts, start)
+        if index < len(self._starts) and self._starts[index] < end:
+            return False
+        if index and self._ends[index - 1] > start:
+            return False
+        self._starts.insert(index, start)
+        self._ends.insert(index, end)
+        return True
+
 
 class LatexHighlighter:
     """Bold important keywords using LaTeX \textbf{} with usage limits.
@@ -19,8 +136,8 @@ class LatexHighlighter:
     ) -> None:
         # Normalize keywords -> importance map (1..5)
         self._importance: Dict[str, int] = {}
-        self._patterns: Dict[str, re.Pattern] = {}
         self._order: List[str] = []
+        self._matcher = _KeywordMatcher({})
         self._max_per_text = max(0, int(max_per_text))
         self._max_per_keyword = max(1, int(max_per_keyword))
         self._counts: Dict[str, int] = {}
@@ -36,29 +153,13 @@ class LatexHighlighter:
             return 3
         return max(1, min(5, vi))
 
-    @staticmethod
-    def _word_pattern(term: str) -> str:
-        # Use non-word boundaries to avoid partial matches where possible
-        esc = re.escape(term)
-        return rf"(?<!\w)({esc})(?!\w)"
-
     @staticmethod
     def _bold_spans(text: str) -> List[Tuple[int, int]]:
-        spans: List[Tuple[int, int]] = []
-        for m in re.finditer(r"\\textbf\{[^{}]*\}", text):
-            spans.append((m.start(), m.end()))
-        return spans
-
-    @staticmethod
-    def _in_spans(idx: int, spans: List[Tuple[int, int]]) -> bool:
-        for s, e in spans:
-            if s <= idx < e:
-                return True
-        return False
+        return [(m.start(), m.end()) for m in _BOLD_RE.finditer(text)]
 
     def _reindex(self) -> None:
-        self._patterns = {k: re.compile(self._word_pattern(k), flags=re.IGNORECASE) for k in self._importance}
         self._order = sorted(self._importance, key=lambda k: (self._importance[k], len(k)), reverse=True)
+        self._matcher = _KeywordMatcher(self._importance)
         for k in self._importance:
             self._counts.setdefault(k, 0)
 
@@ -91,41 +192,42 @@ class LatexHighlighter:
     # Removed: load_keywords_from_summary. Pass already-parsed keyword list in constructor or via add_keywords.
 
     def highlight(self, text: str) -> str:
-        if not isinstance(text, str) or not text:
+        """Bold the most important keywords in text.
+
+        All keyword occurrences are found in one pass, then keywords are visited in
+        importance order and each takes its first occurrence that does not overlap an
+        existing or newly added bold span. The edits are applied in one final join.
+        """
+        if not isinstance(text, str) or not text or not self._order:
             return text
 
-        added = 0
-        spans = self._bold_spans(text)
+        budget = self._max_per_text
+        eligible = [kw for kw in self._order if self._counts.get(kw, 0) < self._max_per_keyword]
+        if not budget or not eligible:
+            return text
 
-        for kw in self._order:
-            if added >= self._max_per_text:
+        occurrences = self._matcher.find_all(text)
+        protected = _Intervals(self._bold_spans(text))
+        chosen: List[Tuple[int, int]] = []
+        for kw in eligible:
+            if len(chosen) >= budget:
                 break
-            if self._counts.get(kw, 0) >= self._max_per_keyword:
-                continue
-
-            pat = self._patterns[kw]
-
-            # Find first eligible occurrence not already bolded
-            m = pat.search(text)
-            while m and self._in_spans(m.start(), spans):
-                m = pat.search(text, m.end())
+            for start, end in occurrences.get(kw, ()):
+                if protected.add(start, end):
+                    chosen.append((start, end))
+                    self._counts[kw] = self._counts.get(kw, 0) + 1
+                    break
 
-            if not m:
-                continue
-
-            # Apply bolding once for this keyword in this call
-            start, end = m.start(), m.end()
-            original = text[start:end]
-            replacement = "\\textbf{" + original + "}"
-            text = text[:start] + replacement + text[end:]
-            # Update spans and counters
-            delta = len(replacement) - (end - start)
-            spans = [(s if s < start else s + delta, e if e < start else e + delta) for (s, e) in spans]
-            spans.append((start, start + len(replacement)))
-            self._counts[kw] = self._counts.get(kw, 0) + 1
-            added += 1
-
-        return text
+        if not chosen:
+            return text
+        parts = []
+        position = 0
+        for start, end in sorted(chosen):
+            parts.append(text[position:start])
+            parts.append("\\textbf{" + text[start:end] + "}")
+            position = end
+        parts.append(text[position:])
+        return "".join(parts)
 
     def usage(self) -> Dict[str, int]:
         return dict(self._counts)
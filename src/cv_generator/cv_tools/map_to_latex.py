@@ -1,6 +1,15 @@
-from jinja2 import Template
 from typing import List, Dict, Any
 
+# Support both package layouts:
+# - CodeUri: src/cv_generator (imports like 'latex.*')
+# - CodeUri: src (imports like 'cv_generator.latex.*')
+try:
+    from latex.environment import render_static
+    from latex.escaping import escape_latex
+except ModuleNotFoundError:
+    from cv_generator.latex.environment import render_static
+    from cv_generator.latex.escaping import escape_latex
+
 def fix_latex_special_chars(text):
     """
     Replace special LaTeX characters with their escaped versions.
@@ -9,44 +18,10 @@ def fix_latex_special_chars(text):
         text (str): Input text containing potential LaTeX special characters
 
     Returns:
-        str: Text with LaTeX special characters properly escaped
+        str: Text with LaTeX special characters properly escaped; sequences that are
+        already escaped are kept as they are.
     """
-    # Dictionary of special characters and their LaTeX equivalents
-    special_chars = {
-        '#': r'\#',
-        '$': r'\$',
-        '%': r'\%',
-        '&': r'\&',
-        '_': r'\_',
-        '{': r'\{',
-        '}': r'\}',
-        '~': r'\~',
-        '^': r'\^',
-    }
-
-    # Convert the input string into a list of characters
-    chars = list(text)
-    i = 0
-
-    # Process each character only once
-    while i < len(chars):
-        if chars[i] in special_chars and (i == 0 or chars[i - 1] != '\\'):
-            # Get the replacement string
-            replacement = special_chars[chars[i]]
-
-            # Remove the original character
-            chars.pop(i)
-
-            # Insert each character of the replacement
-            for j, rep_char in enumerate(replacement):
-                chars.insert(i + j, rep_char)
-
-            # Skip the inserted replacement
-            i += len(replacement)
-        else:
-            i += 1
-
-    return ''.join(chars)
+    return escape_latex(text)
 
 
 def generate_skills_latex(skills):
@@ -104,11 +79,6 @@ def generate_project_latex(project: dict):
 
 
 def make_certifications(certs):
-    certs_template = r"""
-        \bigskip
-        \section{Certifications}
-            {{items}}
-    """
     items_text = ""
     for cert in certs:
         name = cert.get('name', '')
@@ -119,7 +89,7 @@ def make_certifications(certs):
         else:
             rendered_name = name
         items_text += f"        \\certificationitem{{{rendered_name}}}{{{date}}}\n\n"
-    return Template(certs_template).render(items=items_text)
+    return render_static('certifications', items=items_text)
 
 
 def make_profile_bullet(bullets):
@@ -134,23 +104,10 @@ def make_profile_bullet(bullets):
 def sanitize_latex(text: str) -> str:
     """
     Escapes special LaTeX characters in a given string.
-    This is crucial for handling text from an LLM.
+    This is crucial for handling text from an LLM, which usually arrives escaped
+    already; escaped sequences are left alone rather than escaped twice.
     """
-    replacements = {
-        '&': r'\\&',
-        '%': r'\\%',
-        '$': r'\\$',
-        '#': r'\\#',
-        '_': r'\\_',
-        '{': r'\\{',
-        '}': r'\\}',
-        '~': r'\\textasciitilde{}',
-        '^': r'\\textasciicircum{}',
-        '\\': r'\\textbackslash{}',
-    }
-    for char, replacement in replacements.items():
-        text = text.replace(char, replacement)
-    return text
+    return escape_latex(text)
 
 
 def make_single_experience(original_experience: Dict[str, Any], tailored_experience: Dict[str, Any]) -> str:
@@ -198,7 +155,9 @@ def make_experience_items(original_experiences: List[Dict[str, Any]],
 
     Args:
         original_experiences: The full list of jobs from your YAML.
-        tailored_experiences: The list of tailored data from the LLM.
+        tailored_experiences: The tailored data from the LLM, in the same order. Any
+            iterable works, but create_cv passes the complete, validated list: streamed
+            entries are collected (and missing ones requested again) before rendering.
 
     Returns:
         The complete LaTeX string for the work experience section.
@@ -207,13 +166,14 @@ def make_experience_items(original_experiences: List[Dict[str, Any]],
 
     # Zip the lists together. This assumes the LLM returns tailored data
     # in the exact same order as the jobs you sent in the prompt.
-    if len(original_experiences) != len(tailored_experiences):
-        print("Warning: Mismatch between number of original jobs and tailored results from LLM.")
-        # Handle this error gracefully, maybe by using the shorter list length
-
     for original_exp, tailored_exp in zip(original_experiences, tailored_experiences):
         items_text.append(make_single_experience(original_exp, tailored_exp))
 
+    if len(items_text) != len(original_experiences) or (
+        hasattr(tailored_experiences, '__len__') and len(tailored_experiences) != len(items_text)
+    ):
+        print("Warning: Mismatch between number of original jobs and tailored results from LLM.")
+
     return "\n".join(items_text)
 
 
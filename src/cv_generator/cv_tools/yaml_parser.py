@@ -1,5 +1,16 @@
 import yaml
-from typing import Any, Dict, List, Optional
+from collections.abc import Mapping
+from typing import Any, Dict, Optional
+
+from .file_cache import load_cached, thaw
+
+# Use the libyaml-backed loader when PyYAML was built with it.
+_SafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def _parse_yaml(path: str) -> Dict[str, Any]:
+    with open(path, 'r') as file:
+        return yaml.load(file, Loader=_SafeLoader) or {}
 
 
 class Loader:
@@ -7,6 +18,9 @@ class Loader:
         """
         Initialize the Loader with a YAML file path.
 
+        Parsed data is shared process-wide and only re-parsed when the file changes;
+        it is returned as read-only views (mappings and tuples).
+
         Args:
             yaml_file_path (str): Path to the YAML file
         """
@@ -15,19 +29,18 @@ class Loader:
         self._load_yaml()
     # will get the raw yaml file as string
     def get_raw(self):
-        return str(self._config_data)
+        return str(self.data)
 
-    def _load_yaml(self) -> None:
+    def _load_yaml(self, force: bool = False) -> None:
         """
-        Load the YAML file and store its contents.
+        Load the YAML file (or its cached parse) and store its contents.
 
         Raises:
             FileNotFoundError: If the YAML file doesn't exist
             yaml.YAMLError: If there's an error parsing the YAML file
         """
         try:
-            with open(self._yaml_file_path, 'r') as file:
-                self._config_data = yaml.safe_load(file)
+            self._config_data = load_cached(self._yaml_file_path, _parse_yaml, force=force)
         except FileNotFoundError:
             raise FileNotFoundError(f"YAML file not found: {self._yaml_file_path}")
         except yaml.YAMLError as e:
@@ -57,7 +70,7 @@ class Loader:
         """
         current = self._config_data
         for key in keys:
-            if isinstance(current, dict):
+            if isinstance(current, Mapping):
                 current = current.get(key)
                 if current is None:
                     return None
@@ -67,16 +80,16 @@ class Loader:
 
     def reload(self) -> None:
         """
-        Reload the YAML file contents.
+        Reload the YAML file contents, bypassing the process-wide cache.
         """
-        self._load_yaml()
+        self._load_yaml(force=True)
 
     @property
     def data(self) -> Dict[str, Any]:
         """
-        Get all configuration data.
+        Get all configuration data as a mutable deep copy.
 
         Returns:
             Dict[str, Any]: The complete configuration data
         """
-        return self._config_data.copy()
+        return thaw(self._config_data)
@@ -1,6 +1,10 @@
 import json
 import os
-import re
+import queue
+import threading
+import time
+import uuid
+from functools import lru_cache
 
 from google import genai
 
@@ -8,68 +12,295 @@ from google import genai
 # - CodeUri: src/cv_generator (imports like 'gen_ai.*')
 # - CodeUri: src (imports like 'cv_generator.gen_ai.*')
 try:
+    from gen_ai.json_stream import JSONStreamParser
     from gen_ai.llm_interface import extract_json_content, LLM_interface
+    from gen_ai.rate_limiter import BASE_BACKOFF_SECONDS, estimate_tokens, is_rate_limit_error
+    from latex.escaping import escape_latex, escape_latex_in_json
 except ModuleNotFoundError:
+    from cv_generator.gen_ai.json_stream import JSONStreamParser
     from cv_generator.gen_ai.llm_interface import extract_json_content, LLM_interface
+    from cv_generator.gen_ai.rate_limiter import BASE_BACKOFF_SECONDS, estimate_tokens, is_rate_limit_error
+    from cv_generator.latex.escaping import escape_latex, escape_latex_in_json
 
+# Retries of a single call after a 429 before the error is raised.
+MAX_RATE_LIMIT_RETRIES = 4
+# Connection pool of the shared client; keep-alive connections survive between warm invocations.
+GEMINI_MAX_CONNECTIONS = int(os.environ.get('GEMINI_MAX_CONNECTIONS', '20'))
+# HTTP timeout of a single request, so a stuck call fails instead of using up the function timeout.
+GEMINI_TIMEOUT_SECONDS = float(os.environ.get('GEMINI_TIMEOUT_SECONDS', '240'))
+# Batch job states (google.genai JobState names) after which no more results arrive.
+BATCH_SUCCEEDED_STATES = {'JOB_STATE_SUCCEEDED', 'JOB_STATE_PARTIALLY_SUCCEEDED'}
+BATCH_FAILED_STATES = {'JOB_STATE_FAILED', 'JOB_STATE_CANCELLED', 'JOB_STATE_EXPIRED'}
 
-def escape_latex(text: str) -> str:
-    """
-    Escapes special LaTeX characters in a single string.
+
+@lru_cache(maxsize=None)
+def get_client(api_key, base_url=None):
+    """Return the process-wide Gemini client for api_key.
+
+    Every AskGemini instance (and every model) shares it, so its pooled HTTP connections
+    are reused across calls and across warm Lambda invocations instead of a new TLS
+    handshake per instance. base_url points the client at another endpoint, such as
+    batch_stub_server.py.
     """
-    if not isinstance(text, str):
-        return text
+    limits = {'max_connections': GEMINI_MAX_CONNECTIONS, 'max_keepalive_connections': GEMINI_MAX_CONNECTIONS}
+    http_options = {'timeout': int(GEMINI_TIMEOUT_SECONDS * 1000)}
+    if base_url:
+        http_options['base_url'] = base_url
+    try:
+        import httpx
 
-    special_chars = {
-        '&': r'\&', '%': r'\%', '$': r'\$', '#': r'\#', '_': r'\_',
-        '{': r'\{', '}': r'\}', '~': r'\textasciitilde{}',
-        '^': r'\textasciicircum{}', '\\': r'\textbackslash{}',
-    }
-    pattern = re.compile('|'.join(re.escape(k) for k in special_chars.keys()))
-    return pattern.sub(lambda m: special_chars[m.group(0)], text)
+        http_options['client_args'] = {'limits': httpx.Limits(**limits)}
+    except ImportError:
+        pass
+    return genai.Client(api_key=api_key, http_options=http_options)
 
 
-def escape_latex_in_json(data):
-    """
-    Recursively walks a data structure (dict or list from a parsed JSON)
-    and applies LaTeX escaping to all string values found within.
-    """
-    if isinstance(data, dict):
-        return {key: escape_latex_in_json(value) for key, value in data.items()}
-    elif isinstance(data, list):
-        return [escape_latex_in_json(element) for element in data]
-    elif isinstance(data, str):
-        return escape_latex(data)
-    else:  # For int, float, bool, None, etc.
-        return data
+def _json_config(schema):
+    return {'response_mime_type': 'application/json', 'response_json_schema': schema}
+
+
+# Queued by the stream reader thread after the last chunk.
+_STREAM_END = object()
+
+
+def _state_name(state):
+    return getattr(state, 'name', None) or str(state)
 
 
 class AskGemini(LLM_interface):
-    def __init__(self, model_name):
+    def __init__(self, model_name, rate_limiter=None):
         super().__init__()
         api_key = os.getenv('GEMINI_API_KEY') or os.getenv('gemini_api_key')
         if not api_key:
             raise ValueError('Gemini API key is not set. Use GEMINI_API_KEY or gemini_api_key.')
-        self._client = genai.Client(api_key=api_key)
+        self._client = get_client(api_key, os.getenv('GEMINI_BASE_URL') or None)
         self._model_name = model_name
+        self._rate_limiter = rate_limiter
+        # Usage events of every call made through this instance (and copies from with_model).
+        self.usage_events = []
+
+    def _call_with_retries(self, prompt, request, model=None):
+        """Run request(model_name), waiting for rate-limit room first and backing off on 429 responses.
 
-    def ask(self, prompt, be_json=False):
+        Returns (reserved usage event or None, request result).
+        """
+        model_name = model or self._model_name
+        prompt_tokens = estimate_tokens(prompt)
+        event = None
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            if self._rate_limiter:
+                with self._waiting(model_name):
+                    event = self._rate_limiter.acquire(model_name, prompt_tokens)
+            try:
+                return event, request(model_name)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == MAX_RATE_LIMIT_RETRIES:
+                    raise
+                if self._rate_limiter:
+                    # The next acquire() waits the backoff out.
+                    backoff = self._rate_limiter.throttled(model_name)
+                else:
+                    backoff = BASE_BACKOFF_SECONDS * 2 ** attempt
+                    with self._waiting(model_name):
+                        time.sleep(backoff)
+                print(f'Rate limited on {model_name}; backing off {backoff:.0f}s (attempt {attempt + 1}).')
+
+    def _record_usage(self, event, model_name, prompt, usage, text):
+        """Settle the reserved event with the actual token count and keep it in usage_events."""
+        tokens = getattr(usage, 'total_token_count', None) or estimate_tokens(prompt) + estimate_tokens(text)
+        if self._rate_limiter:
+            self._rate_limiter.settle(event, tokens)
+            self._rate_limiter.succeeded(model_name)
+        else:
+            event = {'id': uuid.uuid4().hex, 'model': model_name, 'tokens': tokens, 'at': time.time()}
+        self.usage_events.append(event)
+
+    def _generate(self, prompt, config=None, model=None):
+        """Call the model, waiting for rate-limit room first and backing off on 429 responses."""
+        model_name = model or self._model_name
+
+        def request(name):
+            # Only the request itself is reported, not the rate-limit wait or 429 backoffs.
+            start = time.monotonic()
+            response = self._client.models.generate_content(model=name, contents=prompt, config=config)
+            self._observe_latency(name, time.monotonic() - start)
+            return response
+
+        event, response = self._call_with_retries(prompt, request, model_name)
+        self._record_usage(event, model_name, prompt, getattr(response, 'usage_metadata', None), response.text)
+        return response
+
+    def _open_stream(self, model_name, prompt, config=None):
+        """Start a streaming call; the first chunk is fetched here so 429s surface before anything is yielded."""
+        chunks = iter(self._client.models.generate_content_stream(model=model_name, contents=prompt, config=config))
+        first = next(chunks, None)
+        return first, chunks
+
+    def _read_stream(self, prompt, model_name, config, out):
+        """Reader thread of ask_stream: open the stream (with 429 retries) and queue its text chunks.
+
+        Ends with _STREAM_END, or with the exception that stopped it. It reads to the end
+        even when ask_stream has stopped waiting, so the usage recorded is complete; usage
+        is recorded before _STREAM_END is queued.
+        """
+        event, usage, text_parts = None, None, []
+        try:
+            event, (chunk, chunks) = self._call_with_retries(
+                prompt, lambda name: self._open_stream(name, prompt, config), model_name
+            )
+            while chunk is not None:
+                text = chunk.text or ''
+                text_parts.append(text)
+                usage = getattr(chunk, 'usage_metadata', None) or usage
+                out.put(text)
+                chunk = next(chunks, None)
+        except Exception as e:
+            if text_parts:
+                self._record_usage(event, model_name, prompt, usage, ''.join(text_parts))
+            out.put(e)
+            return
+        self._record_usage(event, model_name, prompt, usage, ''.join(text_parts))
+        out.put(_STREAM_END)
+
+    def ask_stream(self, prompt, timeout=None, model=None, schema=None):
+        """
+        Streams a JSON response and yields its top-level items as soon as each is complete:
+        array elements, or (key, value) pairs for an object. Items are LaTeX-escaped like
+        ask(prompt, be_json=True) would return them. A schema is sent as the response
+        schema, as in ask_json_text, so the stream is bare JSON matching it.
+
+        The chunks are read on a separate thread, so a timeout (seconds) bounds the wait
+        even while no chunk arrives: the stream stops at the deadline and the items
+        already yielded stay valid. The abandoned request finishes in the background,
+        bounded by the client's HTTP timeout. Errors are raised once the items before
+        them have been yielded.
+        """
+        model_name = model or self._model_name
+        deadline = time.monotonic() + timeout if timeout else None
+        chunks = queue.Queue()
+        threading.Thread(
+            target=self._read_stream,
+            args=(prompt, model_name, _json_config(schema) if schema else None, chunks),
+            name='gemini-stream',
+            daemon=True,
+        ).start()
+
+        parser = JSONStreamParser()
+        while not parser.complete:
+            try:
+                if deadline is None:
+                    chunk = chunks.get()
+                else:
+                    chunk = chunks.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                print(f'Stream from {model_name} timed out after {parser.items_parsed} items.')
+                return
+            if chunk is _STREAM_END:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            for item in parser.feed(chunk):
+                yield escape_latex_in_json(item)
+
+    def ask(self, prompt, be_json=False, model=None):
         """
         Sends a prompt to the Gemini API and returns a LaTeX-safe response.
 
         - If be_json is False: Returns raw text with special characters escaped.
         - If be_json is True: Returns a JSON object where all internal
           string values have also been escaped for LaTeX.
+
+        model overrides the instance's model for this call only.
         """
-        response = self._client.models.generate_content(
-            model=self._model_name,
-            contents=prompt,
-        )
+        response = self._generate(prompt, model=model)
 
         if be_json:
             parsed_json = json.loads(extract_json_content(response.text))
             return escape_latex_in_json(parsed_json)
         return escape_latex(response.text)
 
+    def ask_json_text(self, prompt, schema, model=None):
+        """Generate with the JSON response-schema mode, so the model returns bare JSON matching schema."""
+        return self._generate(prompt, config=_json_config(schema), model=model).text
+
+    def postprocess_json(self, value):
+        return escape_latex_in_json(value)
+
+    def submit_batch(self, requests, display_name=None):
+        """
+        Submits prompts to the Gemini Batch API instead of calling the model for each one.
+        Batch jobs are billed at a discount and do not count against the interactive rate
+        limits, but results can take hours.
+
+        requests maps a key to (model or None for this instance's model, prompt, JSON
+        schema or None for a text response). A batch job runs a single model, so there is
+        one job per model. Returns a JSON-serializable handle to persist and later pass
+        to batch_results.
+        """
+        by_model = {}
+        for key, (model, prompt, schema) in requests.items():
+            by_model.setdefault(model or self._model_name, []).append((key, prompt, schema))
+
+        jobs = []
+        for model_name, entries in by_model.items():
+            src = []
+            for key, prompt, schema in entries:
+                request = {'contents': [{'role': 'user', 'parts': [{'text': prompt}]}], 'metadata': {'key': key}}
+                if schema is not None:
+                    request['config'] = _json_config(schema)
+                src.append(request)
+            config = {'display_name': display_name} if display_name else None
+            job = self._client.batches.create(model=model_name, src=src, config=config)
+            print(f'Submitted batch job {job.name} with {len(src)} {model_name} requests.')
+            jobs.append({
+                'name': job.name,
+                'model': model_name,
+                'keys': [key for key, _, _ in entries],
+                'json_keys': [key for key, _, schema in entries if schema is not None],
+            })
+        return {'jobs': jobs}
+
+    def batch_results(self, handle):
+        """
+        Returns None while any job of a submit_batch handle is still running, otherwise
+        (results, errors): results maps each answered key to its LaTeX-escaped response
+        (parsed JSON for requests with a schema), errors maps the other keys to a message.
+        """
+        finished = []
+        for job_ref in handle['jobs']:
+            job = self._client.batches.get(name=job_ref['name'])
+            state = _state_name(job.state)
+            if state not in BATCH_SUCCEEDED_STATES and state not in BATCH_FAILED_STATES:
+                return None
+            finished.append((job_ref, job, state))
+
+        results, errors = {}, {}
+        for job_ref, job, state in finished:
+            if state in BATCH_FAILED_STATES:
+                message = f"Batch job {job_ref['name']} ended in {state}: {getattr(job, 'error', None)}"
+                errors.update({key: message for key in job_ref['keys']})
+                continue
+            json_keys = set(job_ref['json_keys'])
+            responses = (job.dest.inlined_responses if job.dest else None) or []
+            for index, key in enumerate(job_ref['keys']):
+                inlined = responses[index] if index < len(responses) else None
+                metadata = getattr(inlined, 'metadata', None) or {}
+                if metadata.get('key', key) != key:
+                    # Responses are returned in request order; the key is only a cross-check.
+                    inlined = next((r for r in responses if (r.metadata or {}).get('key') == key), None)
+                if inlined is None or inlined.error or inlined.response is None:
+                    error = getattr(inlined, 'error', None)
+                    errors[key] = getattr(error, 'message', None) or str(error or 'No response in the batch output.')
+                    continue
+                text = inlined.response.text or ''
+                try:
+                    if key in json_keys:
+                        results[key] = escape_latex_in_json(json.loads(extract_json_content(text)))
+                    else:
+                        results[key] = escape_latex(text)
+                except ValueError as e:
+                    errors[key] = f'Invalid JSON in the batch response: {e}'
+        return results, errors
+
     def swap_model(self, model_name):
         self._model_name = model_name
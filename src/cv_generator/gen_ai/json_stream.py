@@ -0,0 +1,101 @@
+import json
+
+_OPENERS = '[{'
+_CLOSERS = ']}'
+
+
+class JSONStreamParser:
+    """Incremental parser for a JSON array or object arriving in text chunks.
+
+    feed() returns the top-level items completed by the new text: each element of a
+    top-level array, or each (key, value) pair of a top-level object. The value starts
+    at the first bracket after a ``` fence, or at the first bracket that opens a line;
+    text before it (such as "Here [is] the JSON:") and after the closing bracket is
+    ignored, so model responses can be fed as they stream in.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._pos = 0
+        self._container = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._item_start = None
+        # Before the value: whether only whitespace precedes on this line, whether a
+        # fence was seen, and the run of backticks so far.
+        self._line_start = True
+        self._fenced = False
+        self._backticks = 0
+        self.complete = False
+        self.items_parsed = 0
+
+    def _finish_item(self, end):
+        start, self._item_start = self._item_start, None
+        if start is None:
+            return []
+        segment = self._buffer[start:end].strip()
+        self.items_parsed += 1
+        if self._container == '[':
+            return [json.loads(segment)]
+        return list(json.loads('{' + segment + '}').items())
+
+    def feed(self, text):
+        """Add the next chunk of text; returns the list of items it completed."""
+        if self.complete or not text:
+            return []
+        self._buffer += text
+        items = []
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer):
+            ch = buffer[i]
+            if self._container is None:
+                if ch in _OPENERS and (self._line_start or self._fenced):
+                    self._container = ch
+                    self._depth = 1
+                elif ch == '`':
+                    self._backticks += 1
+                    self._fenced = self._fenced or self._backticks == 3
+                    self._line_start = False
+                else:
+                    self._backticks = 0
+                    if ch == '\n':
+                        self._line_start = True
+                    elif not ch.isspace():
+                        self._line_start = False
+            elif self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == '\\':
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._item_start is None:
+                    self._item_start = i
+            elif ch in _OPENERS:
+                if self._depth == 1 and self._item_start is None:
+                    self._item_start = i
+                self._depth += 1
+            elif ch in _CLOSERS:
+                self._depth -= 1
+                if self._depth == 0:
+                    items.extend(self._finish_item(i))
+                    self.complete = True
+                    i += 1
+                    break
+            elif ch == ',' and self._depth == 1:
+                items.extend(self._finish_item(i))
+            elif self._depth == 1 and self._item_start is None and not ch.isspace():
+                self._item_start = i
+            i += 1
+
+        # Drop the consumed prefix, keeping the item in progress.
+        keep = self._item_start if self._item_start is not None else i
+        self._buffer = buffer[keep:]
+        self._pos = i - keep
+        if self._item_start is not None:
+            self._item_start = 0
+        return items
@@ -1,3 +1,37 @@
+import asyncio
+import copy
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# Support both package layouts:
+# - CodeUri: src/cv_generator (imports like 'gen_ai.*')
+# - CodeUri: src (imports like 'cv_generator.gen_ai.*')
+try:
+    from gen_ai.schemas import validate
+except ModuleNotFoundError:
+    from cv_generator.gen_ai.schemas import validate
+
+# Default number of prompts in flight for ask_many.
+DEFAULT_ASK_CONCURRENCY = 4
+# Repair retries of a structured call whose response does not parse or validate.
+MAX_REPAIR_ATTEMPTS = 1
+
+# Copy of REPAIR_PROMPT in job_finder/app.py (a separate package); keep them in sync.
+REPAIR_PROMPT = """{prompt}
+
+---
+Your previous response to the request above was rejected:
+{errors}
+
+Previous response:
+{response}
+
+Respond again with only a JSON value that fixes these problems and matches this JSON schema:
+{schema}
+"""
+
+
 def extract_json_content(text):
     start_marker = '```json'
     end_marker = '```'
@@ -17,13 +51,140 @@ def extract_json_content(text):
     return text[start_pos:end_pos].strip()
 
 
+class StructuredOutputError(ValueError):
+    """A structured response that still failed to parse or validate after the repair retries."""
+
+    def __init__(self, errors, response):
+        super().__init__('; '.join(errors[:5]))
+        self.errors = errors
+        self.response = response
+
+
 class LLM_interface:
+    # Called as latency_observer(model, seconds) with the duration of each successful model
+    # request, excluding rate-limit waits and retries; set by wrappers such as ResilientLLM.
+    latency_observer = None
+    # Called as wait_observer(model, waiting) with True when a call starts waiting for
+    # rate-limit room or a 429 backoff and False when it stops, so wrappers can leave
+    # that time out of their timeouts.
+    wait_observer = None
 
     def __init__(self):
         pass
 
-    def ask(self, prompt, be_json=False):
+    @property
+    def model_name(self):
+        """Model used by calls that do not pass model=; None for providers without one."""
+        return getattr(self, '_model_name', None)
+
+    def _observe_latency(self, model, seconds):
+        """Report the duration of one model request to latency_observer, if set."""
+        if self.latency_observer is not None:
+            self.latency_observer(model, seconds)
+
+    @contextmanager
+    def _waiting(self, model):
+        """Report the block as a rate-limit wait to wait_observer, if set."""
+        if self.wait_observer is None:
+            yield
+            return
+        self.wait_observer(model, True)
+        try:
+            yield
+        finally:
+            self.wait_observer(model, False)
+
+    def ask(self, prompt, be_json=False, model=None):
+        """Send prompt and return the response (parsed JSON when be_json).
+
+        model overrides the instance's model for this call only, without mutating the
+        instance, so one instance can be shared by concurrent callers.
+        """
         raise NotImplementedError
 
+    async def ask_async(self, prompt, be_json=False, model=None):
+        """ask() for asyncio callers; the blocking call runs in a worker thread."""
+        return await asyncio.to_thread(self.ask, prompt, be_json, model)
+
+    def ask_many(self, prompts, be_json=False, concurrency=DEFAULT_ASK_CONCURRENCY, model=None):
+        """Ask several independent prompts with up to concurrency calls in flight.
+
+        Results are returned in prompt order; the first failure is raised.
+        """
+        prompts = list(prompts)
+        if not prompts:
+            return []
+        if concurrency <= 1 or len(prompts) == 1:
+            return [self.ask(prompt, be_json, model) for prompt in prompts]
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(prompts))) as executor:
+            return list(executor.map(lambda prompt: self.ask(prompt, be_json, model), prompts))
+
+    def ask_stream(self, prompt, timeout=None, model=None, schema=None):
+        """Yield the top-level items of a JSON response (array elements or (key, value) pairs).
+
+        Implementations that support streaming yield each item as soon as it has arrived,
+        constrained to schema where supported; this fallback waits for the whole response.
+        """
+        if schema is not None:
+            response = self.ask_structured(prompt, schema, model=model)
+        else:
+            response = self.ask(prompt, True, model)
+        if isinstance(response, dict):
+            yield from response.items()
+        elif isinstance(response, list):
+            yield from response
+        else:
+            yield response
+
+    def ask_json_text(self, prompt, schema, model=None):
+        """Return the raw JSON text of a response to prompt, constrained to schema where supported.
+
+        This fallback serializes ask(prompt, be_json=True); providers with a JSON
+        response-schema mode override it.
+        """
+        return json.dumps(self.ask(prompt, True, model))
+
+    def postprocess_json(self, value):
+        """Hook applied to a validated structured response (e.g. escaping); identity by default."""
+        return value
+
+    def ask_structured(self, prompt, schema, max_repairs=MAX_REPAIR_ATTEMPTS, model=None):
+        """Ask for a JSON response matching schema and return it parsed and validated.
+
+        A response that does not parse or validate is sent back once (by default) with the
+        errors for a targeted repair, so only this call is retried rather than the whole
+        pipeline. Raises StructuredOutputError if it is still invalid.
+        """
+        request = prompt
+        for attempt in range(max_repairs + 1):
+            response = self.ask_json_text(request, schema, model)
+            try:
+                value = json.loads(extract_json_content(response))
+            except ValueError as e:
+                errors = [f'$: response is not valid JSON ({e})']
+            else:
+                errors = validate(value, schema)
+                if not errors:
+                    return self.postprocess_json(value)
+            if attempt < max_repairs:
+                print(f'Structured response rejected ({len(errors)} problems); asking for a repair.')
+                request = REPAIR_PROMPT.format(
+                    prompt=prompt,
+                    errors='\n'.join(f'- {error}' for error in errors[:20]),
+                    response=response,
+                    schema=json.dumps(schema),
+                )
+        raise StructuredOutputError(errors, response)
+
     def swap_model(self, model_name):
         raise NotImplementedError
+
+    def with_model(self, model_name):
+        """Return a copy that uses model_name, leaving this instance untouched.
+
+        Unlike swap_model, this is safe when the instance is shared between threads;
+        passing model= to a single call is the lighter alternative.
+        """
+        clone = copy.copy(self)
+        clone.swap_model(model_name)
+        return clone
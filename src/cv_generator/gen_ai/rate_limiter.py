@@ -0,0 +1,162 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+
+# Support both package layouts:
+# - CodeUri: src/cv_generator (imports like 'gen_ai.*')
+# - CodeUri: src (imports like 'cv_generator.gen_ai.*')
+try:
+    from gen_ai.model_names import Flash, FlashNew, Pro
+except ModuleNotFoundError:
+    from cv_generator.gen_ai.model_names import Flash, FlashNew, Pro
+
+# Requests and tokens per minute. Override with GEMINI_RATE_LIMITS, e.g.
+# '{"gemini-2.5-pro": {"rpm": 5, "tpm": 250000}}'.
+DEFAULT_LIMITS = {
+    Flash: {'rpm': 15, 'tpm': 1000000},
+    FlashNew: {'rpm': 10, 'tpm': 250000},
+    Pro: {'rpm': 5, 'tpm': 250000},
+}
+FALLBACK_LIMIT = {'rpm': 5, 'tpm': 250000}
+
+WINDOW_SECONDS = 60.0
+BASE_BACKOFF_SECONDS = 5.0
+MAX_BACKOFF_SECONDS = 120.0
+
+
+def estimate_tokens(text):
+    """Rough token estimate (about four characters per token)."""
+    return len(text or '') // 4 + 1
+
+
+def is_rate_limit_error(error):
+    """True for a 429 / RESOURCE_EXHAUSTED error from the Gemini client."""
+    code = getattr(error, 'code', None) or getattr(error, 'status_code', None)
+    return code == 429 or 'RESOURCE_EXHAUSTED' in str(error)
+
+
+class RateLimiter:
+    """Sliding-window request and token accounting against per-model RPM/TPM limits.
+
+    Every model call reserves a usage event before it is sent. Events can be exported and loaded
+    back (loading is idempotent), so a durable handler can rebuild the window from
+    checkpointed step results on replay. A 429 response blocks the model for an
+    exponentially growing backoff that shrinks again after successful calls.
+    """
+
+    def __init__(self, limits=None, window=WINDOW_SECONDS):
+        self._limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self._window = window
+        self._events = defaultdict(deque)
+        self._event_ids = set()
+        self._backoff = {}
+        self._blocked_until = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        raw = os.environ.get('GEMINI_RATE_LIMITS')
+        return cls(json.loads(raw) if raw else None)
+
+    def limit_for(self, model):
+        return self._limits.get(model, FALLBACK_LIMIT)
+
+    def _prune(self, model, now):
+        events = self._events[model]
+        while events and events[0]['at'] <= now - self._window:
+            events.popleft()
+
+    def _add(self, event):
+        if event['id'] in self._event_ids:
+            return
+        self._event_ids.add(event['id'])
+        events = self._events[event['model']]
+        events.append(event)
+        if len(events) > 1 and events[-2]['at'] > event['at']:
+            self._events[event['model']] = deque(sorted(events, key=lambda e: e['at']))
+
+    def load_events(self, events):
+        """Merge usage events exported from another process or a checkpoint."""
+        with self._lock:
+            for event in events or []:
+                self._add(event)
+
+    def _delay_locked(self, model, requests, tokens, now):
+        limit = self.limit_for(model)
+        self._prune(model, now)
+        events = list(self._events[model])
+        delay = max(0.0, self._blocked_until.get(model, 0.0) - now)
+
+        # Earliest time at which dropping the oldest events leaves room for this usage.
+        excess_requests = len(events) + requests - limit['rpm']
+        if excess_requests > 0 and events:
+            index = min(excess_requests, len(events)) - 1
+            delay = max(delay, events[index]['at'] + self._window - now)
+
+        used_tokens = sum(event['tokens'] for event in events)
+        excess_tokens = used_tokens + tokens - limit['tpm']
+        for event in events:
+            if excess_tokens <= 0:
+                break
+            excess_tokens -= event['tokens']
+            delay = max(delay, event['at'] + self._window - now)
+        return delay
+
+    def delay_for(self, planned, now=None):
+        """Seconds to wait before the planned usage ({model: {'requests', 'tokens'}}) fits every limit."""
+        now = now or time.time()
+        with self._lock:
+            return max(
+                [self._delay_locked(model, usage['requests'], usage['tokens'], now) for model, usage in planned.items()],
+                default=0.0,
+            )
+
+    def acquire(self, model, tokens):
+        """Block until one call of the given size fits the model's limits, then reserve it.
+
+        Returns the reserved usage event; pass it to settle() once the real token
+        count is known. Reserving up front keeps concurrent callers from all seeing
+        the same free slot.
+        """
+        while True:
+            with self._lock:
+                now = time.time()
+                delay = self._delay_locked(model, 1, tokens, now)
+                if delay <= 0:
+                    event = {'id': uuid.uuid4().hex, 'model': model, 'tokens': int(tokens), 'at': now}
+                    self._add(event)
+                    return event
+            time.sleep(delay)
+
+    def settle(self, event, tokens):
+        """Replace a reserved event's estimated token count with the actual one."""
+        with self._lock:
+            event['tokens'] = int(tokens)
+
+    def throttled(self, model):
+        """Register a 429 for model; returns the backoff now in force."""
+        with self._lock:
+            backoff = min(MAX_BACKOFF_SECONDS, max(BASE_BACKOFF_SECONDS, self._backoff.get(model, 0.0) * 2))
+            self._backoff[model] = backoff
+            self._blocked_until[model] = time.time() + backoff
+            return backoff
+
+    def succeeded(self, model):
+        with self._lock:
+            if model in self._backoff:
+                self._backoff[model] /= 2
+                if self._backoff[model] < BASE_BACKOFF_SECONDS:
+                    del self._backoff[model]
+
+
+def summarize_usage(events):
+    """Collapse usage events into {model: {'requests': n, 'tokens': t}}."""
+    planned = {}
+    for event in events or []:
+        usage = planned.setdefault(event['model'], {'requests': 0, 'tokens': 0})
+        usage['requests'] += 1
+        usage['tokens'] += event['tokens']
+    return planned
@@ -0,0 +1,362 @@
+import copy
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Support both package layouts:
+# - CodeUri: src/cv_generator (imports like 'gen_ai.*')
+# - CodeUri: src (imports like 'cv_generator.gen_ai.*')
+try:
+    from gen_ai.llm_interface import LLM_interface
+    from gen_ai.model_names import Flash, FlashNew, Pro
+    from gen_ai.rate_limiter import estimate_tokens, is_rate_limit_error
+except ModuleNotFoundError:
+    from cv_generator.gen_ai.llm_interface import LLM_interface
+    from cv_generator.gen_ai.model_names import Flash, FlashNew, Pro
+    from cv_generator.gen_ai.rate_limiter import estimate_tokens, is_rate_limit_error
+
+# A call still running at this quantile of the model's recent latencies gets a duplicate.
+HEDGE_QUANTILE = 0.95
+# Successful calls of a model needed before its latency quantile is trusted for hedging.
+MIN_LATENCY_SAMPLES = 5
+LATENCY_WINDOW = 50
+# Seconds a call (including a hedge) may take before it counts as failed, not counting
+# the rate-limit waits and 429 backoffs the wrapped instance reports through its
+# wait_observer. The caller stops waiting then, but the request is not cancelled: its
+# thread keeps running in _EXECUTOR until the provider's HTTP timeout
+# (GEMINI_TIMEOUT_SECONDS for Gemini) ends it.
+DEFAULT_CALL_TIMEOUT = 300.0
+# How often a call waiting on the rate limiter is checked on again.
+WAIT_POLL_SECONDS = 0.5
+
+# The circuit of a model opens when at least BREAKER_ERROR_RATE of its last (up to
+# BREAKER_WINDOW_CALLS) calls in the time window failed, and lets one trial call through
+# again after the cooldown.
+BREAKER_WINDOW_CALLS = 10
+BREAKER_WINDOW_SECONDS = 300.0
+BREAKER_MIN_CALLS = 4
+BREAKER_ERROR_RATE = 0.5
+BREAKER_COOLDOWN_SECONDS = 120.0
+
+# Model to use while a model's circuit is open.
+FALLBACK_MODELS = {Pro: FlashNew, Flash: FlashNew}
+
+# Shared by every ResilientLLM, so primaries and hedges of concurrent CVs do not wait on
+# one another's pools; a losing call finishes here in the background.
+_EXECUTOR = ThreadPoolExecutor(max_workers=32, thread_name_prefix='llm-call')
+# Clock of the call running on an _EXECUTOR thread, for _observe_wait.
+_local = threading.local()
+
+
+def counts_as_failure(error):
+    """True for errors that say the model is unavailable or slow.
+
+    Not for a bad response, nor for a 429 still throttled after the provider's retries:
+    our own request rate is not the model's health.
+    """
+    return not isinstance(error, ValueError) and not is_rate_limit_error(error)
+
+
+class _CallClock:
+    """Seconds a call has been running, not counting the time it reports as rate-limit waits."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spent = 0.0
+        self._since = time.monotonic()
+
+    @property
+    def waiting(self):
+        with self._lock:
+            return self._since is None
+
+    def elapsed(self):
+        with self._lock:
+            running = time.monotonic() - self._since if self._since is not None else 0.0
+            return self._spent + running
+
+    def pause(self):
+        with self._lock:
+            if self._since is not None:
+                self._spent += time.monotonic() - self._since
+                self._since = None
+
+    def resume(self):
+        with self._lock:
+            if self._since is None:
+                self._since = time.monotonic()
+
+
+def _observe_wait(model, waiting):
+    """wait_observer of wrapped instances: pause the clock of the call on this thread."""
+    clock = getattr(_local, 'clock', None)
+    if clock is not None:
+        clock.pause() if waiting else clock.resume()
+
+
+class LatencyTracker:
+    """Recent latencies of successful calls per model, plus hedging counters."""
+
+    def __init__(self, window=LATENCY_WINDOW, min_samples=MIN_LATENCY_SAMPLES):
+        self._window = window
+        self._min_samples = min_samples
+        self._samples = defaultdict(lambda: deque(maxlen=self._window))
+        self._lock = threading.Lock()
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def record(self, model, seconds):
+        with self._lock:
+            self._samples[model].append(seconds)
+
+    def quantile(self, model, q=HEDGE_QUANTILE):
+        """Latency quantile of model in seconds, or None until min_samples calls have succeeded."""
+        with self._lock:
+            samples = sorted(self._samples.get(model, ()))
+        if len(samples) < self._min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def report(self):
+        with self._lock:
+            models = sorted(model for model in self._samples if model)
+        quantiles = ', '.join(f'{model} p95 {self.quantile(model) or 0:.1f}s' for model in models)
+        return f'LLM latency: {self.hedged} hedged calls, {self.hedge_wins} won by the hedge. {quantiles}'.strip()
+
+
+class CircuitBreaker:
+    """Per-model circuit breaker over the error rate of recent calls.
+
+    closed: calls go through. open: calls go to the fallback model until the cooldown
+    has passed. half-open: one trial call goes through; its outcome closes the circuit
+    or opens it for another cooldown.
+    """
+
+    def __init__(self, window=BREAKER_WINDOW_SECONDS, min_calls=BREAKER_MIN_CALLS,
+                 error_rate=BREAKER_ERROR_RATE, cooldown=BREAKER_COOLDOWN_SECONDS,
+                 window_calls=BREAKER_WINDOW_CALLS):
+        self._window = window
+        self._window_calls = window_calls
+        self._min_calls = min_calls
+        self._error_rate = error_rate
+        self._cooldown = cooldown
+        self._outcomes = defaultdict(lambda: deque(maxlen=self._window_calls))
+        self._opened_at = {}
+        self._trial_in_flight = set()
+        self._lock = threading.Lock()
+        self.failovers = 0
+
+    def _prune(self, model, now):
+        outcomes = self._outcomes[model]
+        while outcomes and outcomes[0][0] <= now - self._window:
+            outcomes.popleft()
+
+    def is_open(self, model):
+        """True while model's calls should go to its fallback (does not claim the trial call)."""
+        with self._lock:
+            opened_at = self._opened_at.get(model)
+            if opened_at is None:
+                return False
+            return time.time() - opened_at < self._cooldown or model in self._trial_in_flight
+
+    def allow(self, model):
+        """True if a call to model may go through; claims the trial call of a half-open circuit."""
+        with self._lock:
+            opened_at = self._opened_at.get(model)
+            if opened_at is None:
+                return True
+            if time.time() - opened_at < self._cooldown or model in self._trial_in_flight:
+                return False
+            self._trial_in_flight.add(model)
+            return True
+
+    def record(self, model, ok):
+        with self._lock:
+            now = time.time()
+            if model in self._trial_in_flight:
+                self._trial_in_flight.discard(model)
+                if ok:
+                    self._opened_at.pop(model, None)
+                    self._outcomes[model].clear()
+                else:
+                    self._opened_at[model] = now
+                return
+
+            self._prune(model, now)
+            outcomes = self._outcomes[model]
+            outcomes.append((now, ok))
+            failures = sum(1 for _, outcome in outcomes if not outcome)
+            if (model not in self._opened_at and len(outcomes) >= self._min_calls
+                    and failures / len(outcomes) >= self._error_rate):
+                self._opened_at[model] = now
+                print(f'Circuit opened for {model}: {failures} of the last {len(outcomes)} calls failed.')
+
+    def report(self):
+        with self._lock:
+            opened = sorted(self._opened_at)
+        return f"LLM circuits: {self.failovers} failovers; open: {', '.join(opened) or 'none'}."
+
+
+class ResilientLLM(LLM_interface):
+    """LLM_interface wrapper that hedges slow calls and fails over from unhealthy models.
+
+    A call still running past the model's observed p95 latency gets one duplicate
+    request, and whichever answers first wins. Latencies come from the wrapped
+    instance's latency_observer hook, so they cover the model request only. The hedge
+    delay and call_timeout are measured the same way where the instance reports its
+    rate-limit waits and 429 backoffs through wait_observer (AskGemini does); for other
+    instances they run from the submission. Rate-limit errors do not count against the
+    circuit. While a model's circuit is open its calls go to the model in fallbacks
+    (e.g. FlashNew instead of Pro), and a call that fails just as the circuit opens is
+    retried there once. Trackers are meant to be shared across instances so warm
+    invocations keep their statistics.
+    """
+
+    def __init__(self, llm, latency=None, breaker=None, fallbacks=None, rate_limiter=None,
+                 call_timeout=DEFAULT_CALL_TIMEOUT, hedge=True):
+        super().__init__()
+        self._llm = llm
+        self._latency = latency or LatencyTracker()
+        self._breaker = breaker or CircuitBreaker()
+        self._fallbacks = FALLBACK_MODELS if fallbacks is None else fallbacks
+        self._rate_limiter = rate_limiter
+        self._call_timeout = call_timeout
+        self._hedge = hedge
+        llm.latency_observer = self._latency.record
+        llm.wait_observer = _observe_wait
+
+    def __getattr__(self, name):
+        # Provider-specific attributes (usage_events, submit_batch, ...) come from the wrapped instance.
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._llm, name)
+
+    @property
+    def model_name(self):
+        return self._llm.model_name
+
+    def _route(self, model):
+        """model, or its fallback (repeatedly) while its circuit is open."""
+        seen = set()
+        while model not in seen and not self._breaker.allow(model):
+            seen.add(model)
+            fallback = self._fallbacks.get(model)
+            if fallback is None:
+                break
+            print(f'Circuit open for {model}; using {fallback}.')
+            self._breaker.failovers += 1
+            model = fallback
+        return model
+
+    def _can_hedge(self, model, prompt):
+        if self._rate_limiter is None:
+            return True
+        # A duplicate that would only queue behind the rate limiter cannot win; skip it.
+        return self._rate_limiter.delay_for({model: {'requests': 1, 'tokens': estimate_tokens(prompt)}}) <= 0
+
+    @staticmethod
+    def _submit(call, model):
+        """Run call(model) on _EXECUTOR; returns (future, clock of the call)."""
+        clock = _CallClock()
+
+        def run():
+            _local.clock = clock
+            try:
+                return call(model)
+            finally:
+                _local.clock = None
+
+        return _EXECUTOR.submit(run), clock
+
+    def _hedged(self, call, prompt, model):
+        """Run call(model), adding one duplicate once it outlives the model's p95 latency.
+
+        Raises TimeoutError once every request has run for call_timeout (rate-limit waits
+        excluded, see _CallClock); the abandoned requests run on in the background until
+        their HTTP timeout.
+        """
+        future, primary = self._submit(call, model)
+        futures = {future: (primary, False)}
+        hedge_after = self._latency.quantile(model) if self._hedge else None
+
+        errors = []
+        pending = set(futures)
+        while pending:
+            clocks = [futures[future][0] for future in pending]
+            remaining = max(self._call_timeout - clock.elapsed() for clock in clocks)
+            if remaining <= 0:
+                break
+            timeout = remaining
+            if hedge_after is not None:
+                timeout = min(timeout, max(0.0, hedge_after - primary.elapsed()))
+            if any(clock.waiting for clock in clocks):
+                timeout = min(timeout, WAIT_POLL_SECONDS)
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                self._breaker.record(model, True)
+                if futures[future][1]:
+                    self._latency.hedge_wins += 1
+                return result
+
+            if pending and hedge_after is not None and primary.elapsed() >= hedge_after:
+                if self._can_hedge(model, prompt):
+                    print(f'{model} call running past its p95 of {hedge_after:.1f}s; sending a hedge request.')
+                    self._latency.hedged += 1
+                    future, clock = self._submit(call, model)
+                    futures[future] = (clock, True)
+                    pending.add(future)
+                hedge_after = None
+
+        error = errors[0] if errors else TimeoutError(f'{model} did not answer within {self._call_timeout:g}s.')
+        self._breaker.record(model, not counts_as_failure(error))
+        raise error
+
+    def _run(self, call, prompt, model=None):
+        model = self._route(model or self.model_name)
+        try:
+            return self._hedged(call, prompt, model)
+        except Exception as e:
+            fallback = self._fallbacks.get(model)
+            if not counts_as_failure(e) or fallback is None or not self._breaker.is_open(model):
+                raise
+            print(f'{model} failed as its circuit opened ({e}); retrying on {fallback}.')
+            self._breaker.failovers += 1
+            return self._hedged(call, prompt, fallback)
+
+    def ask(self, prompt, be_json=False, model=None):
+        return self._run(lambda name: self._llm.ask(prompt, be_json, name), prompt, model)
+
+    def ask_json_text(self, prompt, schema, model=None):
+        return self._run(lambda name: self._llm.ask_json_text(prompt, schema, name), prompt, model)
+
+    def ask_stream(self, prompt, timeout=None, model=None, schema=None):
+        """Streams from the routed model; not hedged, since items are yielded as they arrive."""
+        model = self._route(model or self.model_name)
+        ok = True
+        try:
+            yield from self._llm.ask_stream(prompt, timeout=timeout, model=model, schema=schema)
+        except GeneratorExit:
+            # The caller stopped reading (e.g. the response was complete); not a failure.
+            raise
+        except Exception as e:
+            ok = not counts_as_failure(e)
+            raise
+        finally:
+            self._breaker.record(model, ok)
+
+    def postprocess_json(self, value):
+        return self._llm.postprocess_json(value)
+
+    def swap_model(self, model_name):
+        self._llm.swap_model(model_name)
+
+    def with_model(self, model_name):
+        wrapped = copy.copy(self)
+        wrapped._llm = self._llm.with_model(model_name)
+        return wrapped
@@ -0,0 +1,122 @@
+"""JSON schemas of the structured model responses, and a validator for the subset they use.
+
+The schemas are plain JSON Schema, so the same dict is sent to the model as its
+response schema and used to check what comes back.
+"""
+import hashlib
+import json
+
+# The job finder and the CV generator are deployed as separate Lambda packages and cannot
+# import each other, so schema_version, summary_version, SUMMARY_SCHEMA and validate are
+# copies of their twins in job_finder/schemas.py. Change both files together.
+# Stored job summaries carry a summary_version tag of the prompt and model that produced
+# them; each side computes its own, so the tags tell finder and generator summaries apart.
+
+_STRING_LIST = {'type': 'array', 'items': {'type': 'string'}}
+
+
+def schema_version(schema):
+    """Short stable hash of a schema, used as the version tag of data stored in its format."""
+    payload = json.dumps(schema, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:12]
+
+
+def summary_version(schema, prompt, model):
+    """Version tag of stored job summaries: the schema version plus a hash of the prompt and model."""
+    digest = hashlib.sha256(f'{prompt}\0{model}'.encode('utf-8')).hexdigest()[:12]
+    return f'{schema_version(schema)}-{digest}'
+
+
+SUMMARY_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'technical_skills': _STRING_LIST,
+        'core_responsibilities': _STRING_LIST,
+        'qualifications_and_preferences': _STRING_LIST,
+        'keywords': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'keyword': {'type': 'string'},
+                    'importance': {'type': 'integer', 'minimum': 1, 'maximum': 5},
+                },
+                'required': ['keyword', 'importance'],
+            },
+        },
+    },
+    'required': ['technical_skills', 'core_responsibilities', 'qualifications_and_preferences', 'keywords'],
+}
+
+# Category name -> skills, e.g. {"Languages": ["Python", "SQL"]}.
+SKILLS_SCHEMA = {
+    'type': 'object',
+    'additionalProperties': _STRING_LIST,
+    'minProperties': 1,
+}
+
+EXPERIENCE_ENTRY_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'bullet_points': _STRING_LIST,
+        'skills': {'type': 'string'},
+    },
+    'required': ['bullet_points'],
+}
+
+EXPERIENCE_SCHEMA = {'type': 'array', 'items': EXPERIENCE_ENTRY_SCHEMA}
+
+_TYPES = {
+    'object': dict,
+    'array': list,
+    'string': str,
+    'integer': int,
+    'number': (int, float),
+    'boolean': bool,
+}
+
+
+def validate(value, schema, path='$'):
+    """Return a list of "path: problem" strings; empty when value matches schema.
+
+    Supports type, properties, required, additionalProperties, minProperties, items,
+    minItems, maxItems, enum, minimum and maximum.
+    """
+    expected = schema.get('type')
+    if expected:
+        if isinstance(value, bool) and expected in ('integer', 'number'):
+            return [f'{path}: expected {expected}, got boolean']
+        if not isinstance(value, _TYPES[expected]):
+            return [f'{path}: expected {expected}, got {type(value).__name__}']
+
+    errors = []
+    if 'enum' in schema and value not in schema['enum']:
+        errors.append(f'{path}: {value!r} is not one of {schema["enum"]}')
+    if 'minimum' in schema and value < schema['minimum']:
+        errors.append(f'{path}: {value} is below the minimum {schema["minimum"]}')
+    if 'maximum' in schema and value > schema['maximum']:
+        errors.append(f'{path}: {value} is above the maximum {schema["maximum"]}')
+
+    if isinstance(value, dict):
+        properties = schema.get('properties', {})
+        for key in schema.get('required', []):
+            if key not in value:
+                errors.append(f'{path}: missing required key "{key}"')
+        if len(value) < schema.get('minProperties', 0):
+            errors.append(f'{path}: expected at least {schema["minProperties"]} keys')
+        extra = schema.get('additionalProperties')
+        for key, item in value.items():
+            if key in properties:
+                errors.extend(validate(item, properties[key], f'{path}.{key}'))
+            elif isinstance(extra, dict):
+                errors.extend(validate(item, extra, f'{path}.{key}'))
+
+    if isinstance(value, list):
+        if len(value) < schema.get('minItems', 0):
+            errors.append(f'{path}: expected at least {schema["minItems"]} items')
+        if 'maxItems' in schema and len(value) > schema['maxItems']:
+            errors.append(f'{path}: expected at most {schema["maxItems"]} items')
+        if 'items' in schema:
+            for index, item in enumerate(value):
+                errors.extend(validate(item, schema['items'], f'{path}[{index}]'))
+    return errors
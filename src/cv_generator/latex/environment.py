@@ -0,0 +1,80 @@
+import json
+import os
+import threading
+from functools import lru_cache
+
+from jinja2 import DictLoader, Environment, FileSystemBytecodeCache
+
+# Support both package layouts:
+# - CodeUri: src/cv_generator (imports like 'latex.*')
+# - CodeUri: src (imports like 'cv_generator.latex.*')
+try:
+    from latex.latex_template import (
+        Coverletter_in_latex,
+        certifications_in_latex,
+        cv_education_in_latex,
+        cv_header_in_latex,
+        cv_in_latex,
+    )
+except ModuleNotFoundError:
+    from cv_generator.latex.latex_template import (
+        Coverletter_in_latex,
+        certifications_in_latex,
+        cv_education_in_latex,
+        cv_header_in_latex,
+        cv_in_latex,
+    )
+
+TEMPLATES = {
+    'cv': cv_in_latex,
+    'cv_header': cv_header_in_latex,
+    'cv_education': cv_education_in_latex,
+    'certifications': certifications_in_latex,
+    'cover_letter': Coverletter_in_latex,
+}
+
+# Optional directory for Jinja's on-disk bytecode cache (e.g. /tmp/jinja-cache on Lambda).
+BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR')
+
+
+def _bytecode_cache():
+    if not BYTECODE_CACHE_DIR:
+        return None
+    os.makedirs(BYTECODE_CACHE_DIR, exist_ok=True)
+    return FileSystemBytecodeCache(BYTECODE_CACHE_DIR)
+
+
+# One environment per process: each named template is compiled on first use and kept.
+environment = Environment(loader=DictLoader(TEMPLATES), bytecode_cache=_bytecode_cache(), cache_size=-1)
+
+_static_lock = threading.Lock()
+_static_sections = {}
+
+
+def get_template(name):
+    return environment.get_template(name)
+
+
+@lru_cache(maxsize=32)
+def compile_template(source):
+    """Compile an ad-hoc template string once per process (e.g. prompt templates)."""
+    return environment.from_string(source)
+
+
+def render_static(name, **values):
+    """
+    Render a template whose inputs only come from resume data, once per distinct input.
+
+    Values are keyed by their JSON form, so a new resume version renders again while
+    every job for the same version reuses the cached text.
+    """
+    key = (name, json.dumps(values, sort_keys=True, default=dict))
+    with _static_lock:
+        cached = _static_sections.get(key)
+    if cached is not None:
+        return cached
+
+    rendered = get_template(name).render(values)
+    with _static_lock:
+        _static_sections[key] = rendered
+    return rendered
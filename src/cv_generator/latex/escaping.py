@@ -0,0 +1,75 @@
+import re
+
+# LaTeX replacement for every character that is special in running text.
+LATEX_ESCAPES = {
+    '&': r'\&',
+    '%': r'\%',
+    '$': r'\$',
+    '#': r'\#',
+    '_': r'\_',
+    '{': r'\{',
+    '}': r'\}',
+    '~': r'\textasciitilde{}',
+    '^': r'\textasciicircum{}',
+    '\\': r'\textbackslash{}',
+}
+# Order for applying LATEX_ESCAPES as chained str.replace calls (backslash excluded):
+# braces go first so the braces in \textasciitilde{} and \textasciicircum{} stay intact.
+# On multi-kilobyte text this beats str.translate (which handles multi-character
+# replacements per character) and a regex substitution; see benchmarks.py escape.
+_REPLACE_ORDER = ('{', '}', '&', '%', '$', '#', '_', '~', '^')
+# Stands in for backslashes while the other characters are replaced, so the backslashes
+# those replacements introduce are not escaped again.
+_BACKSLASH_PLACEHOLDER = '\x00'
+
+# Escape sequences produced above, kept as they are. The capturing group makes re.split
+# return them at the odd indexes, between the runs of text to escape.
+_SEQUENCE_RE = re.compile(r'(\\(?:[&%$#_{}]|textasciitilde\{\}|textasciicircum\{\}|textbackslash\{\}))')
+
+
+def _escape_plain(text):
+    """Escape every special character of text that holds no escape sequences."""
+    backslashes = '\\' in text
+    if backslashes:
+        if _BACKSLASH_PLACEHOLDER in text:
+            return LATEX_ESCAPES['\\'].join(_escape_plain(part) for part in text.split('\\'))
+        text = text.replace('\\', _BACKSLASH_PLACEHOLDER)
+    for char in _REPLACE_ORDER:
+        if char in text:
+            text = text.replace(char, LATEX_ESCAPES[char])
+    if backslashes:
+        text = text.replace(_BACKSLASH_PLACEHOLDER, LATEX_ESCAPES['\\'])
+    return text
+
+
+def _escape_string(text):
+    if '\\' not in text:
+        # No escape sequences possible, so every special character is escaped.
+        return _escape_plain(text)
+    parts = _SEQUENCE_RE.split(text)
+    parts[::2] = [_escape_plain(part) for part in parts[::2]]
+    return ''.join(parts)
+
+
+def escape_latex(text):
+    """Escape the LaTeX special characters in a string; other values are returned unchanged.
+
+    Escape sequences this function produces are recognized and left alone, so text that
+    was already escaped (e.g. a model response escaped once on arrival) is not escaped a
+    second time: escape_latex(escape_latex(s)) == escape_latex(s).
+    """
+    if not isinstance(text, str):
+        return text
+    return _escape_string(text)
+
+
+def escape_latex_in_json(data):
+    """Escape every string value in parsed JSON (dicts, lists and scalars); keys are left as is."""
+    if isinstance(data, str):
+        return _escape_string(data)
+    if isinstance(data, dict):
+        return {key: escape_latex_in_json(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [escape_latex_in_json(element) for element in data]
+    # int, float, bool, None, etc.
+    return data
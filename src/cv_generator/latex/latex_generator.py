@@ -1,17 +1,15 @@
-from jinja2 import Template
-
 # Support both package layouts:
 # - CodeUri: src/cv_generator (imports like 'latex.*')
 # - CodeUri: src (imports like 'cv_generator.latex.*')
 try:
-    from latex.latex_template import cv_in_latex, Coverletter_in_latex
+    from latex.environment import get_template, render_static
 except ModuleNotFoundError:
-    from cv_generator.latex.latex_template import cv_in_latex, Coverletter_in_latex
+    from cv_generator.latex.environment import get_template, render_static
 
 
 class MakeCV:
     def __init__(self):
-        self.template = Template(cv_in_latex)
+        self.template = get_template('cv')
         self.values_dict = {}
 
     def fill_personal_data(self, name, last_name, address, phone, email, my_position, github='', linkedin=''):
@@ -27,9 +25,17 @@ class MakeCV:
     def fill_education(self, education):
         self.values_dict['education'] = education
 
+    def _static_sections(self):
+        """Header and education only depend on resume data, so they are rendered once per version."""
+        personal = {key: value for key, value in self.values_dict.items() if key != 'education'}
+        return {
+            'header': render_static('cv_header', **personal),
+            'education_section': render_static('cv_education', education=self.values_dict.get('education') or []),
+        }
+
     def create(self, certifications, bullet_list, experience_text, categorized_skills=None, projects=None):
         return self.template.render(
-            self.values_dict
+            self._static_sections()
             | {
                 'certifications': certifications,
                 'bullet_list': bullet_list,
@@ -42,7 +48,7 @@ class MakeCV:
 
 class MakeCoverLetter:
     def __init__(self):
-        self.template = Template(Coverletter_in_latex)
+        self.template = get_template('cover_letter')
         self.values_dict = {}
 
     def fill_personal_data(self, name, address, phone, email, linkedin=''):
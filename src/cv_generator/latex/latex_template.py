@@ -1,5 +1,6 @@
-\
-cv_in_latex = r"""
+# The CV is split so the parts that only depend on resume data (header and education)
+# can be rendered once per resume version and reused for every job.
+cv_header_in_latex = r"""
 \documentclass{muratcan_cv}
 \usepackage{tasks}
 \usepackage[scaled]{helvet}
@@ -18,7 +19,18 @@ cv_in_latex = r"""
 
 \begin{document}
 
-\headerview
+\headerview"""
+
+cv_education_in_latex = r"""\section{Education}
+{% for entry in education -%}
+\datedexperience{ {{ entry.degree }} }{ {{ entry.dates }} }
+\explanation{ {{ entry.institution }} }{ {{ entry.location }} }
+\explanationdetail{
+    {{ entry.details }}
+}
+{%- endfor %}"""
+
+cv_in_latex = r"""{{ header }}
 
 \section{Professional Summary}
 \explanationdetail{
@@ -38,20 +50,19 @@ cv_in_latex = r"""
 }
 {% endif %}
 
-\section{Education}
-{% for entry in education -%}
-\datedexperience{ {{ entry.degree }} }{ {{ entry.dates }} }
-\explanation{ {{ entry.institution }} }{ {{ entry.location }} }
-\explanationdetail{
-    {{ entry.details }}
-}
-{%- endfor %}
+{{ education_section }}
 
 {{ certifications }}
 
 \end{document}
 """
 
+certifications_in_latex = r"""
+        \bigskip
+        \section{Certifications}
+            {{items}}
+    """
+
 Coverletter_in_latex = r"""
 
 \documentclass[12pt]{letter}
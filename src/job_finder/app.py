@@ -1,30 +1,165 @@
+import time
+
+_MODULE_START = time.perf_counter()
+
 import hashlib
 import json
 import os
-
-import boto3
-from google import genai
-from serpapi import GoogleSearch
-
-with open('config/cv_summary.txt', 'r', encoding='utf-8') as f:
-    CV_SUMMARY = f.read()
-with open('config/prompt.txt', 'r', encoding='utf-8') as f:
-    GEMINI_PROMPT_TEMPLATE = f.read()
-
-dynamodb = boto3.resource('dynamodb')
-sqs = boto3.client('sqs')
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+# Support both package layouts:
+# - CodeUri: src/job_finder (imports like 'relevance')
+# - CodeUri: src (imports like 'job_finder.relevance')
+try:
+    from near_duplicates import NearDuplicateIndex
+    from relevance import CVRelevance
+    from schemas import BATCH_MATCH_SCHEMA, JOB_SUMMARY_SCHEMA, MATCH_SCHEMA, summary_version, validate
+    from score_cache import ScoreCache, scoring_fingerprint
+    from search import build_queries, iter_search_pages
+    from startup_timing import record, report as startup_report, timed
+    from storage import OutputBuffer, batch_get_items
+except ModuleNotFoundError:
+    from job_finder.near_duplicates import NearDuplicateIndex
+    from job_finder.relevance import CVRelevance
+    from job_finder.schemas import BATCH_MATCH_SCHEMA, JOB_SUMMARY_SCHEMA, MATCH_SCHEMA, summary_version, validate
+    from job_finder.score_cache import ScoreCache, scoring_fingerprint
+    from job_finder.search import build_queries, iter_search_pages
+    from job_finder.startup_timing import record, report as startup_report, timed
+    from job_finder.storage import OutputBuffer, batch_get_items
 
 DYNAMODB_TABLE_NAME = os.environ.get('DYNAMODB_TABLE_NAME')
 JOB_QUEUE_URL = os.environ.get('JOB_QUEUE_URL')
 EMAIL_QUEUE_URL = os.environ.get('EMAIL_QUEUE_URL')
 SERPAPI_API_KEY = os.environ.get('SERPAPI_API_KEY')
 JOB_MATCH_MODEL = os.environ.get('JOB_MATCH_MODEL', 'gemma-3-27b-it')
+# HTTP timeout of one scoring call; a stuck call fails that job (scored again on the next
+# run) instead of holding the function until its 120 s timeout.
+GEMINI_TIMEOUT_SECONDS = float(os.environ.get('GEMINI_TIMEOUT_SECONDS', '45'))
+
+JOB_SUMMARY_KEYS = ('technical_skills', 'core_responsibilities', 'qualifications_and_preferences', 'keywords')
+
+# Maximum number of SerpApi result pages fetched per query.
+SERPAPI_MAX_PAGES = max(1, int(os.environ.get('SERPAPI_MAX_PAGES', '3')))
+DEFAULT_LOCATIONS = ['canada']
 
 RAW_NO_CV_GEN = os.environ.get('NO_CV_GEN', 'false')
 NO_CV_GEN = RAW_NO_CV_GEN.lower() == 'true'
+# Number of Gemini scoring calls allowed in flight at once; 1 scores sequentially.
+SCORING_CONCURRENCY = max(1, int(os.environ.get('SCORING_CONCURRENCY', '4')))
+
+# SCORING_MODE=batch packs several descriptions into one prompt, bounded by an
+# estimated token budget and a maximum batch size. SCORING_MODE=single sends one job per call.
+SCORING_MODE = os.environ.get('SCORING_MODE', 'single').lower()
+SCORING_BATCH_TOKEN_BUDGET = int(os.environ.get('SCORING_BATCH_TOKEN_BUDGET', '24000'))
+SCORING_BATCH_MAX_JOBS = max(1, int(os.environ.get('SCORING_BATCH_MAX_JOBS', '8')))
+
+# Jobs whose lexical similarity to CV_SUMMARY falls below this can skip the model call.
+# PREFILTER_MODE=log (the default) only logs them, until the threshold has been checked
+# with `replay.py --prefilter-sweep` against recorded scores; PREFILTER_MODE=drop skips
+# them and PREFILTER_MODE=rank scores them last. 0 disables dropping.
+PREFILTER_THRESHOLD = float(os.environ.get('PREFILTER_THRESHOLD', '0.03'))
+PREFILTER_MODE = os.environ.get('PREFILTER_MODE', 'log').lower()
+
+# Near-duplicate postings (SimHash similarity at or above the threshold) are skipped.
+NEAR_DUP_TABLE_NAME = os.environ.get('NEAR_DUP_TABLE_NAME')
+NEAR_DUP_THRESHOLD = float(os.environ.get('NEAR_DUP_THRESHOLD', '0.9'))
+
+# SCORING_STRUCTURED_OUTPUT=true sends the response schema and asks for bare JSON (Gemini
+# models support it, Gemma models do not); auto enables it for gemini-* models.
+RAW_STRUCTURED_OUTPUT = os.environ.get('SCORING_STRUCTURED_OUTPUT', 'auto').lower()
+STRUCTURED_OUTPUT = (
+    JOB_MATCH_MODEL.startswith('gemini') if RAW_STRUCTURED_OUTPUT == 'auto' else RAW_STRUCTURED_OUTPUT == 'true'
+)
+# Repair retries of a scoring response that does not parse or validate.
+SCORING_MAX_REPAIRS = int(os.environ.get('SCORING_MAX_REPAIRS', '1'))
+
+# Scoring results are cached by content in this table (optional) and in memory.
+SCORE_CACHE_TABLE_NAME = os.environ.get('SCORE_CACHE_TABLE_NAME')
+SCORE_CACHE_TTL_DAYS = float(os.environ.get('SCORE_CACHE_TTL_DAYS', '30'))
+
+
+# --- Lazy clients and config ---
+# Nothing below is built at import time, so invocations that end early (missing
+# job_type, empty search) never pay for boto3, google.genai or config reads.
+
+
+@lru_cache(maxsize=None)
+def read_config(name):
+    with timed(f"read config/{name}"):
+        with open(f'config/{name}', 'r', encoding='utf-8') as f:
+            return f.read()
+
+
+def get_cv_summary():
+    return read_config('cv_summary.txt')
+
+
+def get_prompt_template():
+    return read_config('prompt.txt')
+
+
+def get_batch_prompt_template():
+    return read_config('batch_prompt.txt')
+
+
+@lru_cache(maxsize=None)
+def _boto3():
+    with timed('import boto3'):
+        import boto3
+    return boto3
+
+
+@lru_cache(maxsize=None)
+def get_dynamodb():
+    boto3 = _boto3()
+    with timed('init dynamodb resource'):
+        return boto3.resource('dynamodb')
+
+
+@lru_cache(maxsize=None)
+def get_dynamodb_client():
+    boto3 = _boto3()
+    with timed('init dynamodb client'):
+        return boto3.client('dynamodb')
+
+
+@lru_cache(maxsize=None)
+def get_sqs():
+    boto3 = _boto3()
+    with timed('init sqs client'):
+        return boto3.client('sqs')
+
+
+@lru_cache(maxsize=None)
+def get_genai_client():
+    with timed('import google.genai'):
+        from google import genai
+    with timed('init genai client'):
+        return genai.Client(
+            api_key=os.environ.get('GEMINI_API_KEY'),
+            http_options={'timeout': int(GEMINI_TIMEOUT_SECONDS * 1000)},
+        )
+
+
+@lru_cache(maxsize=None)
+def get_cv_relevance():
+    return CVRelevance(get_cv_summary())
 
-table = dynamodb.Table(DYNAMODB_TABLE_NAME)
-_client = genai.Client(api_key=os.environ.get('GEMINI_API_KEY'))
+
+@lru_cache(maxsize=None)
+def get_score_cache():
+    return ScoreCache(
+        get_dynamodb(),
+        SCORE_CACHE_TABLE_NAME,
+        scoring_fingerprint(get_cv_summary(), get_prompt_template(), get_batch_prompt_template(), JOB_MATCH_MODEL),
+        ttl_days=SCORE_CACHE_TTL_DAYS,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_near_dup_index():
+    return NearDuplicateIndex(get_dynamodb_client(), NEAR_DUP_TABLE_NAME, threshold=NEAR_DUP_THRESHOLD)
 
 
 def extract_json_content(text):
@@ -43,48 +178,370 @@ def extract_json_content(text):
     return text[start_pos:end_pos].strip()
 
 
-def lambda_handler(event, context):
-    job_type = event.get('job_type')
-    if not job_type:
-        raise ValueError("Error: 'job_type' not found in the trigger event.")
-
-    search_query = f"{job_type} jobs canada since yesterday"
-    print(f"Starting scheduled job search for: '{search_query}' with NO_CV_GEN={NO_CV_GEN}")
-
-    params = {"api_key": SERPAPI_API_KEY, "engine": "google_jobs", "q": search_query}
-    search = GoogleSearch(params)
-    results = search.get_dict()
-
-    jobs = results.get('jobs_results', [])
+def extract_job_fields(job):
+    """Pull the fields the finder needs out of a SerpApi job, or None if unusable."""
+    apply_options = job.get('apply_options', [])
+    apply_link = apply_options[0].get('link') if apply_options else None
+    description = job.get('description')
+
+    if not apply_link or not description:
+        return None
+
+    return {
+        'job_id': job.get('job_id') or hashlib.sha256(apply_link.encode('utf-8')).hexdigest(),
+        'apply_link': apply_link,
+        'description': description,
+        'company_name': job.get('company_name'),
+        'title': job.get('title', 'Unknown Title'),
+    }
+
+
+def find_existing_job_ids(job_ids):
+    """Return the subset of job_ids that already exist in the jobs table (key-only lookups)."""
+    if not job_ids:
+        return set()
+    return set(batch_get_items(get_dynamodb(), DYNAMODB_TABLE_NAME, 'jobId', job_ids, projection='jobId'))
+
+
+def prefilter_jobs(jobs, threshold=PREFILTER_THRESHOLD, mode=PREFILTER_MODE):
+    """Compare jobs by lexical similarity to CV_SUMMARY before any LLM call.
+
+    In 'log' mode the jobs are returned unchanged and those under the threshold are
+    only logged. In 'rank' mode they are returned most relevant first, and in 'drop'
+    mode the jobs under the threshold are also removed.
+    """
+    if not jobs:
+        return jobs
+
+    relevance = get_cv_relevance().score_all([fields['description'] for fields in jobs])
+    ranked = sorted(zip(relevance, jobs), key=lambda pair: pair[0], reverse=True)
+    below = [(score, fields) for score, fields in ranked if score < threshold]
+
+    if mode not in ('drop', 'rank'):
+        for score, fields in below:
+            print(f"Pre-filter would drop {fields['job_id']} ({score:.3f}): {fields['title'][:80]}")
+        if below:
+            print(f"Pre-filter would save {len(below)} of {len(jobs)} LLM calls (threshold {threshold}); "
+                  f"PREFILTER_MODE={mode} keeps them.")
+        return jobs
+
+    if mode != 'drop' or not below:
+        return [fields for _, fields in ranked]
+
+    for _, fields in below:
+        print(f"Pre-filter dropped {fields['job_id']}: {fields['title'][:80]}")
+    print(f"Pre-filter saved {len(below)} of {len(jobs)} LLM calls (threshold {threshold}).")
+    return [fields for score, fields in ranked if score >= threshold]
+
+
+def drop_near_duplicates(jobs):
+    """Remove jobs whose description nearly matches one that was already scored.
+
+    Returns (remaining jobs, how many of them no earlier run has scored). Jobs already
+    in the index are kept, so a match whose publishing failed is sent again (the score
+    cache answers for it), but they do not count as new for the pagination stop.
+    """
+    if not jobs:
+        return jobs, 0
+    try:
+        index = get_near_dup_index()
+        unique, duplicates = index.split_duplicates(jobs)
+        unscored = sum(1 for fields in unique if not index.is_indexed(fields['job_id'], fields['simhash']))
+    except Exception as e:
+        print(f"Near-duplicate lookup failed. Error: {e}")
+        return jobs, len(jobs)
+
+    for fields, duplicate_of, similarity in duplicates:
+        print(f"Job {fields['job_id']} is a near-duplicate of {duplicate_of} ({similarity:.2f}). Skipping.")
+    return unique, unscored
+
+
+def split_job_summary(analysis_json):
+    """Separate the extracted job summary from the match analysis.
+
+    Returns (analysis without the summary, versioned summary JSON or None if the model
+    did not return a well-formed one). The version is the one stamp_summary_version
+    recorded when the analysis was produced; a summary without one (e.g. cached before
+    versions were recorded) is dropped and the CV generator extracts it again.
+    """
+    analysis = dict(analysis_json)
+    summary = analysis.pop('job_summary', None)
+    version = analysis.pop('summary_version', None)
+    if not isinstance(summary, dict) or not all(isinstance(summary.get(key), list) for key in JOB_SUMMARY_KEYS):
+        return analysis, None
+    if not version:
+        return analysis, None
+    summary = {key: summary[key] for key in JOB_SUMMARY_KEYS}
+    return analysis, json.dumps(
+        {'version': version, 'source': 'job_finder', 'latex_escaped': False, 'summary': summary}
+    )
+
+
+def stamp_summary_version(analysis, prompt_template):
+    """Record the prompt and model that produced the analysis' job summary, if it has one.
+
+    The tag travels with the analysis, including through the score cache, so a summary
+    is never labelled with a newer prompt than the one that produced it.
+    """
+    if isinstance(analysis.get('job_summary'), dict):
+        analysis['summary_version'] = summary_version(JOB_SUMMARY_SCHEMA, prompt_template, JOB_MATCH_MODEL)
+    return analysis
+
+
+# Copy of REPAIR_PROMPT in cv_generator/gen_ai/llm_interface.py (a separate package); keep them in sync.
+REPAIR_PROMPT = """{prompt}
+
+---
+Your previous response to the request above was rejected:
+{errors}
+
+Previous response:
+{response}
+
+Respond again with only a JSON value that fixes these problems and matches this JSON schema:
+{schema}
+"""
+
+
+def generate_json(prompt, schema):
+    """Call the match model for a JSON response and parse it (ValueError if it is not JSON)."""
+    kwargs = {}
+    if STRUCTURED_OUTPUT:
+        kwargs['config'] = {'response_mime_type': 'application/json', 'response_json_schema': schema}
+    response = get_genai_client().models.generate_content(model=JOB_MATCH_MODEL, contents=prompt, **kwargs)
+    return response.text, json.loads(extract_json_content(response.text))
+
+
+def validate_analysis(analysis, schema=MATCH_SCHEMA):
+    """Validation errors of a match analysis. A malformed job_summary is dropped rather than rejected."""
+    errors = validate(analysis, schema)
+    if any(error.startswith('$.job_summary') for error in errors):
+        analysis.pop('job_summary', None)
+        errors = [error for error in errors if not error.startswith('$.job_summary')]
+    return errors
+
+
+def score_job(fields):
+    """Ask the match model to score one job. Returns the validated analysis or None on failure.
+
+    A response that does not parse or validate against MATCH_SCHEMA is sent back with
+    the problems for up to SCORING_MAX_REPAIRS targeted repairs.
+    """
+    try:
+        print(f"Analyzing job: {fields['title'][:80]}...")
+        prompt = get_prompt_template().format(job_description=fields['description'], cv_summary=get_cv_summary())
+        request = prompt
+        for attempt in range(SCORING_MAX_REPAIRS + 1):
+            text = ''
+            try:
+                text, analysis = generate_json(request, MATCH_SCHEMA)
+            except ValueError as e:
+                errors = [f'$: response is not valid JSON ({e})']
+            else:
+                errors = validate_analysis(analysis)
+                if not errors:
+                    return stamp_summary_version(analysis, get_prompt_template())
+            print(f"Response for job {fields['job_id']} rejected: {'; '.join(errors[:3])}")
+            request = REPAIR_PROMPT.format(
+                prompt=prompt,
+                errors='\n'.join(f'- {error}' for error in errors[:20]),
+                response=text,
+                schema=json.dumps(MATCH_SCHEMA),
+            )
+        return None
+    except Exception as e:
+        print(f"Failed to score job {fields['job_id']}. Error: {e}")
+        return None
+
+
+def estimate_tokens(text):
+    """Rough token estimate (about four characters per token) used for batch packing."""
+    return len(text) // 4 + 1
+
+
+def build_scoring_batches(jobs, token_budget=SCORING_BATCH_TOKEN_BUDGET, max_jobs=SCORING_BATCH_MAX_JOBS):
+    """Split jobs into consecutive batches that fit the prompt token budget."""
+    overhead = estimate_tokens(get_batch_prompt_template()) + estimate_tokens(get_cv_summary())
+    batches = []
+    current = []
+    used = overhead
+    for fields in jobs:
+        cost = estimate_tokens(fields['description']) + 10
+        if current and (used + cost > token_budget or len(current) >= max_jobs):
+            batches.append(current)
+            current = []
+            used = overhead
+        current.append(fields)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def score_batch(batch):
+    """Score several jobs in one model call, falling back to score_job for missing or invalid entries.
+
+    Jobs are labelled with short batch-local IDs in the prompt and mapped back by position.
+    """
+    if len(batch) == 1:
+        return [score_job(batch[0])]
+
+    results = [None] * len(batch)
+    try:
+        print(f"Analyzing batch of {len(batch)} jobs...")
+        job_descriptions = '\n\n'.join(
+            f"### Job ID: {i}\n{fields['description']}" for i, fields in enumerate(batch)
+        )
+        prompt = get_batch_prompt_template().format(job_descriptions=job_descriptions, cv_summary=get_cv_summary())
+        _, entries = generate_json(prompt, BATCH_MATCH_SCHEMA)
+        if not isinstance(entries, list):
+            raise ValueError('Batch response is not a JSON array.')
+
+        for entry in entries:
+            # Invalid entries are not repaired as a batch; those jobs are re-scored singly.
+            if not isinstance(entry, dict) or 'job_id' not in entry or validate_analysis(entry):
+                continue
+            try:
+                index = int(entry['job_id'])
+            except (TypeError, ValueError):
+                continue
+            if 0 <= index < len(batch) and results[index] is None:
+                analysis = {key: value for key, value in entry.items() if key != 'job_id'}
+                results[index] = stamp_summary_version(analysis, get_batch_prompt_template())
+    except Exception as e:
+        print(f"Batch scoring failed, falling back to single-job calls. Error: {e}")
+
+    missing = [i for i, analysis in enumerate(results) if analysis is None]
+    if missing:
+        print(f"Re-scoring {len(missing)} of {len(batch)} jobs individually.")
+    for i in missing:
+        results[i] = score_job(batch[i])
+    return results
+
+
+def score_jobs(jobs, concurrency=SCORING_CONCURRENCY, mode=SCORING_MODE):
+    """Score jobs with a bounded worker pool. Results are returned in input order."""
+    if not jobs:
+        return []
+    # Build the client once up front rather than racing to create it in every worker.
+    get_genai_client()
+
+    if mode == 'batch':
+        batches = build_scoring_batches(jobs)
+        if concurrency <= 1 or len(batches) <= 1:
+            batch_results = [score_batch(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(concurrency, len(batches))) as executor:
+                batch_results = list(executor.map(score_batch, batches))
+        return [analysis for batch_result in batch_results for analysis in batch_result]
+
+    if concurrency <= 1 or len(jobs) <= 1:
+        return [score_job(fields) for fields in jobs]
+
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(jobs))) as executor:
+        return list(executor.map(score_job, jobs))
+
+
+def score_jobs_cached(jobs):
+    """Score jobs, reusing cached analyses for descriptions scored before under the same CV/prompt/model."""
+    score_cache = get_score_cache()
+    keys = [score_cache.key_for(fields['description']) for fields in jobs]
+    try:
+        cached = score_cache.get_many(keys)
+    except Exception as e:
+        print(f"Score cache lookup failed. Error: {e}")
+        cached = {}
+
+    to_score = [(i, fields) for i, (key, fields) in enumerate(zip(keys, jobs)) if key not in cached]
+    fresh = score_jobs([fields for _, fields in to_score])
+
+    analyses = [cached.get(key) for key in keys]
+    new_entries = {}
+    for (i, _), analysis in zip(to_score, fresh):
+        analyses[i] = analysis
+        if analysis is not None:
+            new_entries[keys[i]] = analysis
+
+    try:
+        score_cache.put_many(new_entries)
+    except Exception as e:
+        print(f"Score cache write failed. Error: {e}")
+    return analyses
+
+
+def _as_list(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return list(value)
+
+
+def iter_new_job_pages(queries, max_pages=SERPAPI_MAX_PAGES):
+    """Yield the not-yet-stored, non-duplicate jobs of each search page as soon as it arrives.
+
+    A query stops paginating once it returns a page with nothing new: every job on it
+    is stored, a near-duplicate, or was scored by an earlier run (non-matches are not
+    stored, but the near-duplicate index keeps every scored job until its TTL). Later
+    pages are older postings that earlier runs have already processed.
+    """
+    seen_ids = set()
+    for job_type, query in queries:
+        print(f"Searching for: '{query}'")
+        for page_number, jobs in enumerate(iter_search_pages(query, SERPAPI_API_KEY, max_pages), start=1):
+            candidates = {}
+            for job in jobs:
+                try:
+                    fields = extract_job_fields(job)
+                except Exception as e:
+                    print(f"Failed to read a job result. Error: {e}")
+                    continue
+                if fields:
+                    fields['job_type'] = job_type
+                    candidates.setdefault(fields['job_id'], fields)
+
+            unseen_ids = [job_id for job_id in candidates if job_id not in seen_ids]
+            existing_ids = find_existing_job_ids(unseen_ids)
+            seen_ids.update(candidates)
+            new_jobs = [candidates[job_id] for job_id in unseen_ids if job_id not in existing_ids]
+            known_count = len(candidates) - len(new_jobs)
+            remaining, unscored = drop_near_duplicates(new_jobs)
+            print(
+                f"Page {page_number}: {len(jobs)} results, {known_count} already known, "
+                f"{len(new_jobs) - len(remaining)} near-duplicates, {len(remaining) - unscored} scored before, "
+                f"{unscored} new."
+            )
 
-    processed_count = 0
-    for job in jobs:
-        try:
-            apply_options = job.get('apply_options', [])
-            apply_link = apply_options[0].get('link') if apply_options else None
+            if remaining:
+                yield remaining
+            if candidates and not unscored:
+                print(f"Page {page_number} contains no new jobs. Stopping pagination for '{query}'.")
+                break
 
-            description = job.get('description')
-            company_name = job.get('company_name')
-            title = job.get('title', 'Unknown Title')
 
-            if not apply_link or not description:
-                continue
+def process_new_jobs(new_jobs, output):
+    """Pre-filter and score one page of new jobs, buffering matches in output.
 
-            job_id = job.get('job_id') or hashlib.sha256(apply_link.encode('utf-8')).hexdigest()
+    new_jobs come from iter_new_job_pages, with stored jobs and near-duplicates removed.
+    Returns the number of matches added to the output buffer.
+    """
+    new_jobs = prefilter_jobs(new_jobs)
+    analyses = score_jobs_cached(new_jobs)
 
-            response = table.get_item(Key={'jobId': job_id})
-            if 'Item' in response:
-                print(f"Job ID {job_id} already exists. Skipping.")
-                continue
+    try:
+        get_near_dup_index().add_many([fields for fields, analysis in zip(new_jobs, analyses) if analysis is not None])
+    except Exception as e:
+        print(f"Near-duplicate index update failed. Error: {e}")
 
-            print(f"Analyzing job: {title[:80]}...")
-            prompt = GEMINI_PROMPT_TEMPLATE.format(job_description=description, cv_summary=CV_SUMMARY)
-            gemini_response = _client.models.generate_content(
-                model=JOB_MATCH_MODEL,
-                contents=prompt,
-            )
-
-            analysis_json = json.loads(extract_json_content(gemini_response.text))
+    matched_count = 0
+    for fields, analysis_json in zip(new_jobs, analyses):
+        if analysis_json is None:
+            continue
+        try:
+            job_id = fields['job_id']
+            apply_link = fields['apply_link']
+            company_name = fields['company_name']
+            title = fields['title']
 
             score = analysis_json.get('score', 0)
             print(f"Match score for {job_id}: {score}")
@@ -92,50 +549,83 @@ def lambda_handler(event, context):
             if score < 6:
                 continue
 
-            table.put_item(
-                Item={
-                    'jobId': job_id,
-                    'jobType': job_type,
-                    'joblink': apply_link,
-                    'company': company_name,
-                    'status': 'MATCH_FOUND',
-                    'title': title,
-                    'description': description,
-                    'gemini_score': score,
-                    'gemini_analysis': json.dumps(analysis_json),
-                }
-            )
+            analysis, job_summary = split_job_summary(analysis_json)
+            item = {
+                'jobId': job_id,
+                'jobType': fields['job_type'],
+                'joblink': apply_link,
+                'company': company_name,
+                'status': 'MATCH_FOUND',
+                'title': title,
+                'description': fields['description'],
+                'gemini_score': score,
+                'gemini_analysis': json.dumps(analysis),
+            }
+            if job_summary:
+                item['job_summary'] = job_summary
 
             if NO_CV_GEN:
-                print("NO_CV_GEN is True. Sending match directly to EmailQueue.")
-                sqs.send_message(
-                    QueueUrl=EMAIL_QUEUE_URL,
-                    MessageBody=json.dumps(
-                        {
-                            'jobId': job_id,
-                            'title': title,
-                            'company_name': company_name,
-                            'joblink': apply_link,
-                            'generated_cv': '',
-                        }
-                    ),
+                queue_url = EMAIL_QUEUE_URL
+                message_body = json.dumps(
+                    {
+                        'jobId': job_id,
+                        'title': title,
+                        'company_name': company_name,
+                        'joblink': apply_link,
+                        'generated_cv': '',
+                    }
                 )
             else:
-                print("NO_CV_GEN is False. Sending match to JobsQueue for CV generation.")
-                sqs.send_message(
-                    QueueUrl=JOB_QUEUE_URL,
-                    MessageBody=json.dumps({'jobId': job_id}),
-                )
+                queue_url = JOB_QUEUE_URL
+                message_body = json.dumps({'jobId': job_id})
 
-            processed_count += 1
+            output.add(job_id, item, queue_url, message_body)
+            matched_count += 1
 
         except Exception as e:
             print(f"Failed to process a job. Error: {e}")
             continue
 
+    return matched_count
+
+
+def lambda_handler(event, context):
+    job_types = _as_list(event.get('job_types') or event.get('job_type'))
+    if not job_types:
+        raise ValueError("Error: 'job_type' not found in the trigger event.")
+    locations = _as_list(event.get('locations') or event.get('location')) or DEFAULT_LOCATIONS
+
+    queries = build_queries(job_types, locations)
+    print(f"Starting scheduled job search for {len(queries)} queries with NO_CV_GEN={NO_CV_GEN}")
+
+    destination = 'EmailQueue' if NO_CV_GEN else 'JobsQueue for CV generation'
+    output = None
+    matched_count = 0
+    for new_jobs in iter_new_job_pages(queries):
+        if output is None:
+            output = OutputBuffer(get_dynamodb(), get_sqs(), DYNAMODB_TABLE_NAME)
+        matched_count += process_new_jobs(new_jobs, output)
+
+    processed_count = 0
+    if output is not None:
+        output.flush()
+        processed_count = len(output.published)
+        print(f"Sent {processed_count} of {matched_count} matches to {destination}.")
+        if output.failed:
+            print(f"Failed to publish {len(output.failed)} matches: {json.dumps(output.failed)}")
+
+    if get_score_cache.cache_info().currsize:
+        print(get_score_cache().report())
+        get_score_cache().reset_stats()
+    timing = startup_report()
+    if timing:
+        print(timing)
     print(f"Search complete. Found and queued {processed_count} qualified jobs.")
     return {'statusCode': 200, 'body': json.dumps(f"Queued {processed_count} jobs.")}
 
 
+record('import job_finder.app', time.perf_counter() - _MODULE_START)
+
+
 if __name__ == '__main__':
     lambda_handler(event={'job_type': 'Android Developer'}, context=None)
@@ -0,0 +1,566 @@
+"""Assertion checks for the job_finder's pure-logic modules.
+
+Each check exercises one module on small fixed inputs and asserts its behaviour.
+DynamoDB, SQS and the model are replaced by in-memory stand-ins, so nothing touches
+the network. The exit status is non-zero when a check fails.
+
+Examples (run from src/job_finder):
+
+    python checks.py                 # every check
+    python checks.py batch_get
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import traceback
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+# Support both package layouts, as app.py does.
+try:
+    import app
+    import storage
+    import near_duplicates
+    from near_duplicates import SIMHASH_BITS, NearDuplicateIndex, simhash, similarity
+    from relevance import CVRelevance
+    from replay import FakeDynamoDB, synthetic_jobs
+    from schemas import BATCH_MATCH_SCHEMA, JOB_SUMMARY_SCHEMA, MATCH_SCHEMA, schema_version, summary_version, validate
+    from score_cache import ScoreCache, scoring_fingerprint
+except ModuleNotFoundError:
+    from job_finder import app, storage
+    from job_finder import near_duplicates
+    from job_finder.near_duplicates import SIMHASH_BITS, NearDuplicateIndex, simhash, similarity
+    from job_finder.relevance import CVRelevance
+    from job_finder.replay import FakeDynamoDB, synthetic_jobs
+    from job_finder.schemas import (
+        BATCH_MATCH_SCHEMA, JOB_SUMMARY_SCHEMA, MATCH_SCHEMA, schema_version, summary_version, validate,
+    )
+    from job_finder.score_cache import ScoreCache, scoring_fingerprint
+
+TABLE = 'NearDuplicates'
+
+
+def _fake_dynamodb():
+    dynamodb = FakeDynamoDB(latency=0.0)
+    dynamodb.key_names[TABLE] = 'bucket'
+    return dynamodb
+
+
+@contextmanager
+def _patched(module, **values):
+    """Temporarily replace module attributes (e.g. retry limits and backoffs)."""
+    saved = {name: getattr(module, name) for name in values}
+    for name, value in values.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
+
+
+class _BatchGetClient:
+    """batch_get_item stand-in; call n leaves its first unprocessed[n] keys unprocessed."""
+
+    def __init__(self, table_name, items, unprocessed=(), always_unprocessed=()):
+        self._table_name = table_name
+        self._items = items
+        self._unprocessed = list(unprocessed)
+        self._always_unprocessed = set(always_unprocessed)
+        self.requests = []
+
+    def batch_get_item(self, RequestItems):
+        keys = RequestItems[self._table_name]['Keys']
+        self.requests.append(len(keys))
+        values = [key['jobId'] for key in keys]
+        skipped = [value for value in values if value in self._always_unprocessed]
+        served = [value for value in values if value not in self._always_unprocessed]
+        count = self._unprocessed.pop(0) if self._unprocessed else 0
+        skipped += served[:count]
+        served = served[count:]
+        response = {'Responses': {self._table_name: [self._items[value] for value in served if value in self._items]}}
+        if skipped:
+            response['UnprocessedKeys'] = {self._table_name: {'Keys': [{'jobId': value} for value in skipped]}}
+        return response
+
+
+def check_batch_get():
+    items = {f'job-{i}': {'jobId': f'job-{i}', 'status': 'PENDING'} for i in range(0, 250, 2)}
+    wanted = [f'job-{i}' for i in range(250)]
+
+    # Chunks of 100 keys; duplicates are requested once and missing keys are left out.
+    client = _BatchGetClient('Jobs', items)
+    assert storage.batch_get_items(client, 'Jobs', 'jobId', wanted + wanted[:10]) == items
+    assert client.requests == [100, 100, 50], client.requests
+
+    # Unprocessed keys are requested again until every key is served.
+    with _patched(storage.time, sleep=lambda seconds: None):
+        client = _BatchGetClient('Jobs', items, unprocessed=(30, 30, 5))
+        assert storage.batch_get_items(client, 'Jobs', 'jobId', wanted[:100]) == {
+            key: item for key, item in items.items() if key in wanted[:100]
+        }
+        assert client.requests == [100, 30, 30, 5], client.requests
+
+        # Keys still unprocessed after the retries are treated as missing.
+        client = _BatchGetClient('Jobs', items, always_unprocessed={'job-0', 'job-2'})
+        with _patched(storage, BATCH_GET_MAX_RETRIES=2):
+            found = storage.batch_get_items(client, 'Jobs', 'jobId', wanted[:10])
+        assert sorted(found) == ['job-4', 'job-6', 'job-8'], found
+        assert client.requests == [10, 2, 2], client.requests
+
+
+def check_prefilter():
+    jobs = [
+        {'job_id': 'nurse', 'title': 'Nurse', 'description': 'Patient care on a hospital ward, night shifts.'},
+        {'job_id': 'android', 'title': 'Android', 'description': 'Kotlin Android developer, Jetpack Compose.'},
+        {'job_id': 'backend', 'title': 'Backend', 'description': 'Python backend on AWS Lambda and Kotlin.'},
+    ]
+    relevance = CVRelevance('Android developer: Kotlin, Jetpack Compose, Python and AWS.')
+    with _patched(app, get_cv_relevance=lambda: relevance):
+        # The default mode only logs: every job is kept, in input order.
+        assert app.PREFILTER_MODE == 'log' or 'PREFILTER_MODE' in os.environ
+        assert app.prefilter_jobs(jobs, threshold=0.1, mode='log') == jobs
+        ranked = app.prefilter_jobs(jobs, threshold=0.1, mode='rank')
+        assert [fields['job_id'] for fields in ranked] == ['android', 'backend', 'nurse'], ranked
+        kept = app.prefilter_jobs(jobs, threshold=0.1, mode='drop')
+        assert [fields['job_id'] for fields in kept] == ['android', 'backend'], kept
+        assert app.prefilter_jobs(jobs, threshold=0, mode='drop') == ranked
+        assert app.prefilter_jobs([], mode='drop') == []
+
+
+class _CountingClient:
+    """Wraps a FakeDynamoDB and counts its BatchGetItem and BatchWriteItem requests."""
+
+    def __init__(self, dynamodb):
+        self._dynamodb = dynamodb
+        self.reads = 0
+        self.writes = 0
+
+    def batch_get_item(self, RequestItems):
+        self.reads += 1
+        return self._dynamodb.batch_get_item(RequestItems=RequestItems)
+
+    def batch_write_item(self, RequestItems):
+        self.writes += 1
+        return self._dynamodb.batch_write_item(RequestItems=RequestItems)
+
+
+def check_simhash():
+    # synthetic_jobs with duplicate_rate=0 gives unrelated descriptions of 150-450 words.
+    first, second = (job['description'] for job in synthetic_jobs(2, seed=3, duplicate_rate=0))
+    repost = first + ' Apply through our partner site.'
+    assert simhash(first) == simhash(first) and similarity(simhash(first), simhash(first)) == 1
+    assert similarity(simhash(first), simhash(repost)) >= 0.9
+    assert similarity(simhash(first), simhash(second)) < 0.9
+    assert simhash('') == 0 and simhash('two words') != 0
+
+    # Fingerprints within the index's max distance always share a bucket (pigeonhole).
+    index = NearDuplicateIndex(None, None, threshold=0.9)
+    max_distance = int((1 - 0.9) * SIMHASH_BITS)
+    rng = random.Random(5)
+    for _ in range(200):
+        fingerprint = rng.getrandbits(SIMHASH_BITS)
+        near = fingerprint
+        for bit in rng.sample(range(SIMHASH_BITS), max_distance):
+            near ^= 1 << bit
+        assert set(index._bucket_keys(fingerprint)) & set(index._bucket_keys(near))
+
+
+def check_near_duplicates():
+    original, other = synthetic_jobs(2, seed=3, duplicate_rate=0)
+    repost = dict(original, job_id='repost', description=original['description'] + ' Apply through our partner site.')
+    dynamodb = _fake_dynamodb()
+    client = _CountingClient(dynamodb)
+
+    # Jobs on the same page are checked against each other; the page's buckets are one read.
+    index = NearDuplicateIndex(client, TABLE)
+    unique, duplicates = index.split_duplicates([dict(original), dict(repost), dict(other)])
+    assert [fields['job_id'] for fields in unique] == [original['job_id'], other['job_id']]
+    assert [(fields['job_id'], match_id) for fields, match_id, _ in duplicates] == [('repost', original['job_id'])]
+    assert duplicates[0][2] >= 0.9
+    assert client.reads == 1
+
+    # add_many writes one typed item per bucket, listing its members, from the cached buckets.
+    index.add_many(unique)
+    assert (client.reads, client.writes) == (1, 1)
+    items = dynamodb.tables[TABLE]
+    assert len(items) == len({key for fields in unique for key in index._bucket_keys(fields['simhash'])})
+    for bucket, item in items.items():
+        assert item['bucket'] == {'S': bucket}
+        for job_id, value in item['members']['M'].items():
+            fingerprint, expires_at = value['S'].split(':')
+            assert bucket in index._bucket_keys(int(fingerprint, 16))
+            assert item['expiresAt'] == {'N': expires_at}
+
+    # A cold index finds the earlier job through the bucket table, and not the job itself.
+    cold = NearDuplicateIndex(dynamodb, TABLE)
+    unique, duplicates = cold.split_duplicates([dict(repost), dict(original)])
+    assert [fields['job_id'] for fields in unique] == [original['job_id']]
+    assert [match_id for _, match_id, _ in duplicates] == [original['job_id']]
+    assert cold.is_indexed(original['job_id'], unique[0]['simhash'])
+    assert not cold.is_indexed('repost', duplicates[0][0]['simhash'])
+
+    # Another run's writes are seen once the cached buckets are older than BUCKET_CACHE_SECONDS.
+    newcomer = synthetic_jobs(3, seed=4, duplicate_rate=0)[2]
+    late = dict(newcomer, job_id='late', description=newcomer['description'] + ' Apply through our partner site.')
+    warm = NearDuplicateIndex(client, TABLE)
+    assert len(warm.split_duplicates([dict(late)])[0]) == 1
+    writer = NearDuplicateIndex(dynamodb, TABLE)
+    writer.add_many(writer.split_duplicates([dict(newcomer)])[0])
+    reads = client.reads
+    assert len(warm.split_duplicates([dict(late)])[0]) == 1 and client.reads == reads
+    with _patched(near_duplicates, BUCKET_CACHE_SECONDS=-1):
+        assert warm.split_duplicates([dict(late)])[0] == []
+    assert client.reads == reads + 1
+
+    # The bucket cache is bounded, dropping the least recently used buckets.
+    with _patched(near_duplicates, BUCKET_CACHE_SIZE=10):
+        warm.split_duplicates([dict(job) for job in synthetic_jobs(5, seed=9, duplicate_rate=0)])
+    assert len(warm._cache) == 10
+
+    # Expired members are skipped even before TTL deletion removes them, and pruned on write.
+    for item in items.values():
+        for job_id, value in item['members']['M'].items():
+            value['S'] = value['S'].split(':')[0] + f':{int(time.time()) - 1}'
+    fresh = NearDuplicateIndex(dynamodb, TABLE)
+    unique, duplicates = fresh.split_duplicates([dict(repost)])
+    assert len(unique) == 1 and duplicates == []
+    fresh.add_many(unique)
+    for key in fresh._bucket_keys(unique[0]['simhash']):
+        assert list(items[key]['members']['M']) == ['repost']
+
+    # Buckets keep their newest MAX_BUCKET_MEMBERS members.
+    with _patched(near_duplicates, MAX_BUCKET_MEMBERS=2):
+        capped = NearDuplicateIndex(None, None)
+        for job_id in ('a', 'b', 'c'):
+            capped.add_many([{'job_id': job_id, 'simhash': 0}])
+            time.sleep(0.001)
+        assert all(len(members) <= 2 for _, members in capped._cache.values())
+
+
+class _FlakyDynamoDB(FakeDynamoDB):
+    """FakeDynamoDB whose BatchWriteItem raises for chunks with a 'bad' item and leaves 'slow' items unprocessed once."""
+
+    def __init__(self):
+        super().__init__(latency=0.0)
+        self.write_sizes = []
+        self._delayed = set()
+
+    def batch_write_item(self, RequestItems):
+        (name, requests), = RequestItems.items()
+        self.write_sizes.append(len(requests))
+        items = [request['PutRequest']['Item'] for request in requests]
+        if any(item.get('bad') for item in items):
+            raise ValueError('Item size has exceeded the maximum allowed size')
+        unprocessed = [item for item in items if item.get('slow') and item['jobId'] not in self._delayed]
+        self._delayed.update(item['jobId'] for item in unprocessed)
+        for item in items:
+            if item not in unprocessed:
+                self.Table(name).put_item(Item=item)
+        return {'UnprocessedItems': {name: [{'PutRequest': {'Item': item}} for item in unprocessed]} if unprocessed else {}}
+
+    def Table(self, name):
+        table = super().Table(name)
+        put_item = table.put_item
+
+        def checked_put_item(Item):
+            if Item.get('bad'):
+                raise ValueError('Item size has exceeded the maximum allowed size')
+            put_item(Item=Item)
+        table.put_item = checked_put_item
+        return table
+
+
+class _FlakySQS:
+    """send_message_batch stand-in; script maps a message body to the failures it gets before succeeding.
+
+    A failure is 'raise' (the request fails), 'retry' (a retryable failed entry) or
+    'sender' (a failed entry with SenderFault).
+    """
+
+    def __init__(self, script=None):
+        self._script = {body: list(failures) for body, failures in (script or {}).items()}
+        self.batches = []
+        self.sent = []
+
+    def send_message_batch(self, QueueUrl, Entries):
+        self.batches.append((QueueUrl, len(Entries)))
+        failures = {entry['Id']: self._script.get(entry['MessageBody'], []) for entry in Entries}
+        if any(failure[:1] == ['raise'] for failure in failures.values()):
+            for failure in failures.values():
+                if failure[:1] == ['raise']:
+                    failure.pop(0)
+            raise ConnectionError('Connection reset by peer')
+        response = {'Successful': [], 'Failed': []}
+        for entry in Entries:
+            failure = failures[entry['Id']]
+            if failure:
+                kind = failure[0] if failure[0] == 'sender' else failure.pop(0)
+                response['Failed'].append({'Id': entry['Id'], 'Code': kind, 'SenderFault': kind == 'sender'})
+            else:
+                self.sent.append((QueueUrl, entry['MessageBody']))
+                response['Successful'].append({'Id': entry['Id']})
+        return response
+
+
+def _flaky():
+    dynamodb = _FlakyDynamoDB()
+    dynamodb.key_names['Jobs'] = 'jobId'
+    return dynamodb
+
+
+def _buffer_entries(buffer, count, queue_url='jobs', **fields):
+    for i in range(count):
+        job_id = f'{queue_url}-{i}'
+        buffer.add(job_id, dict({'jobId': job_id}, **fields.get(job_id, {})), queue_url, job_id)
+
+
+def check_output_buffer():
+    with _patched(storage.OutputBuffer, _backoff=lambda self, attempt: None):
+        # Items are written 25 at a time, messages sent 10 at a time per queue.
+        dynamodb, sqs = _flaky(), _FlakySQS()
+        buffer = storage.OutputBuffer(dynamodb, sqs, 'Jobs', max_retries=2)
+        _buffer_entries(buffer, 12, 'jobs')
+        _buffer_entries(buffer, 13, 'email')
+        assert dynamodb.write_sizes == [25], dynamodb.write_sizes
+        assert sorted(sqs.batches) == [('email', 3), ('email', 10), ('jobs', 2), ('jobs', 10)], sqs.batches
+        assert len(buffer.published) == 25 and buffer.failed == []
+
+        # A chunk whose BatchWriteItem fails is written one item at a time: only the bad
+        # item is dropped, and no message is sent for it. Unprocessed items are retried.
+        dynamodb, sqs = _flaky(), _FlakySQS()
+        buffer = storage.OutputBuffer(dynamodb, sqs, 'Jobs', max_retries=2)
+        _buffer_entries(buffer, 5, 'jobs', **{'jobs-1': {'bad': True}, 'jobs-3': {'slow': True}})
+        buffer.flush()
+        assert sorted(dynamodb.tables['Jobs']) == ['jobs-0', 'jobs-2', 'jobs-3', 'jobs-4']
+        assert [failure['id'] for failure in buffer.failed] == ['jobs-1']
+        assert sorted(buffer.published) == ['jobs-0', 'jobs-2', 'jobs-3', 'jobs-4']
+
+        dynamodb = _flaky()
+        buffer = storage.OutputBuffer(dynamodb, _FlakySQS(), 'Jobs', max_retries=2)
+        _buffer_entries(buffer, 3, 'jobs', **{'jobs-1': {'slow': True}})
+        buffer.flush()
+        assert dynamodb.write_sizes == [3, 1] and len(buffer.published) == 3
+
+        # Failed entries are retried unless the sender is at fault; failed requests are
+        # retried as a whole, up to max_retries times.
+        sqs = _FlakySQS({'jobs-0': ['retry'], 'jobs-1': ['sender'], 'jobs-2': ['raise'],
+                         'jobs-3': ['retry', 'retry', 'retry']})
+        buffer = storage.OutputBuffer(_flaky(), sqs, 'Jobs', max_retries=2)
+        _buffer_entries(buffer, 5, 'jobs')
+        buffer.flush()
+        assert sorted(buffer.published) == ['jobs-0', 'jobs-2', 'jobs-4'], buffer.published
+        assert sorted(failure['id'] for failure in buffer.failed) == ['jobs-1', 'jobs-3'], buffer.failed
+        assert sorted(body for _, body in sqs.sent) == ['jobs-0', 'jobs-2', 'jobs-4']
+
+        sqs = _FlakySQS({'jobs-0': ['raise'] * 3})
+        buffer = storage.OutputBuffer(_flaky(), sqs, 'Jobs', max_retries=2)
+        _buffer_entries(buffer, 2, 'jobs')
+        buffer.flush()
+        assert buffer.published == [] and len(buffer.failed) == 2 and len(sqs.batches) == 3
+
+
+def check_early_stop():
+    jobs = synthetic_jobs(40, seed=11, duplicate_rate=0)
+    scored, stored, fresh = jobs[:10], jobs[10:15], jobs[15:]
+    repost = dict(scored[0], job_id='repost', description=scored[0]['description'] + ' Apply through our partner site.')
+    # An earlier run scored these jobs (all non-matches, so none of them is stored).
+    index = NearDuplicateIndex(_fake_dynamodb(), TABLE)
+    earlier = [app.extract_job_fields(job) for job in scored]
+    index.add_many(index.split_duplicates(earlier)[0])
+
+    def run(pages):
+        requested = []
+
+        def search_pages(query, api_key, max_pages):
+            for number, page in enumerate(pages, start=1):
+                requested.append(number)
+                yield page
+
+        with _patched(app, iter_search_pages=search_pages, get_near_dup_index=lambda: index,
+                      find_existing_job_ids=lambda ids: {job['job_id'] for job in stored} & set(ids)):
+            yielded = [[fields['job_id'] for fields in page] for page in app.iter_new_job_pages([('Dev', 'q')])]
+        return yielded, requested
+
+    # Jobs scored before are still yielded (cheap through the score cache) but are not
+    # new, so a page of them, stored jobs and reposts ends the query.
+    yielded, requested = run([fresh[:5] + scored[:2], scored[2:6] + stored + [repost], fresh[5:]])
+    assert yielded == [
+        [job['job_id'] for job in fresh[:5] + scored[:2]],
+        [job['job_id'] for job in scored[2:6]],
+    ], yielded
+    assert requested == [1, 2], requested
+
+    # One unscored job on the page keeps the query paginating.
+    yielded, requested = run([scored[:3] + fresh[:1], stored, fresh[1:3]])
+    assert requested == [1, 2], requested
+    assert yielded == [[job['job_id'] for job in scored[:3] + fresh[:1]]], yielded
+
+
+def check_score_cache():
+    dynamodb = FakeDynamoDB(latency=0.0)
+    dynamodb.key_names['ScoreCache'] = 'cacheKey'
+    fingerprint = scoring_fingerprint('cv', 'prompt', 'batch prompt', 'model')
+    cache = ScoreCache(dynamodb, 'ScoreCache', fingerprint)
+
+    # Keys ignore case and whitespace, and change with anything in the fingerprint.
+    key = cache.key_for('Kotlin  developer\n')
+    assert key == cache.key_for(' kotlin developer')
+    assert key != cache.key_for('Kotlin developers')
+    assert key != ScoreCache(dynamodb, 'ScoreCache', scoring_fingerprint('cv', 'prompt', 'batch', 'model')).key_for(
+        'Kotlin developer'
+    )
+    assert scoring_fingerprint('a', 'bc') != scoring_fingerprint('ab', 'c')
+
+    analysis = {'score': 7, 'is_match': True, 'justification': 'Cached.'}
+    cache.put_many({key: analysis})
+    assert cache.get_many([key, 'other']) == {key: analysis} and (cache.hits, cache.misses) == (1, 1)
+
+    # A cold cache (another container) reads the table; expired items are misses.
+    assert ScoreCache(dynamodb, 'ScoreCache', fingerprint).get_many([key]) == {key: analysis}
+    dynamodb.tables['ScoreCache'][key]['expiresAt'] = int(time.time()) - 1
+    cold = ScoreCache(dynamodb, 'ScoreCache', fingerprint)
+    assert cold.get_many([key]) == {} and cold.report() == 'Score cache: 0 hits, 1 misses (0% hit rate).'
+
+    # score_jobs_cached only sends the descriptions it has not seen to the model.
+    jobs = [{'description': 'Kotlin developer'}, {'description': 'Nurse'}, {'description': ' kotlin DEVELOPER'}]
+    scored = []
+
+    def score_jobs(batch):
+        scored.extend(fields['description'] for fields in batch)
+        return [None if fields['description'] == 'Nurse' else analysis for fields in batch]
+
+    cache = ScoreCache(dynamodb, 'ScoreCache', fingerprint)
+    with _patched(app, get_score_cache=lambda: cache, score_jobs=score_jobs):
+        assert app.score_jobs_cached(jobs) == [analysis, None, analysis]
+        # Failed scores are not cached, so only 'Nurse' is scored again.
+        assert app.score_jobs_cached(jobs) == [analysis, None, analysis]
+    assert scored == ['Kotlin developer', 'Nurse', ' kotlin DEVELOPER', 'Nurse'], scored
+
+
+def check_job_summary():
+    summary = {'technical_skills': ['Kotlin'], 'core_responsibilities': [], 'qualifications_and_preferences': [],
+               'keywords': [{'keyword': 'Kotlin', 'importance': 5}]}
+    analysis = {'score': 8, 'is_match': True, 'justification': 'Fit.', 'job_summary': summary}
+
+    # The tag covers the schema, the prompt and the model that produced the summary.
+    version = summary_version(JOB_SUMMARY_SCHEMA, 'prompt', app.JOB_MATCH_MODEL)
+    assert version.startswith(schema_version(JOB_SUMMARY_SCHEMA) + '-')
+    assert version != summary_version(JOB_SUMMARY_SCHEMA, 'edited prompt', app.JOB_MATCH_MODEL)
+    assert version != summary_version(JOB_SUMMARY_SCHEMA, 'prompt', 'other-model')
+    stamped = app.stamp_summary_version(dict(analysis), 'prompt')
+    assert stamped['summary_version'] == version
+    assert 'summary_version' not in app.stamp_summary_version({'score': 1}, 'prompt')
+
+    # The stored summary keeps the stamp it was produced with, not the current prompt's.
+    rest, stored = app.split_job_summary(stamped)
+    assert rest == {'score': 8, 'is_match': True, 'justification': 'Fit.'}
+    assert json.loads(stored) == {'version': version, 'source': 'job_finder', 'latex_escaped': False,
+                                  'summary': summary}
+    # Analyses cached before summaries were stamped lose their summary.
+    assert app.split_job_summary(analysis) == (rest, None)
+    assert app.split_job_summary(dict(stamped, job_summary={'keywords': []})) == (rest, None)
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class _ScriptedModels:
+    """generate_content stand-in: batch prompts get batch_text, single-job prompts a valid analysis."""
+
+    def __init__(self, batch_text):
+        self._batch_text = batch_text
+        self.single_calls = []
+
+    def generate_content(self, model, contents, config=None):
+        if '### Job ID:' in contents:
+            return _Response(self._batch_text)
+        self.single_calls.append(contents)
+        return _Response(json.dumps({'score': 3, 'is_match': False, 'justification': 'Single call.'}))
+
+
+def check_score_batch():
+    batch = [
+        {'job_id': f'job-{i}', 'title': f'Job {i}', 'description': f'Description of job {i}.'} for i in range(4)
+    ]
+    valid = {'score': 8, 'is_match': True, 'justification': 'Batch entry.'}
+    entries = [
+        dict(valid, job_id='0'),
+        dict(valid, job_id='0', score=1),  # a second answer for job 0 is ignored
+        dict(valid, job_id='1', score=11),  # invalid: re-scored singly
+        dict(valid, job_id='x'),  # unknown ID
+        dict(valid, job_id=3, justification='Integer ID.'),
+    ]  # job 2 is missing: re-scored singly
+    single = {'score': 3, 'is_match': False, 'justification': 'Single call.'}
+
+    for batch_text, batch_results, single_count in (
+        ('```json\n' + json.dumps(entries) + '\n```', {0: valid, 3: dict(valid, justification='Integer ID.')}, 2),
+        ('Sorry, I cannot help with that.', {}, 4),
+        (json.dumps(valid), {}, 4),  # an object instead of an array
+    ):
+        models = _ScriptedModels(batch_text)
+        with _patched(app, get_genai_client=lambda: SimpleNamespace(models=models),
+                      get_cv_summary=lambda: 'Android developer.', SCORING_MAX_REPAIRS=0):
+            results = app.score_batch(batch)
+        assert results == [batch_results.get(i, single) for i in range(len(batch))], results
+        assert len(models.single_calls) == single_count, len(models.single_calls)
+
+
+def check_validate():
+    match = {'score': 8, 'is_match': True, 'justification': 'Strong fit.'}
+    assert validate(match, MATCH_SCHEMA) == []
+    assert validate(dict(match, score=11, is_match='yes'), MATCH_SCHEMA) == [
+        '$.score: 11 is above the maximum 10',
+        '$.is_match: expected boolean, got str',
+    ]
+    assert validate([dict(match, job_id=1), match], BATCH_MATCH_SCHEMA) == ['$[1]: missing required key "job_id"']
+    summary = {'technical_skills': [], 'core_responsibilities': [], 'qualifications_and_preferences': [],
+               'keywords': [{'keyword': 'Kotlin', 'importance': 0}]}
+    assert validate(dict(match, job_summary=summary), MATCH_SCHEMA) == [
+        '$.job_summary.keywords[0].importance: 0 is below the minimum 1'
+    ]
+
+
+CHECKS = {
+    'batch_get': check_batch_get,
+    'prefilter': check_prefilter,
+    'score_batch': check_score_batch,
+    'early_stop': check_early_stop,
+    'score_cache': check_score_cache,
+    'simhash': check_simhash,
+    'near_duplicates': check_near_duplicates,
+    'output_buffer': check_output_buffer,
+    'job_summary': check_job_summary,
+    'validate': check_validate,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('names', nargs='*', metavar='name', help=f"Checks to run (default: all): {', '.join(CHECKS)}.")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.names if name not in CHECKS]
+    if unknown:
+        parser.error(f"unknown checks: {', '.join(unknown)}")
+
+    failed = 0
+    for name in args.names or CHECKS:
+        try:
+            CHECKS[name]()
+        except Exception:
+            failed += 1
+            print(f'FAIL {name}')
+            traceback.print_exc()
+        else:
+            print(f'ok   {name}')
+    print(f'{len(args.names or CHECKS) - failed} passed, {failed} failed.')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,204 @@
+import hashlib
+import re
+import time
+from collections import Counter, OrderedDict
+
+try:
+    from storage import batch_get_items, batch_write_items
+except ModuleNotFoundError:
+    from job_finder.storage import batch_get_items, batch_write_items
+
+SIMHASH_BITS = 64
+# A bucket item keeps at most this many members (the newest); a DynamoDB item is limited to 400 KB.
+MAX_BUCKET_MEMBERS = 500
+# Buckets read from the table are reused for this long, so warm invocations see other
+# runs' writes, and at most BUCKET_CACHE_SIZE of them are kept (least recently used out).
+BUCKET_CACHE_SECONDS = 300
+BUCKET_CACHE_SIZE = 5000
+_WORD_RE = re.compile(r"\w+")
+
+
+def shingles(text, size=3):
+    """Word n-gram shingles of a description, lowercased."""
+    words = _WORD_RE.findall((text or '').lower())
+    if len(words) < size:
+        return [' '.join(words)] if words else []
+    return [' '.join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def simhash(text):
+    """64-bit SimHash over weighted description shingles."""
+    weights = [0] * SIMHASH_BITS
+    for shingle, count in Counter(shingles(text)).items():
+        value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += count if value >> bit & 1 else -count
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def similarity(a, b):
+    """Fraction of matching SimHash bits."""
+    return 1 - bin(a ^ b).count('1') / SIMHASH_BITS
+
+
+class NearDuplicateIndex:
+    """SimHash index over job descriptions, persisted as LSH buckets in DynamoDB.
+
+    The 64-bit fingerprint is split into max_distance + 1 bands, so by pigeonhole any
+    two fingerprints within max_distance bits share at least one band exactly. The
+    table has one item per bucket, mapping each member jobId to its fingerprint and
+    expiry; expired members are skipped on read and pruned on the next write, and the
+    item itself expires with its newest member. A page of jobs costs one chunked
+    BatchGetItem for all of its buckets and one chunked BatchWriteItem for the buckets
+    its scored jobs join.
+
+    dynamodb is a low-level DynamoDB client (thread-safe, unlike the resource). Writes
+    replace whole bucket items, so two runs adding to the same bucket at once can drop
+    each other's new members; the cost is a repost that is scored once more.
+    """
+
+    def __init__(self, dynamodb, table_name, threshold=0.9, ttl_days=90):
+        self._dynamodb = dynamodb
+        self._table_name = table_name
+        self._threshold = threshold
+        self._ttl_seconds = int(ttl_days * 24 * 3600)
+        max_distance = int((1 - threshold) * SIMHASH_BITS)
+        self._bands = min(SIMHASH_BITS, max_distance + 1)
+        self._band_width = SIMHASH_BITS // self._bands
+        # bucket key -> (loaded at, {jobId: (simhash, expiresAt)}); survives warm invocations.
+        self._cache = OrderedDict()
+
+    def _bucket_keys(self, fingerprint):
+        mask = (1 << self._band_width) - 1
+        return [
+            f"{band}#{fingerprint >> (band * self._band_width) & mask:x}"
+            for band in range(self._bands)
+        ]
+
+    def _load_buckets(self, bucket_keys):
+        """Return {bucket key: live members} for bucket_keys, reading stale or unknown ones in one batch."""
+        now = time.time()
+        bucket_keys = list(dict.fromkeys(bucket_keys))
+        stale = [
+            key for key in bucket_keys
+            if key not in self._cache or now - self._cache[key][0] > BUCKET_CACHE_SECONDS
+        ]
+        if stale and self._table_name:
+            items = batch_get_items(self._dynamodb, self._table_name, 'bucket', stale, key_type='S')
+            for key in stale:
+                members = {}
+                for job_id, value in items.get(key, {}).get('members', {}).get('M', {}).items():
+                    fingerprint, expires_at = value['S'].split(':')
+                    members[job_id] = (int(fingerprint, 16), int(expires_at))
+                self._cache[key] = (now, members)
+        elif stale:
+            for key in stale:
+                self._cache.setdefault(key, (now, {}))
+
+        buckets = {}
+        for key in bucket_keys:
+            self._cache.move_to_end(key)
+            # TTL deletion lags by up to a few days; skip expired members.
+            buckets[key] = {
+                job_id: fingerprint
+                for job_id, (fingerprint, expires_at) in self._cache[key][1].items() if expires_at > now
+            }
+        while len(self._cache) > BUCKET_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return buckets
+
+    def _best_match(self, job_id, fingerprint, buckets):
+        best_id, best_similarity = None, 0.0
+        for key in self._bucket_keys(fingerprint):
+            for other_id, other in buckets.get(key, {}).items():
+                if other_id == job_id:
+                    continue
+                score = similarity(fingerprint, other)
+                if score >= self._threshold and score > best_similarity:
+                    best_id, best_similarity = other_id, score
+        return best_id, best_similarity
+
+    def is_indexed(self, job_id, fingerprint):
+        """Whether job_id is in the index (added by any run and not expired).
+
+        fingerprint is the job's simhash, which locates its buckets; only reliable after
+        split_duplicates has loaded them.
+        """
+        now = time.time()
+        for key in self._bucket_keys(fingerprint):
+            member = self._cache.get(key, (0, {}))[1].get(job_id)
+            if member is not None and member[1] > now:
+                return True
+        return False
+
+    def split_duplicates(self, jobs):
+        """Split jobs into (unique, duplicates).
+
+        duplicates is a list of (fields, duplicate_of_job_id, similarity). Jobs on the
+        same page are also checked against each other. Each job gets a 'simhash'
+        field so that add_many can index it without rehashing.
+        """
+        for fields in jobs:
+            fields['simhash'] = simhash(fields['description'])
+        buckets = self._load_buckets([key for fields in jobs for key in self._bucket_keys(fields['simhash'])])
+
+        pending = {}
+        unique, duplicates = [], []
+        for fields in jobs:
+            job_id, fingerprint = fields['job_id'], fields['simhash']
+            match_id, score = self._best_match(job_id, fingerprint, buckets)
+            if match_id is None:
+                match_id, score = self._best_match(job_id, fingerprint, pending)
+
+            if match_id is not None:
+                duplicates.append((fields, match_id, score))
+                continue
+
+            unique.append(fields)
+            for key in self._bucket_keys(fingerprint):
+                pending.setdefault(key, {})[job_id] = fingerprint
+        return unique, duplicates
+
+    def add_many(self, jobs):
+        """Index jobs (with a 'simhash' field) in memory and in the bucket table."""
+        added = {}
+        expires_at = int(time.time()) + self._ttl_seconds
+        for fields in jobs:
+            for key in self._bucket_keys(fields['simhash']):
+                added.setdefault(key, {})[fields['job_id']] = (fields['simhash'], expires_at)
+        if not added:
+            return
+
+        # Start from the stored members (usually cached by split_duplicates).
+        self._load_buckets(added)
+        now = time.time()
+        items = []
+        for key, new_members in added.items():
+            members = {
+                job_id: member for job_id, member in self._cache[key][1].items() if member[1] > now
+            }
+            members.update(new_members)
+            if len(members) > MAX_BUCKET_MEMBERS:
+                newest = sorted(members.items(), key=lambda pair: pair[1][1], reverse=True)
+                members = dict(newest[:MAX_BUCKET_MEMBERS])
+            self._cache[key] = (self._cache[key][0], members)
+            items.append(
+                {
+                    'bucket': {'S': key},
+                    'members': {
+                        'M': {
+                            job_id: {'S': f'{fingerprint:x}:{expires}'}
+                            for job_id, (fingerprint, expires) in members.items()
+                        }
+                    },
+                    'expiresAt': {'N': str(max(expires for _, expires in members.values()))},
+                }
+            )
+
+        if self._table_name:
+            batch_write_items(self._dynamodb, self._table_name, items)
@@ -0,0 +1,66 @@
+import math
+import re
+from collections import Counter
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+_STOPWORDS = frozenset(
+    """
+    a about above after all also an and any are as at be been being both but by can could did do does
+    doing during each etc few for from further had has have having here how i if in into is it its
+    itself just may me more most must my no nor not of off on once only or other our ours out over own
+    per same she should so some such than that the their them then there these they this those through
+    to too under until up us very was we well were what when where which while who whom why will with
+    within without would you your yours role team work working job jobs experience years year strong
+    ability looking join company candidate candidates including new using use used required preferred
+    """.split()
+)
+
+
+def tokenize(text):
+    """Lowercase word tokens with stopwords removed. Keeps tech tokens like c++, c#, node.js."""
+    tokens = []
+    for token in _TOKEN_RE.findall((text or '').lower()):
+        token = token.rstrip('.')
+        if len(token) > 1 and token not in _STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+class CVRelevance:
+    """TF-IDF cosine similarity between job descriptions and a fixed CV summary.
+
+    The CV term frequencies are computed once; IDF weights come from the batch of
+    descriptions being ranked (plus the CV), so terms every posting shares count less.
+    """
+
+    def __init__(self, cv_text):
+        self._cv_counts = Counter(tokenize(cv_text))
+
+    def score_all(self, descriptions):
+        """Return one similarity in [0, 1] per description, in input order."""
+        doc_counts = [Counter(tokenize(description)) for description in descriptions]
+
+        doc_freq = Counter(self._cv_counts.keys())
+        for counts in doc_counts:
+            doc_freq.update(counts.keys())
+        n_docs = len(doc_counts) + 1
+        idf = {term: math.log((1 + n_docs) / (1 + df)) + 1 for term, df in doc_freq.items()}
+
+        cv_vector = {term: (1 + math.log(tf)) * idf[term] for term, tf in self._cv_counts.items()}
+        cv_norm = math.sqrt(sum(w * w for w in cv_vector.values()))
+
+        scores = []
+        for counts in doc_counts:
+            if not counts or not cv_norm:
+                scores.append(0.0)
+                continue
+            dot = 0.0
+            norm = 0.0
+            for term, tf in counts.items():
+                weight = (1 + math.log(tf)) * idf[term]
+                norm += weight * weight
+                if term in cv_vector:
+                    dot += weight * cv_vector[term]
+            scores.append(dot / (math.sqrt(norm) * cv_norm))
+        return scores
@@ -0,0 +1,433 @@
+"""Offline replay benchmark for the job_finder pipeline.
+
+Runs lambda_handler against in-process stand-ins for SerpApi, Gemini, DynamoDB and
+SQS, then reports throughput, per-stage latency percentiles and call counts. Nothing
+touches the network, so scoring-concurrency and batching changes can be measured
+locally.
+
+Examples (run from src/job_finder so config/ resolves):
+
+    python replay.py --synthetic 2000 --model-latency 0.2 --concurrency 8
+    python replay.py --feed config/data.json --responses recorded_scores.json
+    SCORING_MODE=batch python replay.py --synthetic 5000
+    python replay.py --feed config/data.json --responses recorded_scores.json --prefilter-sweep 0.01 0.03 0.05
+
+Scoring settings (SCORING_MODE, PREFILTER_THRESHOLD, ...) are read from the
+environment as usual; --concurrency and --max-pages override theirs.
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_call_counts = Counter()
+_latencies = defaultdict(list)
+
+
+def _record(name, seconds):
+    with _lock:
+        _call_counts[name] += 1
+        _latencies[name].append(seconds)
+
+
+def _timed_wrapper(name, func):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _record(name, time.perf_counter() - start)
+    return wrapper
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+# --- Feeds ---
+
+_SKILL_WORDS = [
+    'python', 'java', 'kotlin', 'android', 'aws', 'gcp', 'kubernetes', 'docker', 'sql', 'nosql',
+    'react', 'node.js', 'backend', 'cloud', 'serverless', 'microservices', 'terraform', 'ci/cd',
+]
+_OTHER_WORDS = [
+    'nursing', 'patient', 'retail', 'sales', 'warehouse', 'forklift', 'accounting', 'payroll',
+    'marketing', 'customer', 'cashier', 'driver', 'teacher', 'classroom', 'chef', 'kitchen',
+]
+_FILLER_WORDS = [
+    'team', 'build', 'deliver', 'collaborate', 'design', 'own', 'improve', 'support', 'operate',
+    'growth', 'product', 'customers', 'quality', 'fast', 'impact', 'mission', 'benefits', 'remote',
+]
+
+
+def synthetic_jobs(count, seed=7, duplicate_rate=0.05):
+    """Generate SerpApi-shaped jobs; a share are reposts of earlier descriptions."""
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(count):
+        if jobs and rng.random() < duplicate_rate:
+            original = rng.choice(jobs)
+            description = original['description'] + ' Apply through our partner site.'
+        else:
+            domain = _SKILL_WORDS if rng.random() < 0.6 else _OTHER_WORDS
+            words = [rng.choice(domain if rng.random() < 0.25 else _FILLER_WORDS) for _ in range(rng.randint(150, 450))]
+            description = ' '.join(words)
+        jobs.append(
+            {
+                'job_id': f'synthetic-{i}',
+                'title': f'Synthetic Job {i}',
+                'company_name': f'Company {i % 97}',
+                'description': description,
+                'apply_options': [{'link': f'https://example.com/jobs/{i}'}],
+            }
+        )
+    return jobs
+
+
+def load_feed(path):
+    """Load recorded SerpApi output: one response dict, or a list of page responses."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    pages = data if isinstance(data, list) else [data]
+    return [job for page in pages for job in page.get('jobs_results', [])]
+
+
+# --- Stand-ins ---
+
+class FakeGoogleSearch:
+    """Serves a fixed job list for every query, page_size jobs per page."""
+
+    jobs = []
+    page_size = 10
+    latency = 0.0
+
+    def __init__(self, params):
+        self._params = params
+
+    def get_dict(self):
+        start = time.perf_counter()
+        time.sleep(self.latency)
+        page = int(self._params.get('next_page_token') or 0)
+        offset = page * self.page_size
+        results = {'jobs_results': self.jobs[offset:offset + self.page_size]}
+        if offset + self.page_size < len(self.jobs):
+            results['serpapi_pagination'] = {'next_page_token': str(page + 1)}
+        _record('serpapi.get_dict', time.perf_counter() - start)
+        return results
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModels:
+    """Answers match-scoring prompts from recorded analyses or a deterministic synthetic score."""
+
+    _batch_job_re = re.compile(r"### Job ID: (\d+)\n(.*?)(?=\n\n### Job ID: |\n\nMy CV summary:)", re.S)
+
+    def __init__(self, latency, jitter, recorded, error_rate, seed):
+        self._latency = latency
+        self._jitter = jitter
+        self._recorded = recorded
+        self._error_rate = error_rate
+        self._rng = random.Random(seed)
+
+    def _analysis(self, description):
+        key = hashlib.sha256(description.strip().encode('utf-8')).hexdigest()
+        if key in self._recorded:
+            return self._recorded[key]
+        text = description.lower()
+        hits = sum(text.count(word) for word in _SKILL_WORDS)
+        score = max(1, min(10, round(10 * hits / max(1, len(text.split())) * 3)))
+        return {'score': score, 'is_match': score >= 6, 'justification': 'Synthetic replay score.'}
+
+    def generate_content(self, model, contents, config=None):
+        start = time.perf_counter()
+        with _lock:
+            delay = max(0.0, self._rng.gauss(self._latency, self._jitter))
+            fail = self._rng.random() < self._error_rate
+        time.sleep(delay)
+        try:
+            if fail:
+                return _Response('Sorry, I cannot help with that.')
+
+            batch = self._batch_job_re.findall(contents)
+            if batch:
+                entries = [dict(self._analysis(description), job_id=job_id) for job_id, description in batch]
+                return _Response('```json\n' + json.dumps(entries) + '\n```')
+
+            description = contents.split('Job Description:', 1)[-1].split('My CV summary:', 1)[0]
+            return _Response('```json\n' + json.dumps(self._analysis(description)) + '\n```')
+        finally:
+            _record('gemini.generate_content', time.perf_counter() - start)
+
+
+class FakeGenaiClient:
+    def __init__(self, models):
+        self.models = models
+
+
+class _FakeBatchWriter:
+    def __init__(self, table):
+        self._table = table
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def put_item(self, Item):
+        self._table.put_item(Item=Item)
+
+
+def _plain(value):
+    """The value of a low-level client's typed attribute ({'S': 'x'} -> 'x'); other values as is."""
+    if isinstance(value, dict) and len(value) == 1:
+        (value,) = value.values()
+    return value
+
+
+class FakeTable:
+    def __init__(self, resource, name):
+        self._resource = resource
+        self._name = name
+
+    def put_item(self, Item):
+        key_name = self._resource.key_names.get(self._name, 'jobId')
+        self._resource.tables[self._name][_plain(Item[key_name])] = dict(Item)
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return _FakeBatchWriter(self)
+
+
+class FakeDynamoDB:
+    """In-memory stand-in for the boto3 DynamoDB service resource and client.
+
+    Items keep the shape they were written in, so typed (client) items come back typed.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.tables = defaultdict(dict)
+        self.key_names = {}
+
+    def Table(self, name):
+        return FakeTable(self, name)
+
+    def batch_get_item(self, RequestItems):
+        start = time.perf_counter()
+        time.sleep(self.latency)
+        responses = {}
+        for name, request in RequestItems.items():
+            found = []
+            for key in request['Keys']:
+                (key_name, key_value), = key.items()
+                self.key_names[name] = key_name
+                if _plain(key_value) in self.tables[name]:
+                    found.append(dict(self.tables[name][_plain(key_value)]))
+            responses[name] = found
+        _record('dynamodb.batch_get_item', time.perf_counter() - start)
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+    def batch_write_item(self, RequestItems):
+        start = time.perf_counter()
+        time.sleep(self.latency)
+        for name, requests in RequestItems.items():
+            for request in requests:
+                self.Table(name).put_item(Item=request['PutRequest']['Item'])
+        _record('dynamodb.batch_write_item', time.perf_counter() - start)
+        return {'UnprocessedItems': {}}
+
+
+class FakeSQS:
+    def __init__(self, latency):
+        self._latency = latency
+        self.messages = defaultdict(list)
+
+    def send_message_batch(self, QueueUrl, Entries):
+        start = time.perf_counter()
+        time.sleep(self._latency)
+        self.messages[QueueUrl].extend(entry['MessageBody'] for entry in Entries)
+        _record('sqs.send_message_batch', time.perf_counter() - start)
+        return {'Successful': [{'Id': entry['Id']} for entry in Entries], 'Failed': []}
+
+
+# --- Harness ---
+
+_STAGES = [
+    'find_existing_job_ids',
+    'drop_near_duplicates',
+    'prefilter_jobs',
+    'score_jobs_cached',
+    'process_new_jobs',
+]
+
+
+@contextmanager
+def offline_app(app, search, dynamodb, sqs, genai_client, cv_summary):
+    """Point the app's lazy accessors at the stand-ins and time its pipeline stages."""
+    originals = {}
+
+    def patch(module, name, value):
+        originals[(module, name)] = getattr(module, name)
+        setattr(module, name, value)
+
+    patch(app, 'get_dynamodb', lambda: dynamodb)
+    patch(app, 'get_dynamodb_client', lambda: dynamodb)
+    patch(app, 'get_sqs', lambda: sqs)
+    patch(app, 'get_genai_client', lambda: genai_client)
+    patch(search, '_google_search_class', lambda: FakeGoogleSearch)
+    if cv_summary is not None:
+        patch(app, 'get_cv_summary', lambda: cv_summary)
+    for stage in _STAGES:
+        patch(app, stage, _timed_wrapper(f'stage.{stage}', getattr(app, stage)))
+    for accessor in ('get_cv_relevance', 'get_score_cache', 'get_near_dup_index'):
+        getattr(app, accessor).cache_clear()
+    try:
+        yield
+    finally:
+        for (module, name), value in originals.items():
+            setattr(module, name, value)
+
+
+def print_report(elapsed, job_count, result):
+    print()
+    print(f"Handler result: {result}")
+    print(f"Replayed {job_count} jobs in {elapsed:.2f} s ({job_count / elapsed:.1f} jobs/sec)")
+    print()
+    print(f"{'name':40} {'calls':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'total s':>9}")
+    for name in sorted(_latencies):
+        values = _latencies[name]
+        print(
+            f"{name:40} {_call_counts[name]:>7} {percentile(values, 50) * 1000:>9.1f} "
+            f"{percentile(values, 95) * 1000:>9.1f} {percentile(values, 99) * 1000:>9.1f} {sum(values):>9.2f}"
+        )
+
+
+def prefilter_sweep(relevance, jobs, page_size, analysis, thresholds):
+    """Jobs the pre-filter would drop, and matches it would lose, per threshold.
+
+    Relevance is computed per page of page_size jobs, as the handler ranks each page;
+    analysis(description) gives the label (recorded analyses when --responses is set).
+    Returns one (threshold, dropped, matches lost) tuple per threshold.
+    """
+    scored = []
+    for start in range(0, len(jobs), page_size):
+        page = jobs[start:start + page_size]
+        scores = relevance.score_all([job['description'] for job in page])
+        scored += [(score, analysis(job['description']).get('is_match') is True) for score, job in zip(scores, page)]
+    return [
+        (
+            threshold,
+            sum(1 for score, _ in scored if score < threshold),
+            sum(1 for score, is_match in scored if score < threshold and is_match),
+        )
+        for threshold in thresholds
+    ]
+
+
+def print_sweep(rows, jobs, matches):
+    print()
+    print(f"Pre-filter sweep over {jobs} jobs ({matches} matches):")
+    print(f"{'threshold':>10} {'dropped':>9} {'dropped %':>10} {'matches lost':>13}")
+    for threshold, dropped, lost in rows:
+        print(f"{threshold:>10.3f} {dropped:>9} {100 * dropped / max(1, jobs):>9.1f}% {lost:>13}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    feed = parser.add_mutually_exclusive_group()
+    feed.add_argument('--feed', help='Recorded SerpApi JSON (one response or a list of pages).')
+    feed.add_argument('--synthetic', type=int, default=1000, help='Number of synthetic jobs to generate.')
+    parser.add_argument('--responses', help='JSON mapping sha256(description) to a recorded analysis.')
+    parser.add_argument('--job-types', nargs='+', default=['Android Developer'])
+    parser.add_argument('--page-size', type=int, default=10)
+    parser.add_argument('--max-pages', type=int, help='Override SERPAPI_MAX_PAGES (default: enough for the feed).')
+    parser.add_argument('--concurrency', type=int, help='Override SCORING_CONCURRENCY.')
+    parser.add_argument('--model-latency', type=float, default=0.05, help='Mean model latency in seconds.')
+    parser.add_argument('--model-jitter', type=float, default=0.01)
+    parser.add_argument('--model-error-rate', type=float, default=0.0, help='Share of unparseable model replies.')
+    parser.add_argument('--search-latency', type=float, default=0.0)
+    parser.add_argument('--aws-latency', type=float, default=0.0, help='Latency of each DynamoDB/SQS batch call.')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--prefilter-sweep', type=float, nargs='+', metavar='THRESHOLD',
+                        help='Also report the jobs and matches PREFILTER_THRESHOLD values would drop.')
+    args = parser.parse_args(argv)
+
+    jobs = load_feed(args.feed) if args.feed else synthetic_jobs(args.synthetic, seed=args.seed)
+    pages = max(1, math.ceil(len(jobs) / args.page_size))
+
+    os.environ.setdefault('DYNAMODB_TABLE_NAME', 'Jobs')
+    os.environ.setdefault('SCORE_CACHE_TABLE_NAME', 'ScoreCache')
+    os.environ.setdefault('NEAR_DUP_TABLE_NAME', 'NearDuplicates')
+    os.environ.setdefault('JOB_QUEUE_URL', 'replay://jobs')
+    os.environ.setdefault('EMAIL_QUEUE_URL', 'replay://email')
+    os.environ['SERPAPI_MAX_PAGES'] = str(args.max_pages or pages)
+    if args.concurrency:
+        os.environ['SCORING_CONCURRENCY'] = str(args.concurrency)
+
+    # Support both package layouts, as app.py does.
+    try:
+        import app
+        import search
+    except ModuleNotFoundError:
+        from job_finder import app, search
+
+    cv_summary = None
+    if not os.path.exists('config/cv_summary.txt'):
+        print('config/cv_summary.txt not found; replaying with cv_summary.sample.txt.')
+        with open('config/cv_summary.sample.txt', 'r', encoding='utf-8') as f:
+            cv_summary = f.read()
+
+    recorded = {}
+    if args.responses:
+        with open(args.responses, 'r', encoding='utf-8') as f:
+            recorded = json.load(f)
+
+    FakeGoogleSearch.jobs = jobs
+    FakeGoogleSearch.page_size = args.page_size
+    FakeGoogleSearch.latency = args.search_latency
+    models = FakeModels(args.model_latency, args.model_jitter, recorded, args.model_error_rate, args.seed)
+    dynamodb = FakeDynamoDB(args.aws_latency)
+    dynamodb.key_names[os.environ['NEAR_DUP_TABLE_NAME']] = 'bucket'
+
+    with offline_app(
+        app,
+        search,
+        dynamodb,
+        FakeSQS(args.aws_latency),
+        FakeGenaiClient(models),
+        cv_summary,
+    ):
+        start = time.perf_counter()
+        result = app.lambda_handler({'job_types': args.job_types}, context=None)
+        elapsed = time.perf_counter() - start
+        if args.prefilter_sweep:
+            sweep = prefilter_sweep(app.get_cv_relevance(), jobs, args.page_size, models._analysis,
+                                    sorted(args.prefilter_sweep))
+
+    print_report(elapsed, len(jobs), result)
+    if args.prefilter_sweep:
+        matches = sum(1 for job in jobs if models._analysis(job['description']).get('is_match') is True)
+        print_sweep(sweep, len(jobs), matches)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
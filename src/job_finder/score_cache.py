@@ -0,0 +1,97 @@
+import hashlib
+import json
+import re
+import time
+
+try:
+    from storage import batch_get_items
+except ModuleNotFoundError:
+    from job_finder.storage import batch_get_items
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_description(description):
+    """Case- and whitespace-insensitive form of a description, used for cache keys."""
+    return _WHITESPACE_RE.sub(' ', (description or '').strip().lower())
+
+
+def scoring_fingerprint(*parts):
+    """Hash of everything besides the description that determines a score (CV, prompts, model)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update((part or '').encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class ScoreCache:
+    """Content-addressed cache of match-scoring results.
+
+    Keys hash the normalized description together with the scoring fingerprint, so
+    changing the CV summary, prompt or model yields new keys and old entries simply
+    stop matching (and expire through the DynamoDB TTL). An in-memory layer in front
+    of the table survives warm Lambda invocations.
+    """
+
+    def __init__(self, dynamodb, table_name, fingerprint, ttl_days=30):
+        self._dynamodb = dynamodb
+        self._table_name = table_name
+        self._fingerprint = fingerprint
+        self._ttl_seconds = int(ttl_days * 24 * 3600)
+        self._memory = {}
+        self.hits = 0
+        self.misses = 0
+
+    def key_for(self, description):
+        payload = f"{self._fingerprint}\0{normalize_description(description)}"
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get_many(self, keys):
+        """Return a dict of key -> cached analysis for the keys that are cached."""
+        found = {key: self._memory[key] for key in keys if key in self._memory}
+        remote_keys = [key for key in keys if key not in found]
+
+        if remote_keys and self._table_name:
+            now = int(time.time())
+            items = batch_get_items(self._dynamodb, self._table_name, 'cacheKey', remote_keys)
+            for key, item in items.items():
+                # TTL deletion is lazy, so expired items can still be returned for a while.
+                if int(item.get('expiresAt', 0)) <= now:
+                    continue
+                analysis = json.loads(item['analysis'])
+                self._memory[key] = analysis
+                found[key] = analysis
+
+        self.hits += len(found)
+        self.misses += len(set(keys) - set(found))
+        return found
+
+    def put_many(self, entries):
+        """Store a dict of key -> analysis in memory and in the cache table."""
+        if not entries:
+            return
+        self._memory.update(entries)
+        if not self._table_name:
+            return
+
+        expires_at = int(time.time()) + self._ttl_seconds
+        table = self._dynamodb.Table(self._table_name)
+        with table.batch_writer(overwrite_by_pkeys=['cacheKey']) as batch:
+            for key, analysis in entries.items():
+                batch.put_item(
+                    Item={
+                        'cacheKey': key,
+                        'analysis': json.dumps(analysis),
+                        'expiresAt': expires_at,
+                    }
+                )
+
+    def report(self):
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total else 0.0
+        return f"Score cache: {self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate)."
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,46 @@
+from functools import lru_cache
+
+try:
+    from startup_timing import timed
+except ModuleNotFoundError:
+    from job_finder.startup_timing import timed
+
+
+@lru_cache(maxsize=None)
+def _google_search_class():
+    with timed('import serpapi'):
+        from serpapi import GoogleSearch
+    return GoogleSearch
+
+
+def build_queries(job_types, locations):
+    """Return (job_type, query) pairs for every job type and location combination."""
+    return [
+        (job_type, f"{job_type} jobs {location} since yesterday")
+        for job_type in job_types
+        for location in locations
+    ]
+
+
+def iter_search_pages(query, api_key, max_pages):
+    """Yield the jobs_results of each Google Jobs page for a query, following next_page_token.
+
+    Pages are fetched lazily, so a consumer that stops iterating stops paying for pages.
+    """
+    GoogleSearch = _google_search_class()
+    params = {"api_key": api_key, "engine": "google_jobs", "q": query}
+    for page in range(max_pages):
+        results = GoogleSearch(params).get_dict()
+        if 'error' in results:
+            print(f"SerpApi error for '{query}' page {page + 1}: {results['error']}")
+            return
+
+        jobs = results.get('jobs_results', [])
+        if not jobs:
+            return
+        yield jobs
+
+        next_page_token = results.get('serpapi_pagination', {}).get('next_page_token')
+        if not next_page_token:
+            return
+        params = dict(params, next_page_token=next_page_token)
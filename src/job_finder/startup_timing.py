@@ -0,0 +1,28 @@
+import time
+from contextlib import contextmanager
+
+_phases = []
+
+
+@contextmanager
+def timed(phase):
+    """Record how long the wrapped import or initialization step took."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases.append((phase, time.perf_counter() - start))
+
+
+def record(phase, seconds):
+    _phases.append((phase, seconds))
+
+
+def report():
+    """Return a one-line breakdown of the phases recorded since the last report, then clear them."""
+    if not _phases:
+        return None
+    total = sum(seconds for _, seconds in _phases)
+    parts = ', '.join(f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in _phases)
+    _phases.clear()
+    return f"Startup timing ({total * 1000:.0f} ms): {parts}"
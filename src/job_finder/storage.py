@@ -0,0 +1,211 @@
+import time
+
+# BatchGetItem accepts at most 100 keys per request.
+BATCH_GET_CHUNK_SIZE = 100
+BATCH_GET_MAX_RETRIES = 5
+
+
+def chunk_list(data, chunk_size):
+    """Yield successive n-sized chunks from a list."""
+    for i in range(0, len(data), chunk_size):
+        yield data[i:i + chunk_size]
+
+
+def batch_get_items(dynamodb, table_name, key_name, key_values, projection=None, key_type=None):
+    """Fetch items by key with chunked BatchGetItem calls.
+
+    UnprocessedKeys are retried with exponential backoff. Returns a dict mapping
+    each found key value to its item. Keys still unprocessed after the retries are
+    logged and left out, as if they did not exist: a job is then scored again at worst,
+    instead of the whole run failing.
+
+    With a low-level client, pass the key's DynamoDB type as key_type (e.g. 'S'): key
+    values are sent typed, and the result is still keyed by the plain value.
+    """
+    found = {}
+    unique_values = list(dict.fromkeys(key_values))
+
+    for chunk in chunk_list(unique_values, BATCH_GET_CHUNK_SIZE):
+        request = {'Keys': [{key_name: {key_type: value} if key_type else value} for value in chunk]}
+        if projection:
+            request['ProjectionExpression'] = projection
+        request_items = {table_name: request}
+
+        attempt = 0
+        while request_items:
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            for item in response.get('Responses', {}).get(table_name, []):
+                found[item[key_name][key_type] if key_type else item[key_name]] = item
+
+            request_items = response.get('UnprocessedKeys') or {}
+            if not request_items:
+                break
+
+            attempt += 1
+            if attempt > BATCH_GET_MAX_RETRIES:
+                unprocessed = request_items.get(table_name, {}).get('Keys', [])
+                print(f"BatchGetItem left {len(unprocessed)} keys unprocessed after retries; treating them as missing.")
+                break
+            time.sleep(min(2 ** attempt * 0.05, 1.0))
+
+    return found
+
+
+# BatchWriteItem accepts at most 25 items and SendMessageBatch at most 10 entries per request.
+BATCH_WRITE_CHUNK_SIZE = 25
+SQS_BATCH_CHUNK_SIZE = 10
+
+
+def batch_write_items(dynamodb, table_name, items):
+    """Put items with chunked BatchWriteItem calls.
+
+    UnprocessedItems are retried with exponential backoff. Returns the number of items
+    still unprocessed after the retries, which are logged and dropped.
+    """
+    dropped = 0
+    for chunk in chunk_list(items, BATCH_WRITE_CHUNK_SIZE):
+        request_items = {table_name: [{'PutRequest': {'Item': item}} for item in chunk]}
+
+        attempt = 0
+        while request_items:
+            response = dynamodb.batch_write_item(RequestItems=request_items)
+            request_items = response.get('UnprocessedItems') or {}
+            if not request_items:
+                break
+
+            attempt += 1
+            if attempt > BATCH_GET_MAX_RETRIES:
+                unprocessed = len(request_items.get(table_name, []))
+                print(f"BatchWriteItem left {unprocessed} items unprocessed after retries; dropping them.")
+                dropped += unprocessed
+                break
+            time.sleep(min(2 ** attempt * 0.05, 1.0))
+
+    return dropped
+
+
+class OutputBuffer:
+    """Buffers DynamoDB puts and their follow-up SQS messages and sends them in batches.
+
+    Items are written with BatchWriteItem in chunks of 25; a message is only sent once
+    its item has been written, with SendMessageBatch in chunks of 10 per queue.
+    Unprocessed items, failed entries and failed SendMessageBatch requests are retried
+    with backoff, a chunk whose BatchWriteItem request fails outright is written item by
+    item, and anything that still fails is reported per item. The buffer flushes itself when it holds 25 items.
+    """
+
+    def __init__(self, dynamodb, sqs, table_name, max_retries=BATCH_GET_MAX_RETRIES):
+        self._dynamodb = dynamodb
+        self._sqs = sqs
+        self._table_name = table_name
+        self._max_retries = max_retries
+        self._pending = []
+        self.published = []
+        self.failed = []
+
+    def add(self, item_id, item, queue_url, message_body):
+        self._pending.append({'id': item_id, 'item': item, 'queue_url': queue_url, 'body': message_body})
+        if len(self._pending) >= BATCH_WRITE_CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        pending, self._pending = self._pending, []
+        for chunk in chunk_list(pending, BATCH_WRITE_CHUNK_SIZE):
+            written = self._write_items(chunk)
+            by_queue = {}
+            for entry in written:
+                by_queue.setdefault(entry['queue_url'], []).append(entry)
+            for queue_url, entries in by_queue.items():
+                for message_chunk in chunk_list(entries, SQS_BATCH_CHUNK_SIZE):
+                    self._send_messages(queue_url, message_chunk)
+
+    def _fail(self, entry, reason):
+        print(f"Failed to publish job {entry['id']}: {reason}")
+        self.failed.append({'id': entry['id'], 'error': reason})
+
+    def _backoff(self, attempt):
+        time.sleep(min(2 ** attempt * 0.05, 1.0))
+
+    def _write_items(self, entries):
+        """Write a chunk of items; returns the entries whose items were stored."""
+        remaining = {entry['item']['jobId']: entry for entry in entries}
+        request_items = {
+            self._table_name: [{'PutRequest': {'Item': entry['item']}} for entry in entries]
+        }
+        attempt = 0
+        try:
+            while request_items:
+                response = self._dynamodb.batch_write_item(RequestItems=request_items)
+                request_items = response.get('UnprocessedItems') or {}
+                if not request_items:
+                    break
+                attempt += 1
+                if attempt > self._max_retries:
+                    break
+                self._backoff(attempt)
+        except Exception as e:
+            # One bad item (e.g. over the size limit) fails the whole request; write the
+            # chunk one item at a time so only the items that really fail are dropped.
+            print(f"BatchWriteItem error: {e}; writing the {len(entries)} items one at a time.")
+            return self._put_items(entries)
+
+        unprocessed = {
+            request['PutRequest']['Item']['jobId']
+            for request in request_items.get(self._table_name, [])
+        }
+        written = []
+        for key, entry in remaining.items():
+            if key in unprocessed:
+                self._fail(entry, 'item left unprocessed by BatchWriteItem after retries')
+            else:
+                written.append(entry)
+        return written
+
+    def _put_items(self, entries):
+        """Write items one PutItem at a time; returns the entries whose items were stored."""
+        table = self._dynamodb.Table(self._table_name)
+        written = []
+        for entry in entries:
+            try:
+                table.put_item(Item=entry['item'])
+            except Exception as e:
+                self._fail(entry, f"PutItem error: {e}")
+                continue
+            written.append(entry)
+        return written
+
+    def _send_messages(self, queue_url, entries):
+        remaining = {str(i): entry for i, entry in enumerate(entries)}
+        attempt = 0
+        while remaining:
+            try:
+                response = self._sqs.send_message_batch(
+                    QueueUrl=queue_url,
+                    Entries=[{'Id': message_id, 'MessageBody': entry['body']} for message_id, entry in remaining.items()],
+                )
+            except Exception as e:
+                # Throttling or a network error; the whole request is retried.
+                attempt += 1
+                if attempt > self._max_retries:
+                    for entry in remaining.values():
+                        self._fail(entry, f"SendMessageBatch error: {e}")
+                    return
+                print(f"SendMessageBatch error: {e}; retrying {len(remaining)} messages.")
+                self._backoff(attempt)
+                continue
+
+            for success in response.get('Successful', []):
+                self.published.append(remaining.pop(success['Id'])['id'])
+
+            retry = {}
+            for failure in response.get('Failed', []):
+                entry = remaining.pop(failure['Id'])
+                reason = f"{failure.get('Code')}: {failure.get('Message', '')}"
+                if failure.get('SenderFault') or attempt >= self._max_retries:
+                    self._fail(entry, reason)
+                else:
+                    retry[failure['Id']] = entry
+            remaining = retry
+            if remaining:
+                attempt += 1
+                self._backoff(attempt)